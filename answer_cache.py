@@ -0,0 +1,162 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Sorguyu önbellek anahtarı için normalleştirir (harf, boşluk ve noktalama farkları yok sayılır)."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+@dataclass
+class CachedAnswer:
+    """Önbellekte tutulan tek bir yanıt."""
+    response: str
+    sources: list
+    created_at: float
+    embedding: np.ndarray | None = field(default=None, repr=False)
+
+
+class AnswerCache:
+    """
+    (lang_code, normalleştirilmiş sorgu) anahtarlı, boyut ve TTL sınırlı LRU yanıt önbelleği.
+    İsteğe bağlı ikinci katman, sorgu gömmesi üzerinden kosinüs benzerliği ile neredeyse aynı soruları eşler.
+    Bilgi tabanı sürümü (version_fn) değiştiğinde tüm önbellek otomatik olarak temizlenir.
+    """
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 3600.0, similarity_threshold: float = 0.0,
+                 version_fn=None, version_check_interval: float = 5.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._version_fn = version_fn
+        self._version_check_interval = version_check_interval
+        self._version = version_fn() if version_fn else None
+        self._last_version_check = time.monotonic()
+
+        self._entries: OrderedDict[tuple[str, str], CachedAnswer] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.max_size > 0 and self.similarity_threshold > 0
+
+    # --- Yardımcılar (kilit altında çağrılır) ---
+
+    def _check_version(self):
+        """Bilgi tabanı yeniden oluşturulduysa önbelleği boşaltır (kontrol aralıkla sınırlıdır)."""
+        if self._version_fn is None:
+            return
+        now = time.monotonic()
+        if now - self._last_version_check < self._version_check_interval:
+            return
+        self._last_version_check = now
+        version = self._version_fn()
+        if version != self._version:
+            self._version = version
+            if self._entries:
+                self._entries.clear()
+                self._counters["invalidations"] += 1
+
+    def _is_expired(self, entry: CachedAnswer) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - entry.created_at > self.ttl_seconds
+
+    # --- Genel API ---
+
+    def get(self, lang_code: str, query: str) -> CachedAnswer | None:
+        """Birebir (normalleştirilmiş) eşleşen yanıtı döndürür; yoksa None."""
+        if self.max_size <= 0:
+            return None
+        key = (lang_code, normalize_query(query))
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+
+    def get_similar(self, lang_code: str, embedding) -> CachedAnswer | None:
+        """Aynı dilde, sorgu gömmesi eşik değerinin üzerinde benzeyen en yakın yanıtı döndürür."""
+        if not self.similarity_enabled:
+            return None
+        query_vec = _unit_vector(embedding)
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for key, entry in self._entries.items():
+                if key[0] != lang_code or entry.embedding is None or self._is_expired(entry):
+                    continue
+                score = float(np.dot(query_vec, entry.embedding))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self._counters["similar_hits"] += 1
+            return self._entries[best_key]
+
+    def put(self, lang_code: str, query: str, response: str, sources: list, embedding=None):
+        """Yanıtı önbelleğe ekler; kapasite aşılırsa en eski kullanılan kayıt atılır."""
+        if self.max_size <= 0:
+            return
+        key = (lang_code, normalize_query(query))
+        entry = CachedAnswer(
+            response=response,
+            sources=list(sources),
+            created_at=time.monotonic(),
+            embedding=_unit_vector(embedding) if embedding is not None and self.similarity_enabled else None,
+        )
+        with self._lock:
+            self._check_version()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self):
+        """Tüm önbelleği boşaltır."""
+        with self._lock:
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        """Boyutlandırma için isabet/ıska sayaçlarını döndürür."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        stats["max_size"] = self.max_size
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["similarity_threshold"] = self.similarity_threshold
+        # similar_hits, birebir ıskalardan benzerlik katmanında kurtarılanlardır.
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["similar_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def _unit_vector(embedding) -> np.ndarray:
+    """Gömmeyi birim uzunluklu float32 vektöre çevirir (nokta çarpımı = kosinüs benzerliği)."""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
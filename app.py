@@ -1,10 +1,13 @@
 import os
+import json
+import time
 import logging
-from flask import Flask, request, jsonify
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from datetime import datetime
+from flask import Flask, request, jsonify, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from langdetect import detect
-from langdetect import LangDetectException
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
@@ -12,17 +15,48 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import Chroma
 import sys
+from answer_cache import AnswerCache, normalize_query
+from faq_store import FaqStore, faq_store_path
+from embedding_cache import CachedEmbeddings
+from kb_version import read_kb_version
+from vector_index import CompactVectorIndex, VectorIndex
+from index_shards import LanguageShards, read_shard_layout
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from context_assembly import assemble_context
+from session_store import SessionStore, SharedSessionStore, is_followup as is_session_followup
+from concurrency import (ConcurrencyLimiter, DeadlineExceededError, OverloadedError, SingleFlight, call_with_deadline,
+                         iterate_with_deadline)
+from lang_detect import LanguageDetector
+from request_log import RequestLog, setup_logging
+from static_assets import load_static_asset
+from metrics import (MetricsRegistry, SIZE_BUCKETS, bind_request_timings, reset_request_timings, server_timing_header,
+                     timed, timings_ms)
+
+# .env, aşağıdaki tüm ayarlar (loglama dahil) okunmadan önce yüklenmelidir.
+load_dotenv()
 
 # --- Loglama Ayarları ---
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.FileHandler("chat_logs.txt", mode='a'),
-                        logging.StreamHandler()
-                    ])
+# Loglar kuyruk üzerinden arka plan iş parçacığında yazılır: metin logları chat_logs.txt'ye,
+# istek başına yapılandırılmış kayıtlar (JSONL) request_logs.jsonl'e.
+CHAT_LOG_PATH = os.getenv("CHAT_LOG_PATH", "chat_logs.txt")
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", "request_logs.jsonl")
+# "external" (varsayılan): gunicorn işçileri aynı dosyalara yazar, döndürmeyi logrotate yapar (bkz. logrotate.conf);
+# her işçi taşınan dosyayı fark edip yenisini açar. "internal": dosyalar süreç içinde LOG_MAX_BYTES boyutunda ve
+# LOG_ROTATE_WHEN zamanında döndürülür; yalnızca tek süreç yazıyorsa (ör. python app.py) kullanılmalıdır.
+LOG_ROTATION = os.getenv("LOG_ROTATION", "external")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+# Tam yanıt metni kayıtların yalnızca bu oranına eklenir (0 = hiçbirine, 1 = hepsine).
+ANSWER_LOG_SAMPLE_RATE = float(os.getenv("ANSWER_LOG_SAMPLE_RATE", "0.1"))
+# /log_query'ye tek istekte gönderilebilecek en fazla istemci kaydı
+CLIENT_LOG_MAX_BATCH = 100
+
+log_pipeline = setup_logging(CHAT_LOG_PATH, REQUEST_LOG_PATH, LOG_MAX_BYTES, LOG_ROTATE_WHEN, LOG_BACKUP_COUNT,
+                             rotation=LOG_ROTATION)
+request_log = RequestLog(ANSWER_LOG_SAMPLE_RATE)
 
 # --- Sabitler ve İlk Ayarlar ---
-load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
@@ -44,52 +78,272 @@ FALLBACK_LANG = "en"
 
 # Desteklenen diller
 SUPPORTED_LANGS = ["en", "es", "sr", "fr", "tr"]
+# İşçiyi belirli dillere sabitler (virgülle ayrılmış, ör. "en,tr"): yalnızca bu dillerin parçaları yüklenir (başlangıçta),
+# diğer dillerde tespit edilen sorgular dil bazlı yönlendirme yapan ön katman için 421 alır.
+# Boşsa tüm diller sunulur ve her dil ilk sorgusunda yüklenir.
+SERVE_LANGS = [lang.strip() for lang in os.getenv("SERVE_LANGS", "").split(",") if lang.strip()]
+
+# Dil tespiti: güven bu değerin altındaysa (ör. çok kısa veya karışık sorgular) FALLBACK_LANG kullanılır.
+LANG_DETECT_MIN_CONFIDENCE = float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.8"))
+LANG_DETECT_CACHE_SIZE = int(os.getenv("LANG_DETECT_CACHE_SIZE", "4096"))
+
+# Erişim ayarları
+# Benzerlik eşiği (score_threshold) 0.70'ten 0.65'e DÜŞÜRÜLDÜ: potansiyel olarak faydalı belgeleri kaçırmamak için.
+RETRIEVAL_SCORE_THRESHOLD = 0.65
+# Alınacak belge sayısı (k) 2'den 3'e ARTIRILDI: modelin daha geniş bir bağlamda değerlendirme yapması için.
+RETRIEVAL_K = 3
+# İsteme girecek bağlamın tahmini token bütçesi (örtüşen parçalar birleştirilip tekrarlar çıkarıldıktan sonra; 0 = sınırsız)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+
+# --- Çok turlu oturumlar ---
+# Oturumlar aynı makinedeki tüm işçilerin paylaştığı SQLite dosyasında tutulur (gunicorn isteği herhangi bir işçiye
+# verebilir). Boş bırakılırsa işçi süreci belleğinde tutulur; yalnızca tek işçiyle (ör. python app.py) kullanılmalıdır.
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.sqlite3")
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "2000"))  # 0 = oturumlar kapalı
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "3"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", "16384"))
+SESSION_MAX_DOCS = 6
+# Bu kadar veya daha az kelimeli sorgular, önceki tura gönderme yapan bir zamir/işaret sözcüğü içeriyorsa
+# devam sorusu sayılır ("how long is its recovery?"); bkz. session_store.ANAPHORA_TERMS.
+SESSION_FOLLOWUP_MAX_WORDS = int(os.getenv("SESSION_FOLLOWUP_MAX_WORDS", "8"))
+# Devam sorusunun anlamlı kelimelerinin bu oranı önceki parçalarda geçiyorsa yeni erişim yapılmaz. Varsayılan 1.0:
+# yalnızca tüm anahtar kelimeler önceki parçalarda geçiyorsa; aksi halde yeni erişim önceki parçalarla birleştirilir.
+SESSION_REUSE_COVERAGE = float(os.getenv("SESSION_REUSE_COVERAGE", "1.0"))
+# "chroma": her istekte Chroma'nın SQLite destekli yolu; "numpy": başlangıçta belleğe alınan vektörize indeks;
+# "compact": load_data.py'nin yazdığı bellek eşlemeli nicelenmiş vektörlerde yaklaşık arama + float32 yeniden sıralama
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+# compact arka ucu: taranan matrisin biçimi ("int8" veya "float16") ve tam skorla yeniden sıralanan aday sayısı
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "int8")
+VECTOR_RERANK_CANDIDATES = int(os.getenv("VECTOR_RERANK_CANDIDATES", "50"))
+# "vector": yalnızca gömme araması; "hybrid": gömme + BM25 (sözcüksel) sonuçları sıra füzyonu ile birleştirilir.
+# Hibrit modda gömme EMBEDDING_LATENCY_BUDGET_MS içinde dönmez veya hata verirse yalnızca BM25 sonuçları kullanılır.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+EMBEDDING_LATENCY_BUDGET_MS = float(os.getenv("EMBEDDING_LATENCY_BUDGET_MS", "800"))
+# BM25 eşleşmesinin sayılması için sorgu terimlerinin (idf ağırlıklı) en az bu oranı parçada geçmelidir.
+LEXICAL_MIN_COVERAGE = float(os.getenv("LEXICAL_MIN_COVERAGE", "0.5"))
+# Bellekteki indekslerin (NumPy/BM25) bilgi tabanı güncellemelerini kontrol etme aralığı (saniye)
+INDEX_REFRESH_INTERVAL = 5.0
+
+# Gömme önbelleği: bellek içi LRU + yeniden başlatmalarda korunan disk deposu (load_data.py ile ortak)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "4096"))
+# Sorgu gömmesi mikro-partileme: bu pencerede (ms) gelen önbellekte olmayan sorgular tek çağrıda gömülür.
+# 0 pencere partilemeyi kapatır.
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+
+# Yanıt önbelleği ayarları (boyut 0 ise önbellek kapalıdır)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+# 0 ise benzerlik katmanı kapalıdır; örn. 0.95 neredeyse aynı soruları aynı yanıtla eşler.
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+# build_faq.py'nin loglardaki sık sorgular için ürettiği hazır yanıtlar. Birebir eşleşme her zaman denenir;
+# gömme benzerliği bu eşiğin üzerindeyse (0 = kapalı, varsayılan) ve anahtar kelimeler uyuşuyorsa yakın yazılışlar
+# da hazır yanıtı alır. Yanıt önbelleğinin benzerlik katmanı gibi varsayılan olarak kapalıdır: adları yakın
+# tedaviler (sleeve/bypass) tek başına gömme benzerliğiyle kolayca eşleşir.
+FAQ_SIMILARITY = float(os.getenv("FAQ_SIMILARITY", "0"))
+
+# LLM eşzamanlılık kontrolü (işçi süreci başına): aynı anda en fazla LLM_MAX_CONCURRENCY Gemini çağrısı,
+# en fazla LLM_MAX_QUEUE istek LLM_QUEUE_TIMEOUT saniye bekler; fazlası hemen 503 alır.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+# Tek bir Gemini çağrısının üst süresi ve yeniden deneme sayısı (kütüphane varsayılanı 6 denemedir)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# İstek başına üst süre (başlatma beklemesi, erişim ve LLM kuyruğu dahil). Gemini çağrısı (akışta son token) bu süre
+# dolana kadar bitmezse istemci 504 alır; askıda kalan çağrı istek iş parçacığını tutmaz.
+# gunicorn'un "timeout" ayarı gthread işçilerinde yalnızca işçi canlılık sinyalidir, istek süresini sınırlamaz.
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "45"))
+
+# Aynı (dil, normalleştirilmiş sorgu) için eşzamanlı istekler tek bir RAG çağrısını paylaşır;
+# kopyalar lideri en fazla bu kadar saniye bekler, sonra işi kendileri yapar.
+COALESCE_MAX_WAIT = float(os.getenv("COALESCE_MAX_WAIT", "30"))
+
+# Başlatma başarısız olursa her istekte yeniden denenmez; en az bu kadar saniye beklenir.
+INIT_RETRY_INTERVAL = float(os.getenv("INIT_RETRY_INTERVAL", "30"))
+
+# Arayüzün tek kaynağı; süreç başlarken belleğe alınır ve gzip/brotli varyantları bir kez üretilir.
+INDEX_HTML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index.html")
+# Tarayıcı önbelleği süresi (sn); 0 = her yüklemede ETag ile doğrula (değişmediyse gövdesiz 304)
+INDEX_CACHE_MAX_AGE = int(os.getenv("INDEX_CACHE_MAX_AGE", "0"))
 
 # RAG sistemi bileşenlerini global olarak tanımlayın
+# vectorstore: dil başına Chroma depoları ve (numpy/compact arka uçlarında) bellekteki vektör indeksleri (LanguageShards)
 vectorstore = None
 rag_chain = None
+rag_prompt = None
+embedding_cache = None
+lexical_index = None
+index_version = None
+index_checked_at = 0.0
+# Hibrit modda sorgu gömmesi bu havuzda, süre bütçesiyle beklenir.
+_embedding_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="embed-query")
+# Gemini çağrıları bu havuzda, istek süresi dolana kadar beklenir (yerler llm_limiter'dan alınır).
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm-call")
+
+# Yalnızca desteklenen dillerin profilleri, süreç başlarken bir kez yüklenir.
+language_detector = LanguageDetector(SUPPORTED_LANGS, cache_size=LANG_DETECT_CACHE_SIZE)
+
+llm_limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+single_flight = SingleFlight(COALESCE_MAX_WAIT)
+
+# Başlatma tek bir iş parçacığı tarafından yapılır; diğerleri kilitte bekler.
+_init_lock = threading.RLock()
+_last_init_attempt = 0.0
+# /readyz ile raporlanan yükleme durumu
+init_state = {"status": "not_started", "pid": os.getpid(), "attempts": 0, "started_at": None,
+              "duration_seconds": None, "timings": {}, "error": None}
+
+# load_data.py veritabanını yeniden oluşturduğunda sürüm damgası değişir ve önbellek boşaltılır.
+answer_cache = AnswerCache(
+    max_size=ANSWER_CACHE_SIZE,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=ANSWER_CACHE_SIMILARITY,
+    version_fn=lambda: read_kb_version(CHROMA_DB_DIR)
+)
+# Bilgi tabanının geçerli sürümü için üretilmemiş hazır yanıtlar sunulmaz.
+faq_store = FaqStore(
+    path_fn=lambda: faq_store_path(CHROMA_DB_DIR),
+    version_fn=lambda: read_kb_version(CHROMA_DB_DIR),
+    similarity_threshold=FAQ_SIMILARITY
+)
+_session_settings = dict(
+    max_sessions=SESSION_MAX_COUNT,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_turns=SESSION_MAX_TURNS,
+    max_docs=SESSION_MAX_DOCS,
+    max_bytes=SESSION_MAX_BYTES
+)
+sessions = (SharedSessionStore(SESSION_STORE_PATH, **_session_settings) if SESSION_STORE_PATH
+            else SessionStore(**_session_settings))
+
+index_page = load_static_asset(INDEX_HTML_PATH, INDEX_CACHE_MAX_AGE)
+
+# --- Metrikler (/metrics, Prometheus metin biçimi; işçi süreci başına) ---
+metrics = MetricsRegistry()
+requests_total = metrics.counter("sava_requests_total", "Tamamlanan sohbet istekleri", ("endpoint", "status"))
+# "llm" aşaması eşzamanlılık kuyruğunda beklenen süreyi de içerir.
+stage_seconds = metrics.histogram("sava_stage_duration_seconds", "İstek aşamalarının süresi", ("stage",))
+cache_lookups_total = metrics.counter("sava_answer_cache_lookups_total", "Yanıt önbelleği sonuçları", ("result",))
+retrieved_chunks = metrics.histogram("sava_retrieved_docs", "İstek başına erişilen parça sayısı",
+                                   buckets=tuple(range(RETRIEVAL_K + 1)))
+empty_context_total = metrics.counter("sava_empty_context_total",
+                                      "Bağlam bulunamadığı için sabit yanıt dönen istekler")
+context_chars = metrics.histogram("sava_context_chars", "Bağlamın birleştirme/kısaltma öncesi ve sonrası karakter sayısı",
+                                  ("stage",), buckets=SIZE_BUCKETS)
+session_context_total = metrics.counter("sava_session_context_total",
+                                        "Devam sorularında önceki bağlamın kullanımı", ("mode",))
+metrics.gauge("sava_sessions", "Saklanan oturum sayısı", lambda: sessions.stats()["sessions"])
+metrics.gauge("sava_session_bytes", "Oturumların toplam tahmini boyutu (bayt)", lambda: sessions.stats()["total_bytes"])
+prompt_chars = metrics.histogram("sava_prompt_chars", "LLM'e gönderilen istemin karakter sayısı", buckets=SIZE_BUCKETS)
+answer_chars = metrics.histogram("sava_answer_chars", "Yanıtların karakter sayısı", buckets=SIZE_BUCKETS)
+metrics.gauge("sava_llm_active_calls", "Devam eden Gemini çağrıları", lambda: llm_limiter.stats()["active"])
+metrics.gauge("sava_llm_waiting_calls", "Gemini için kuyrukta bekleyen istekler", lambda: llm_limiter.stats()["waiting"])
+metrics.gauge("sava_answer_cache_size", "Yanıt önbelleğindeki kayıt sayısı", lambda: answer_cache.stats()["size"])
+metrics.gauge("sava_vector_index_resident_bytes", "Vektör indeksinin işçi belleğindeki baytları",
+              lambda: vectorstore.nbytes if vectorstore is not None else 0)
+metrics.gauge("sava_vector_index_mapped_bytes", "Vektör indeksinin bellek eşlemeli (paylaşılan) baytları",
+              lambda: vectorstore.mapped_bytes if vectorstore is not None else 0)
+metrics.gauge("sava_loaded_langs", "Bu işçide yüklenmiş dil sayısı",
+              lambda: len(vectorstore.loaded_langs) if vectorstore is not None else 0)
 
 
 # =========================================================================
 # 1. RAG SİSTEMİNİ BAŞLATMA VE YÜKLEME
 # =========================================================================
 
-def initialize_rag_system():
-    """Vektör deposunu yükler ve RAG zincirini oluşturur."""
-    global vectorstore, rag_chain
-
-    if vectorstore is not None and rag_chain is not None:
-        logging.info("RAG sistemi zaten yüklü.")
-        return
-
-    try:
-        logging.info(f"RAG sistemi başlatılıyor... Gömme Modeli: {EMBEDDING_MODEL}")
-
-        # 1. Gömme Fonksiyonunu Yükle
-        embedding_function = GoogleGenerativeAIEmbeddings(
+def initialize_rag_system(embeddings=None, llm=None):
+    """
+    Vektör deposunu yükler ve RAG zincirini oluşturur (süreç başına bir kez, kilit altında).
+    embeddings/llm verilirse Google istemcileri yerine bunlar kullanılır (ör. benchmarks/ altındaki sahte arka uçlar).
+    """
+    global vectorstore, rag_chain, embedding_cache, _last_init_attempt
+
+    with _init_lock:
+        if vectorstore is not None and rag_chain is not None:
+            logging.info("RAG sistemi zaten yüklü.")
+            return
+
+        _last_init_attempt = time.monotonic()
+        init_state.update(status="loading", pid=os.getpid(), attempts=init_state["attempts"] + 1,
+                          started_at=datetime.now().isoformat(), duration_seconds=None, timings={}, error=None)
+        timings = init_state["timings"]
+        start = time.perf_counter()
+
+        try:
+            _build_rag_components(timings, embeddings, llm)
+            init_state.update(status="ready", duration_seconds=round(time.perf_counter() - start, 3))
+            logging.info(f"RAG sistemi {init_state['duration_seconds']}s içinde hazır. Aşamalar: {timings}")
+
+        except Exception as e:
+            # Hata durumunda, hem loglayın hem de terminale yazdırın
+            logging.critical(f"RAG sistemi yüklenirken KRİTİK HATA oluştu: {e}")
+            # Hata detayını terminalde gösterin
+            print(f"\n\n🚨 KRİTİK HATA: RAG YÜKLEME BAŞARISIZ! 🚨\nDetay: {e}\n\n")
+            vectorstore = None
+            rag_chain = None
+            init_state.update(status="failed", error=str(e), duration_seconds=round(time.perf_counter() - start, 3))
+
+
+def _build_rag_components(timings: dict, embeddings=None, llm=None):
+    """Gömme istemcisini, Chroma'yı ve LLM zincirini oluşturur; her aşamanın süresini timings'e yazar."""
+    global vectorstore, rag_chain, rag_prompt, embedding_cache
+
+    stage_start = time.perf_counter()
+
+    def mark(stage: str):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = round(now - stage_start, 3)
+        stage_start = now
+
+    logging.info(f"RAG sistemi başlatılıyor... Gömme Modeli: {EMBEDDING_MODEL}")
+
+    # 1. Gömme Fonksiyonunu Yükle (tekrar eden sorgular ağ çağrısı yapmasın diye önbellekle sarılır)
+    if embeddings is None:
+        embeddings = GoogleGenerativeAIEmbeddings(
             model=EMBEDDING_MODEL,
             google_api_key=API_KEY
         )
-
-        # 2. Chroma Veritabanını Yükle (KRİTİK BÖLGE: Hata burada oluşur)
-        vectorstore = Chroma(
-            persist_directory=CHROMA_DB_DIR,
-            embedding_function=embedding_function,
-            collection_name=COLLECTION_NAME
-        )
-        # Hata oluşmazsa buraya ulaşılır
-        logging.info("Chroma Veritabanı başarıyla yüklendi.")
-
-        # 3. Model ve Prompt Tanımlamaları
+    embedding_cache = CachedEmbeddings(
+        embeddings,
+        model_name=EMBEDDING_MODEL,
+        db_path=EMBEDDING_CACHE_PATH,
+        memory_size=EMBEDDING_CACHE_MEMORY_SIZE,
+        query_batch_window_ms=QUERY_BATCH_WINDOW_MS,
+        query_batch_size=QUERY_BATCH_MAX_SIZE
+    )
+    embedding_function = embedding_cache
+    mark("embedding_client")
+
+    # 2. Dil başına Chroma depoları (KRİTİK BÖLGE: Hata burada oluşur). Diller ilk sorgularında yüklenir;
+    # işçi SERVE_LANGS ile sabitlendiyse bu diller (ve numpy/compact indeksleri) şimdi yüklenir.
+    vectorstore = open_language_shards(embedding_function, preload=SERVE_LANGS)
+    # Hata oluşmazsa buraya ulaşılır
+    logging.info(f"Chroma Veritabanı başarıyla yüklendi ({vectorstore.layout}, sunulan diller: {vectorstore.langs}).")
+    mark("chroma")
+
+    # 2.2. Hibrit mod: BM25 indeksini yükle
+    if RETRIEVAL_MODE == "hybrid":
+        load_lexical_index()
+        mark("lexical_index")
+
+    # 3. Model ve Prompt Tanımlamaları
+    if llm is None:
         llm = ChatGoogleGenerativeAI(
             model=CHAT_MODEL,
             temperature=0.0,
-            google_api_key=API_KEY
+            google_api_key=API_KEY,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES
         )
 
-        # --- KRİTİK PROMPT GÜNCELLEMESİ ---
-        # AI'ın yanıtına kaynak veya ek bilgi eklememesi için net talimat eklendi.
-        template = """You are SAVA CLINIC's expert health assistant. Your goal is to answer user questions truthfully 
+    # --- KRİTİK PROMPT GÜNCELLEMESİ ---
+    # AI'ın yanıtına kaynak veya ek bilgi eklememesi için net talimat eklendi.
+    template = """You are SAVA CLINIC's expert health assistant. Your goal is to answer user questions truthfully 
         based ONLY on the provided context. 
 
         If the context does not contain the answer, politely state that you do not have information on that specific topic 
@@ -98,6 +352,11 @@ def initialize_rag_system():
         IMPORTANT: Respond in the language requested by the user, which is determined by the language code: {lang_code}.
         CRITICAL: DO NOT include any citation, source, footnote, or "Sources:" section in your final answer text.
 
+        Use the conversation so far only to understand what the question refers to.
+
+        Conversation so far:
+        {history}
+
         Context:
         ---
         {context}
@@ -106,27 +365,59 @@ def initialize_rag_system():
         Question: {question}
 
         Response (in {lang_code}):"""
-        # --- PROMPT GÜNCELLEMESİ SONU ---
+    # --- PROMPT GÜNCELLEMESİ SONU ---
 
-        prompt = PromptTemplate.from_template(template)
+    prompt = PromptTemplate.from_template(template)
+    rag_prompt = prompt
 
-        # RAG zincirini tanımla
-        rag_chain = (
-                RunnablePassthrough.assign(context=(lambda x: x["context"]))
-                | prompt
-                | llm
-                | StrOutputParser()
-        )
+    # RAG zincirini tanımla
+    rag_chain = (
+            RunnablePassthrough.assign(context=(lambda x: x["context"]))
+            | prompt
+            | llm
+            | StrOutputParser()
+    )
 
-        logging.info("RAG zinciri başarıyla oluşturuldu.")
+    mark("llm_chain")
+    logging.info("RAG zinciri başarıyla oluşturuldu.")
+
+
+def ensure_rag_initialized() -> bool:
+    """
+    RAG sistemi hazır değilse (tek bir iş parçacığıyla) yüklemeyi dener ve hazır olup olmadığını döndürür.
+    Son deneme başarısızsa INIT_RETRY_INTERVAL dolana kadar yeniden denenmez.
+    """
+    if rag_chain is not None and vectorstore is not None:
+        return True
+    with _init_lock:
+        if rag_chain is not None and vectorstore is not None:
+            return True
+        if init_state["status"] == "failed" and time.monotonic() - _last_init_attempt < INIT_RETRY_INTERVAL:
+            return False
+        initialize_rag_system()
+        return rag_chain is not None and vectorstore is not None
+
+
+def _reset_after_fork():
+    """
+    Fork sonrası çocuk süreçte çağrılır: gRPC istemcileri ve SQLite bağlantıları süreçler arasında
+    paylaşılamaz, bu yüzden bileşenler ve kilit sıfırlanır; her işçi kendi kopyasını yükler.
+    """
+    global vectorstore, rag_chain, embedding_cache, lexical_index, _init_lock, _last_init_attempt
+    global _embedding_executor, _llm_executor
+    vectorstore = None
+    rag_chain = None
+    embedding_cache = None
+    lexical_index = None
+    _embedding_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="embed-query")
+    _llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm-call")
+    _init_lock = threading.RLock()
+    _last_init_attempt = 0.0
+    init_state.update(status="not_started", pid=os.getpid(), attempts=0, started_at=None,
+                      duration_seconds=None, timings={}, error=None)
 
-    except Exception as e:
-        # Hata durumunda, hem loglayın hem de terminale yazdırın
-        logging.critical(f"RAG sistemi yüklenirken KRİTİK HATA oluştu: {e}")
-        # Hata detayını terminalde gösterin
-        print(f"\n\n🚨 KRİTİK HATA: RAG YÜKLEME BAŞARISIZ! 🚨\nDetay: {e}\n\n")
-        vectorstore = None
-        rag_chain = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 # =========================================================================
@@ -134,99 +425,411 @@ def initialize_rag_system():
 # =========================================================================
 
 def detect_and_filter(query: str) -> str:
-    """Sorgunun dilini tespit eder ve desteklenmiyorsa varsayılan dile döner."""
-    try:
-        lang_code = detect(query)
-        if lang_code in SUPPORTED_LANGS:
-            logging.info(f"Dil tespit edildi: {lang_code}")
-            return lang_code
-        else:
-            # Türkçe ('tr') dahil desteklenmeyen diller için fallback yapılır.
-            logging.warning(
-                f"Tespit edilen dil ({lang_code}) desteklenmiyor. Varsayılan dil ({FALLBACK_LANG}) kullanılıyor.")
-            return FALLBACK_LANG
-    except LangDetectException:
-        logging.warning(f"Dil tespiti başarısız oldu. Varsayılan dil ({FALLBACK_LANG}) kullanılıyor.")
-        return FALLBACK_LANG
+    """Sorgunun dilini desteklenen diller arasından tespit eder; güven düşükse varsayılan dile döner."""
+    with timed(stage_seconds, "lang_detect"):
+        lang_code, confidence = language_detector.detect(query)
+    if lang_code is not None and confidence >= LANG_DETECT_MIN_CONFIDENCE:
+        logging.info(f"Dil tespit edildi: {lang_code} (güven: {confidence:.2f})")
+        return lang_code
+    logging.warning(
+        f"Dil tespiti yetersiz ({lang_code}, güven: {confidence:.2f}). Varsayılan dil ({FALLBACK_LANG}) kullanılıyor.")
+    return FALLBACK_LANG
+
+
+def served_langs() -> list[str]:
+    """Bu işçinin sunduğu diller: SERVE_LANGS (desteklenenlerle sınırlı) veya tüm desteklenen diller."""
+    unknown = [lang for lang in SERVE_LANGS if lang not in SUPPORTED_LANGS]
+    if unknown:
+        logging.warning(f"SERVE_LANGS içindeki desteklenmeyen diller yok sayılıyor: {unknown}")
+    return [lang for lang in SERVE_LANGS if lang in SUPPORTED_LANGS] or list(SUPPORTED_LANGS)
+
+
+def load_language_index(lang_code: str, store: Chroma, where: dict | None):
+    """
+    Tek bir dilin bellekteki vektör indeksini yükler: compact arka ucunda sıkıştırılmış dosyalardan,
+    yoksa (veya numpy arka ucunda) dilin koleksiyonundan.
+    """
+    if RETRIEVAL_BACKEND == "compact":
+        index = CompactVectorIndex.load(CHROMA_DB_DIR, VECTOR_QUANTIZATION, VECTOR_RERANK_CANDIDATES, langs=[lang_code])
+        if index is not None:
+            return index
+        logging.warning("Sıkıştırılmış vektör dosyaları bulunamadı; load_data.py çalıştırılana kadar "
+                        "tam float32 NumPy indeksi kullanılıyor.")
+    return VectorIndex.from_collection(store._collection, where=where)
 
 
-def dynamically_retrieve_and_run(query: str, lang_code: str, vs: Chroma):
+def open_language_shards(embedding_function, preload=()) -> LanguageShards:
     """
-    Filtrelenmiş alıcıyı kullanarak RAG zincirini çalıştırır.
-    Alaka düzeyini artırmak için eşik ve k değeri ayarlandı.
+    Dil başına depoları (henüz yüklemeden) tanımlar ve preload'daki dilleri yükler. load_data.py dil
+    koleksiyonlarını henüz yazmadıysa eski tek koleksiyon dil filtresiyle kullanılır.
     """
-    global rag_chain
+    global index_version, index_checked_at
+    index_version = read_kb_version(CHROMA_DB_DIR)
+    index_checked_at = time.monotonic()
+    layout = read_shard_layout(CHROMA_DB_DIR)
+    if layout is None:
+        logging.warning("Dil koleksiyonları bulunamadı; load_data.py çalıştırılana kadar tek koleksiyon dil "
+                        "filtresiyle kullanılıyor.")
+    shards = LanguageShards(
+        layout if layout is not None else {lang: COLLECTION_NAME for lang in SUPPORTED_LANGS},
+        embedding_function,
+        lambda collection_name: Chroma(
+            persist_directory=CHROMA_DB_DIR,
+            embedding_function=embedding_function,
+            collection_name=collection_name
+        ),
+        langs=served_langs(),
+        load_index=load_language_index if RETRIEVAL_BACKEND in ("numpy", "compact") else None,
+        lang_filter=layout is None
+    )
+    shards.preload(preload)
+    return shards
+
+
+def load_lexical_index():
+    """load_data.py'nin Chroma deposunun yanına kaydettiği BM25 indeksini (sunulan diller için, yeniden) yükler."""
+    global lexical_index, index_version, index_checked_at
+    index_version = read_kb_version(CHROMA_DB_DIR)
+    lexical_index = LexicalIndex.load(CHROMA_DB_DIR, langs=served_langs())
+    index_checked_at = time.monotonic()
+    if lexical_index is None:
+        logging.warning("Sözcüksel (BM25) indeks bulunamadı; load_data.py çalıştırılana kadar yalnızca gömme araması yapılır.")
+
+
+def refresh_indexes_if_stale():
+    """
+    load_data.py bilgi tabanını yeniden oluşturduysa dil depolarını yeniden açar (önceden yüklenmiş diller
+    hemen, diğerleri ilk sorgularında yüklenir) ve BM25 indeksini yeniden yükler.
+    """
+    global vectorstore, index_checked_at
+    now = time.monotonic()
+    if now - index_checked_at < INDEX_REFRESH_INTERVAL:
+        return
+    index_checked_at = now
+    if read_kb_version(CHROMA_DB_DIR) != index_version:
+        logging.info("Bilgi tabanı güncellenmiş; dil depoları ve bellekteki indeksler yeniden yükleniyor.")
+        vectorstore = open_language_shards(vectorstore.embeddings, preload=vectorstore.loaded_langs)
+        if RETRIEVAL_MODE == "hybrid":
+            load_lexical_index()
+
 
-    # Benzerlik eşiği (score_threshold) 0.70'ten 0.65'e DÜŞÜRÜLDÜ.
-    # Alınacak belge sayısı (k) 2'den 3'e ARTIRILDI.
-
-    # 1. Gelişmiş Retriever oluştur
-    retriever = vs.as_retriever(
-        search_type="similarity_score_threshold",  # Belge kalitesini artırmak için
-        search_kwargs={
-            "score_threshold": 0.65,  # Potansiyel olarak faydalı belgeleri kaçırmamak için düşürüldü.
-            "filter": {"lang": lang_code},
-            "k": 3  # Modelin daha geniş bir bağlamda değerlendirme yapması için artırıldı.
-        }
+def search_documents(query_vector, lang_code: str, vs: LanguageShards) -> list:
+    """
+    Önceden hesaplanmış sorgu vektörüyle, yapılandırılan arka uçta (chroma/numpy/compact) aynı score_threshold/k
+    anlamıyla yalnızca dilin kendi parçalarında arama yapar.
+    """
+    index = vs.index(lang_code)
+    if index is not None:
+        return [doc for doc, _ in index.search(query_vector, lang_code, RETRIEVAL_K, RETRIEVAL_SCORE_THRESHOLD)]
+    store = vs.store(lang_code)
+    if store is None:
+        return []
+
+    # as_retriever(search_type="similarity_score_threshold") ile aynı: uzaklık alaka skoruna çevrilip eşiklenir.
+    relevance_fn = store._select_relevance_score_fn()
+    results = store.similarity_search_by_vector_with_relevance_scores(
+        query_vector,
+        k=RETRIEVAL_K,
+        filter=vs.search_filter(lang_code)
     )
+    return [doc for doc, distance in results if relevance_fn(distance) >= RETRIEVAL_SCORE_THRESHOLD]
+
+
+def embed_query_within_budget(query: str, vs: LanguageShards):
+    """Sorguyu gömer; EMBEDDING_LATENCY_BUDGET_MS içinde dönmezse veya hata verirse None döndürür."""
+    future = _embedding_executor.submit(vs.embeddings.embed_query, query)
+    try:
+        return future.result(timeout=EMBEDDING_LATENCY_BUDGET_MS / 1000)
+    except FuturesTimeout:
+        # Çağrı arka planda tamamlanır ve gömme önbelleğine yazılır; bu istek BM25 ile devam eder.
+        logging.warning(f"Sorgu gömmesi {EMBEDDING_LATENCY_BUDGET_MS:.0f} ms bütçesini aştı; BM25 sonuçları kullanılıyor.")
+    except Exception as e:
+        logging.warning(f"Sorgu gömmesi başarısız ({e}); BM25 sonuçları kullanılıyor.")
+    return None
 
+
+def retrieve_documents(query: str, lang_code: str, vs: LanguageShards, query_embedding=None) -> list:
+    """
+    Yapılandırılan moda göre parçaları getirir. "vector" modunda yalnızca gömme araması yapılır;
+    "hybrid" modunda gömme ve BM25 sıralamaları birleştirilir, gömme gecikirse veya eşik nedeniyle
+    sonuç vermezse BM25 sonuçlarıyla yanıt verilir.
+    """
+    refresh_indexes_if_stale()
+    # Bilgi tabanı yeniden yüklendiyse yeni dil depoları kullanılır.
+    vs = vectorstore if vectorstore is not None else vs
+    if lexical_index is None:
+        # Sorgu gömmesi önbellekten veya eşzamanlı sorgularla birlikte tek bir toplu çağrıdan gelir.
+        query_vector = query_embedding
+        if query_vector is None:
+            with timed(stage_seconds, "embed"):
+                query_vector = vs.embeddings.embed_query(query)
+        with timed(stage_seconds, "search"):
+            return search_documents(query_vector, lang_code, vs)
+
+    with timed(stage_seconds, "lexical"):
+        lexical_docs = [doc for doc, _ in lexical_index.search(query, lang_code, RETRIEVAL_K, LEXICAL_MIN_COVERAGE)]
+    query_vector = query_embedding
+    if query_vector is None:
+        with timed(stage_seconds, "embed"):
+            query_vector = embed_query_within_budget(query, vs)
+    vector_docs = []
+    if query_vector is not None:
+        with timed(stage_seconds, "search"):
+            vector_docs = search_documents(query_vector, lang_code, vs)
+    if not vector_docs and lexical_docs:
+        logging.info(f"Gömme araması sonuç vermedi; {len(lexical_docs)} BM25 sonucu kullanılıyor ({lang_code}).")
+    return reciprocal_rank_fusion([vector_docs, lexical_docs])[:RETRIEVAL_K]
+
+
+def is_followup(query: str, lang_code: str, session) -> bool:
+    """
+    Oturumda aynı dilde önceki bir tur varsa, önceki tura gönderme yapan kısa sorgular o turun devamı sayılır.
+    Diğer sorgular bağımsızdır: yanıt önbelleği, FAQ ve birleştirme kullanılır.
+    """
+    return is_session_followup(query, lang_code, session, SESSION_FOLLOWUP_MAX_WORDS)
+
+
+def session_documents(query: str, lang_code: str, vs: LanguageShards, session) -> list:
+    """
+    Devam sorusu için parçalar: önceki parçalar sorgunun anahtar kelimelerini (varsayılan olarak tümünü)
+    kapsıyorsa yeniden kullanılır (gömme ve arama yapılmaz); aksi halde önceki soruyla birleştirilmiş sorguyla
+    yeni erişim yapılır ve sonuçlar önceki parçalarla birleştirilir. Böylece yeni bir konu, önceki turun
+    ilgisiz parçalarıyla yanıtlanmaz.
+    """
+    previous_docs = session.documents()
+    coverage = session.covers(query)
+    if previous_docs and coverage >= SESSION_REUSE_COVERAGE:
+        session_context_total.inc(mode="reuse")
+        logging.info(f"Devam sorusu: önceki {len(previous_docs)} parça yeniden kullanılıyor (kapsama {coverage:.2f}).")
+        return previous_docs
+
+    session_context_total.inc(mode="extend")
+    new_docs = retrieve_documents(f"{session.last_question} {query}", lang_code, vs)
+    logging.info(f"Devam sorusu: {len(new_docs)} yeni parça önceki {len(previous_docs)} parçayla birleştiriliyor.")
+    return reciprocal_rank_fusion([new_docs, previous_docs])[:SESSION_MAX_DOCS]
+
+
+def retrieve_context(query: str, lang_code: str, vs: LanguageShards, query_embedding=None, session=None):
+    """
+    Filtrelenmiş arama ile ilgili belgeleri çeker; bağlam metnini, benzersiz kaynakları ve parçaları döndürür.
+    Alaka düzeyini artırmak için eşik ve k değeri ayarlandı.
+    query_embedding verilmişse (ör. yanıt önbelleği için zaten hesaplandıysa) yeniden gömülmez.
+    session verilirse sorgu bir devam sorusudur; önceki turun parçaları kullanılır veya genişletilir.
+    """
     # 1. İlgili Bağlamı (Context) Çek
     try:
-        retrieved_docs = retriever.invoke(query)
+        if session is not None:
+            retrieved_docs = session_documents(query, lang_code, vs, session)
+        else:
+            retrieved_docs = retrieve_documents(query, lang_code, vs, query_embedding)
+        retrieved_chunks.observe(len(retrieved_docs))
 
         # Eğer belge gelmezse (retrieved_docs boşsa), direkt olarak bilgi bulunamadı mesajını döndür.
         if not retrieved_docs:
-            logging.warning(f"Benzerlik eşiği (0.65) nedeniyle '{query}' sorgusu için belge bulunamadı.")
+            empty_context_total.inc()
+            logging.warning(f"Benzerlik eşiği ({RETRIEVAL_SCORE_THRESHOLD}) nedeniyle '{query}' sorgusu için belge bulunamadı.")
             # Kaynak göstermeden kibarca reddetmek için boş bağlam ve kaynak döndürüyoruz.
-            return "", []
+            return "", [], []
 
 
     except Exception as e:
         logging.error(f"Retriever hatası: {e}.")
         # Teknik hata durumunda bir istisna fırlatın
-        raise Exception("Retriever'ın invoke() metodu kullanılamıyor.") from e
+        raise Exception("Belge erişimi (sorgu gömmesi veya arama) başarısız oldu.") from e
 
-    # 2. Bağlam Metnini ve Kaynakları Hazırla
-    context_text = "\n\n---\n\n".join([doc.page_content for doc in retrieved_docs])
+    # 2. Bağlam Metnini ve Kaynakları Hazırla: aynı sayfadan gelen örtüşen parçalar birleştirilir,
+    # tekrarlanan cümleler çıkarılır ve bağlam token bütçesine sığdırılır (kaynaklar benzersizdir).
+    with timed(stage_seconds, "context"):
+        context = assemble_context(retrieved_docs, CONTEXT_TOKEN_BUDGET)
+    context_chars.observe(context.chars_before, stage="retrieved")
+    context_chars.observe(context.chars_after, stage="assembled")
+    logging.info(
+        f"Bağlam: {context.chars_before} → {context.chars_after} karakter (~{context.tokens_before} → "
+        f"~{context.tokens_after} token); {context.chunks} parça → {context.passages} pasaj, "
+        f"{context.duplicate_sentences} tekrar cümle çıkarıldı{', bütçeye göre kısaltıldı' if context.truncated else ''}.")
 
-    # SADECE BENZERSİZ URL'LERİ AL ve sözlük formatında hazırla
-    unique_urls = set()
-    unique_sources = []
+    return context.text, context.sources, retrieved_docs
 
-    for doc in retrieved_docs:
-        source_url = doc.metadata.get("source")
-        # Benzersizlik kontrolü burada yapılıyor
-        if source_url and source_url not in unique_urls:
-            unique_sources.append({"url": source_url})
-            unique_urls.add(source_url)
 
-            # 3. RAG Zincirini Çalıştır
-    response = rag_chain.invoke({
+def dynamically_retrieve_and_run(query: str, lang_code: str, vs: LanguageShards, query_embedding=None, session=None):
+    """
+    Filtrelenmiş alıcıyı kullanarak RAG zincirini çalıştırır; (yanıt, kaynaklar, parçalar) döndürür.
+    Bağlam bulunamazsa boş yanıt ve boş kaynak listesi döner. session verilirse (devam sorusu)
+    konuşma geçmişi isteme eklenir.
+    """
+    global rag_chain
+
+    context_text, unique_sources, docs = retrieve_context(query, lang_code, vs, query_embedding, session)
+    if not context_text:
+        return "", [], []
+
+    # 3. RAG Zincirini Çalıştır (eşzamanlı Gemini çağrıları sınırlıdır)
+    history = conversation_history(session)
+    observe_prompt_size(query, context_text, lang_code, history)
+    inputs = {
         "question": query,
         "context": context_text,
-        "lang_code": lang_code
-    })
+        "lang_code": lang_code,
+        "history": history
+    }
+    with timed(stage_seconds, "llm"):
+        response = call_with_deadline(_llm_executor, llm_limiter, lambda: rag_chain.invoke(inputs),
+                                      request_time_left())
+
+    return response, unique_sources, docs
+
+
+def conversation_history(session) -> str:
+    """İstemdeki {history} alanı; bağımsız sorularda geçmiş eklenmez (yanıtlar önbelleğe alınabilir kalır)."""
+    return session.history() if session is not None else "(none)"
+
+
+def observe_prompt_size(query: str, context_text: str, lang_code: str, history: str):
+    """LLM'e gidecek istemin karakter sayısını metriklere ekler."""
+    if rag_prompt is not None:
+        prompt_chars.observe(len(rag_prompt.format(question=query, context=context_text, lang_code=lang_code,
+                                                   history=history)))
+
 
-    return response, unique_sources
+def get_fallback_response(lang_code: str) -> str:
+    """Bağlam bulunamadığında LLM'e gitmeden döndürülecek kibar mesajı oluşturur."""
+    # Yanıtı LLM'den almak yerine manuel olarak oluşturuyoruz (kibarlık prompt'taki gibi)
+    if lang_code == "es":
+        return "No tengo información sobre la definición específica de esa pregunta en el contexto proporcionado. Le sugiero que se ponga en contacto con la clínica a través de su sitio web o WhatsApp para obtener más detalles."
+    elif lang_code == "tr":
+        # Türkçe sorgu geldiği için Türkçe fallback mesajını netleştirdim.
+        return "Sağlanan bağlamda bu sorunun spesifik tanımı hakkında bilgim yok. Daha fazla ayrıntı için lütfen web sitemiz veya WhatsApp aracılığıyla klinik ile iletişime geçiniz."
+    else:
+        return "I do not have information about the specific definition of that question in the provided context. I suggest you contact the clinic via their website or WhatsApp for more details."
+
+
+def lookup_cached_answer(query: str, lang_code: str):
+    """
+    Yanıt önbelleğine bakar: önce birebir eşleşme, ardından (açıksa) gömme benzerliği.
+    (önbellek kaydı veya None, hesaplandıysa sorgu gömmesi) döndürür.
+    """
+    with timed(stage_seconds, "cache_lookup"):
+        cached = answer_cache.get(lang_code, query)
+    query_embedding = None
+    if cached is None and answer_cache.similarity_enabled:
+        try:
+            with timed(stage_seconds, "embed"):
+                query_embedding = vectorstore.embeddings.embed_query(query)
+            cached = answer_cache.get_similar(lang_code, query_embedding)
+        except Exception as e:
+            logging.warning(f"Önbellek için sorgu gömmesi alınamadı, atlanıyor: {e}")
+    return cached, query_embedding
+
+
+def lookup_faq_answer(query: str, lang_code: str, query_embedding=None):
+    """
+    Hazır FAQ yanıtlarına bakar: önce birebir eşleşme, ardından (açıksa) gömme benzerliği.
+    (yanıt veya None, durum, sorgu gömmesi) döndürür; hesaplanan gömme erişimde yeniden kullanılır.
+    """
+    with timed(stage_seconds, "faq_lookup"):
+        faq = faq_store.get(lang_code, query)
+    if faq is not None:
+        return faq, "faq", query_embedding
+    if faq_store.similarity_enabled and faq_store.has_language(lang_code):
+        try:
+            if query_embedding is None:
+                with timed(stage_seconds, "embed"):
+                    query_embedding = vectorstore.embeddings.embed_query(query)
+            faq = faq_store.get_similar(lang_code, query, query_embedding)
+        except Exception as e:
+            logging.warning(f"FAQ araması için sorgu gömmesi alınamadı, atlanıyor: {e}")
+    return faq, "faq_similar" if faq is not None else None, query_embedding
+
+
+def cache_status(cached, query_embedding) -> str:
+    """lookup_cached_answer sonucundan istek kaydı için önbellek durumunu türetir."""
+    if cached is None:
+        return "miss"
+    # Birebir eşleşmede gömme hesaplanmaz; gömme varsa kayıt benzerlik katmanından gelmiştir.
+    return "similar" if query_embedding is not None else "hit"
+
+
+def source_urls(sources: list[dict]) -> list[str]:
+    return [source.get("url") for source in sources]
+
+
+def finish_request(record: dict, answer: str | None, timings: dict, start: float):
+    """İstek bitiminde metrikleri günceller ve yapılandırılmış istek kaydını yazar."""
+    total = time.perf_counter() - start
+    timings["total"] = total
+    stage_seconds.observe(total, stage="total")
+    requests_total.inc(endpoint=record["endpoint"], status=record["status"])
+    if record["cache"] is not None:
+        cache_lookups_total.inc(result=record["cache"])
+    if answer is not None:
+        answer_chars.observe(len(answer))
+    record["duration_ms"] = round(total * 1000, 1)
+    record["timings"] = timings_ms(timings)
+    request_log.log(record, answer)
 
 
 # =========================================================================
 # FLASK ENDPOINTLERİ
 # =========================================================================
 
+# Sağlık kontrolleri ve metrikler RAG yüklemesini tetiklememeli ve yükleme sürerken beklememelidir.
+HEALTH_CHECK_PATHS = ('/healthz', '/readyz', '/metrics')
+
+
+@app.before_request
+def start_request_timings():
+    """Her istek kendi aşama süreleri sözlüğüyle başlar (dil tespiti gibi en erken ölçümler dahil)."""
+    g.stage_timings = {}
+    g.stage_timings_token = bind_request_timings(g.stage_timings)
+
+
+@app.teardown_request
+def end_request_timings(error=None):
+    """İstek bitince aşama süreleri bağını geri alır; iş parçacığı yeniden kullanıldığında süreler karışmaz."""
+    token = g.pop("stage_timings_token", None)
+    if token is not None:
+        reset_request_timings(token)
+
+
+@app.before_request
+def start_request_deadline():
+    """İsteğin bitmesi gereken anı (REQUEST_TIMEOUT_SECONDS) kaydeder; LLM çağrıları kalan süreyle beklenir."""
+    g.request_deadline = time.monotonic() + REQUEST_TIMEOUT_SECONDS
+
+
+def request_time_left() -> float:
+    """Geçerli isteğin kalan süresi (sn); istek bağlamı dışında (ör. build_faq.py) tam süre."""
+    deadline = g.get("request_deadline") if has_request_context() else None
+    return REQUEST_TIMEOUT_SECONDS if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
 @app.before_request
 def check_rag_status():
     """Her istekten önce RAG sisteminin yüklü olup olmadığını kontrol eder."""
+    if request.path in HEALTH_CHECK_PATHS:
+        return None
     # API Key kontrolü zaten başlangıçta yapıldığı için, sadece RAG'in yüklü olup olmadığına bakalım.
-    if rag_chain is None or vectorstore is None:
-        initialize_rag_system()
+    if not ensure_rag_initialized():
         # Hala yüklenmediyse
-        if rag_chain is None or vectorstore is None:
-            if request.path.startswith('/chat'):
-                # API key/DB yükleme hatası varsa 503 döndür
-                return jsonify({
-                    "response": "Server Error: AI system is not initialized. Please check the server logs for API Key or ChromaDB errors.",
-                    "sources": []}), 503
+        if request.path.startswith('/chat'):
+            # API key/DB yükleme hatası varsa 503 döndür
+            return jsonify({
+                "response": "Server Error: AI system is not initialized. Please check the server logs for API Key or ChromaDB errors.",
+                "sources": []}), 503
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Canlılık kontrolü: süreç ayakta ve istek kabul ediyor."""
+    return jsonify({"status": "ok", "pid": os.getpid()}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Hazırlık kontrolü: yalnızca RAG bileşenleri yüklüyse 200 döner (yük dengeleyici için)."""
+    ready = rag_chain is not None and vectorstore is not None
+    state = dict(init_state, timings=dict(init_state["timings"]))
+    return jsonify({"ready": ready, **state}), 200 if ready else 503
 
 
 @app.route('/chat', methods=['POST'])
@@ -243,305 +846,330 @@ def chat():
     logging.info(f"--- YENİ SORGULAMA ---")
     logging.info(f"Kullanıcı Sorgusu: '{query}'")
 
+    start = time.perf_counter()
+    record = {"endpoint": "chat", "query": query, "lang": None, "cache": None, "status": "incomplete", "sources": []}
+    answer = None
+
     try:
-        # 1. Dil Tespiti
+        # 1. Dil Tespiti (sabitlenmiş işçide yalnızca sunulan diller yanıtlanır)
         lang_code = detect_and_filter(query)
-
-        # 2. Dinamik RAG İşlemini Gerçekleştir
-        response, sources = dynamically_retrieve_and_run(query, lang_code, vectorstore)
+        record["lang"] = lang_code
+        if not vectorstore.serves(lang_code):
+            record["status"] = "misdirected"
+            return misdirected_response(lang_code)
+
+        # 1.1. Oturum: kısa devam soruları önceki turun bağlamıyla ve konuşma geçmişiyle yanıtlanır.
+        # Bu yanıtlar geçmişe bağlı olduğundan önbellek, FAQ ve birleştirme atlanır.
+        session = sessions.get(data.get('session_id'))
+        if is_followup(query, lang_code, session):
+            record["followup"] = True
+            response, sources, docs = dynamically_retrieve_and_run(query, lang_code, vectorstore, session=session)
+            record["status"] = "ok" if response else "fallback"
+            answer = response or get_fallback_response(lang_code)
+            record["sources"] = source_urls(sources)
+            session_id = sessions.record_turn(data.get('session_id'), lang_code, query, answer, docs)
+            return jsonify({"response": answer, "sources": sources, "session_id": session_id})
+
+        # 1.2. Yanıt Önbelleği
+        cached, query_embedding = lookup_cached_answer(query, lang_code)
+        record["cache"] = cache_status(cached, query_embedding)
+        if cached is not None:
+            logging.info(f"Yanıt önbellekten döndürüldü ({lang_code}).")
+            answer = cached.response
+            record.update(status="ok", sources=source_urls(cached.sources))
+            session_id = sessions.record_turn(data.get('session_id'), lang_code, query, answer, [])
+            return jsonify({"response": cached.response, "sources": cached.sources, "session_id": session_id})
+
+        # 1.3. Hazır FAQ Yanıtları (sık sorulan sorular çevrimdışı üretilmiştir)
+        faq, faq_status, query_embedding = lookup_faq_answer(query, lang_code, query_embedding)
+        if faq is not None:
+            logging.info(f"Hazır FAQ yanıtı döndürüldü ({lang_code}): '{faq.query}'")
+            answer = faq.response
+            record.update(status="ok", cache=faq_status, sources=source_urls(faq.sources))
+            session_id = sessions.record_turn(data.get('session_id'), lang_code, query, answer, [])
+            return jsonify({"response": faq.response, "sources": faq.sources, "session_id": session_id})
+
+        # 2. Dinamik RAG İşlemini Gerçekleştir (aynı anda sorulan aynı sorular tek çağrıyı paylaşır)
+        (response, sources, docs), coalesced = single_flight.do(
+            (lang_code, normalize_query(query)),
+            lambda: dynamically_retrieve_and_run(query, lang_code, vectorstore, query_embedding)
+        )
+        record["coalesced"] = coalesced
+        if coalesced:
+            logging.info(f"Sorgu, devam eden özdeş bir istekle birleştirildi ({lang_code}).")
 
         # 2.1. Eğer response boşsa, fallback mesajını manuel olarak oluştur.
+        record["status"] = "ok" if response else "fallback"
         if not response:
-            # Yanıtı LLM'den almak yerine manuel olarak oluşturuyoruz (kibarlık prompt'taki gibi)
-            if lang_code == "es":
-                response = "No tengo información sobre la definición específica de esa pregunta en el contexto proporcionado. Le sugiero que se ponga en contacto con la clínica a través de su sitio web o WhatsApp para obtener más detalles."
-            elif lang_code == "tr":
-                # Türkçe sorgu geldiği için Türkçe fallback mesajını netleştirdim.
-                response = "Sağlanan bağlamda bu sorunun spesifik tanımı hakkında bilgim yok. Daha fazla ayrıntı için lütfen web sitemiz veya WhatsApp aracılığıyla klinik ile iletişime geçiniz."
-            else:
-                response = "I do not have information about the specific definition of that question in the provided context. I suggest you contact the clinic via their website or WhatsApp for more details."
+            response = get_fallback_response(lang_code)
 
-        logging.info(f"AI Yanıtı: '{response}'")
+        answer = response
+        record["sources"] = source_urls(sources)
+        answer_cache.put(lang_code, query, response, sources, embedding=query_embedding)
+        session_id = sessions.record_turn(data.get('session_id'), lang_code, query, response, docs)
 
         # Başarılı yanıtı döndür
-        return jsonify({"response": response, "sources": sources})
+        return jsonify({"response": response, "sources": sources, "session_id": session_id})
+
+    except OverloadedError as e:
+        logging.warning(f"Aşırı yük nedeniyle istek reddedildi: {e}")
+        record["status"] = "overloaded"
+        return overloaded_response(e)
+
+    except DeadlineExceededError as e:
+        logging.error(f"İstek süresi doldu: {e}")
+        record["status"] = "timeout"
+        return timeout_response()
 
     except Exception as e:
         logging.error(f"Sorgu işlenirken beklenmeyen kritik hata oluştu: {e}")
+        record.update(status="error", error=str(e))
         # Hata durumunda kullanıcıya bilgilendirici mesaj döndür
         return jsonify({
             "response": f"I apologize, an internal error occurred while processing your request. Please try again later. Check the server log for details. Detailed Error: {str(e)}",
             "sources": []}), 500
 
+    finally:
+        finish_request(record, answer, g.stage_timings, start)
 
-# Basit bir endpoint ile log tutma
-@app.route('/log_query', methods=['POST'])
-def log_query():
-    """Client tarafından gelen basit logları kaydeder."""
-    data = request.json
-    log_query = data.get('query', '')
-    log_status = data.get('status', 'INFO')
 
-    if log_status == 'ERROR':
-        logging.error(f"Client Log: {log_query}")
-    else:
-        logging.info(f"Client Log: {log_query} - Status: {log_status}")
+OVERLOADED_MESSAGE = "The assistant is handling many requests right now. Please try again in a moment."
+MISDIRECTED_MESSAGE = "This server does not serve questions in this language."
+TIMEOUT_MESSAGE = "The assistant took too long to answer. Please try again."
 
-    return jsonify({"status": "logged"}), 200
 
+def overloaded_response(error: OverloadedError):
+    """Aşırı yük durumunda istemciye hızlıca 503 ve Retry-After döndürür."""
+    return jsonify({
+        "response": OVERLOADED_MESSAGE,
+        "sources": []}), 503, {'Retry-After': str(error.retry_after)}
 
-# Uygulama arayüzünü sunan ana endpoint
-@app.route('/')
-def serve_index():
-    """Ana HTML dosyasını sunar."""
-    try:
-        html_content = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>SAVA CLINIC AI Assistant</title>
-    <!-- Tailwind CSS'i yüklüyoruz -->
-    <script src="https://cdn.tailwindcss.com"></script>
-    <style>
-        /* Varsayılan font olarak Inter'ı kullanıyoruz */
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@100..900&display=swap');
-        body {
-            font-family: 'Inter', sans-serif;
-            background-color: #f0f4f8; /* Açık arkaplan rengi */
-        }
-        /* Başlık arka plan rengini görsele göre ayarlıyoruz */
-        .header-bg {
-            background-color: #19365E; /* Koyu Mavi */
-        }
-        .chat-container {
-            max-height: 55vh; /* Görseldeki boyuta yakın bir yükseklik */
-            overflow-y: auto;
-            scroll-behavior: smooth;
-        }
-        /* Mesaj kutularının genel stili */
-        .message-box {
-            padding: 1rem;
-            border-radius: 0.75rem;
-            margin-bottom: 0.75rem;
-            box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
-            max-width: 85%;
-            word-wrap: break-word; /* Uzun metinler için */
-        }
-        /* Kullanıcı mesajı stili */
-        .user-message {
-            background-color: #4A70AD; /* Mavi - Kullanıcı mesajı rengi */
-            color: white;
-            align-self: flex-end;
-            margin-left: auto;
-        }
-        /* AI mesajı stili */
-        .ai-message {
-            background-color: #F8F9FA; /* Hafif Gri/Beyaz */
-            color: #333;
-            align-self: flex-start;
-            border: 1px solid #E0E0E0;
-            margin-right: auto;
-            /* İlk karşılama mesajının özel stili */
-            line-height: 1.5;
-        }
-        /* Yükleniyor animasyonu */
-        .loading-dots div {
-            animation: pulse 1.5s infinite ease-in-out;
-        }
-        .loading-dots div:nth-child(2) {
-            animation-delay: 0.5s;
-        }
-        .loading-dots div:nth-child(3) {
-            animation-delay: 1s;
-        }
-        @keyframes pulse {
-            0%, 100% { transform: scale(1); opacity: 1; }
-            50% { transform: scale(1.2); opacity: 0.5; }
-        }
-        /* Kaynak link stili */
-        .source-link {
-            color: #2563eb;
-            text-decoration: underline;
-            font-size: 0.75rem; /* text-xs */
-        }
-    </style>
-</head>
-<body class="flex items-center justify-center min-h-screen p-4">
-
-    <!-- Ana Konteyner -->
-    <div class="w-full max-w-xl bg-white rounded-xl shadow-2xl flex flex-col h-[70vh] overflow-hidden">
-
-        <!-- Başlık Bölümü (Koyu Mavi) -->
-        <header class="p-4 header-bg flex items-center justify-center rounded-t-xl">
-            <h1 class="text-xl font-bold text-white">SAVA CLINIC AI Assistant</h1>
-        </header>
-
-        <!-- Sohbet Alanı -->
-        <div id="chat-messages" class="flex-grow p-5 chat-container flex flex-col">
-            <!-- İlk Karşılama Mesajı (Görseldeki gibi) -->
-            <div class="message-box ai-message">
-                <p class="whitespace-pre-wrap">Hello! I am SAVA CLINIC's expert health assistant. Please ask a question about our health services.</p>
-            </div>
-            <!-- Dinamik Mesajlar buraya eklenecek -->
-        </div>
-
-        <!-- Giriş Bölümü -->
-        <div class="p-5 border-t border-gray-200 bg-white flex items-center rounded-b-xl">
-            <input type="text" id="user-input" placeholder="Ask your question here..." class="flex-grow p-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-blue-500 focus:border-blue-500 transition duration-150 ease-in-out shadow-sm" autocomplete="off">
-            <button id="send-button" class="ml-3 px-6 py-3 header-bg text-white font-semibold rounded-xl hover:bg-opacity-90 transition duration-150 ease-in-out shadow-md disabled:opacity-70">
-                Send
-            </button>
-        </div>
-    </div>
-
-    <!-- JavaScript Kodu -->
-    <script>
-        const chatMessages = document.getElementById('chat-messages');
-        const userInput = document.getElementById('user-input');
-        const sendButton = document.getElementById('send-button');
-
-        // Sunucunun 5001 portunda çalıştığını varsayarak mutlak URL kullanıyoruz
-        const API_URL = 'http://127.0.0.1:5001/chat'; 
-
-        // Mesaj kutusu oluşturma
-        function createMessageBox(text, type, sources = []) {
-            const box = document.createElement('div');
-            box.classList.add('message-box', type === 'user' ? 'user-message' : 'ai-message');
-
-            // Basit metin formatlama
-            let formattedText = text.replace(/\\n/g, '<br>'); // Yeni satırları düzelt
-            formattedText = formattedText.replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>'); // **Koyu Yazı**
-
-            box.innerHTML = formattedText;
-
-            // Kaynakları mesaj kutusunun altında, ayrı bir bölümde göster
-            if (type === 'ai' && sources.length > 0) {
-                const sourcesDiv = document.createElement('div');
-                sourcesDiv.classList.add('mt-2', 'pt-2', 'border-t', 'border-gray-200', 'text-xs', 'text-gray-500');
-                sourcesDiv.innerHTML = '<strong>Sources:</strong>';
-
-                sources.forEach(source => {
-                    // Kaynak nesnesi {url: "..."} formatındadır.
-                    const sourceUrl = source.url; 
-                    const link = document.createElement('a');
-                    link.href = sourceUrl;
-                    link.textContent = sourceUrl; // Tam URL göster
-                    link.target = '_blank';
-                    link.classList.add('source-link', 'block', 'truncate');
-                    sourcesDiv.appendChild(link);
-                });
-                box.appendChild(sourcesDiv);
-            }
-
-            chatMessages.appendChild(box);
-            // En alta kaydır
-            chatMessages.scrollTop = chatMessages.scrollHeight;
-        }
-
-        // Yükleniyor animasyonu oluşturma
-        function createLoadingIndicator() {
-            const loadingBox = document.createElement('div');
-            loadingBox.id = 'loading-indicator';
-            loadingBox.classList.add('message-box', 'ai-message', 'flex', 'items-center', 'space-x-1', 'loading-dots');
-            loadingBox.innerHTML = `
-                <div class="w-2 h-2 bg-blue-500 rounded-full"></div>
-                <div class="w-2 h-2 bg-blue-500 rounded-full"></div>
-                <div class="w-2 h-2 bg-blue-500 rounded-full"></div>
-            `;
-            chatMessages.appendChild(loadingBox);
-            chatMessages.scrollTop = chatMessages.scrollHeight;
-        }
-
-        // Yükleniyor animasyonunu kaldırma
-        function removeLoadingIndicator() {
-            const indicator = document.getElementById('loading-indicator');
-            if (indicator) {
-                indicator.remove();
-            }
-        }
-
-        // API'ye sorgu gönderme
-        async function sendQuery() {
-            const query = userInput.value.trim();
-            if (!query) return;
-
-            // 1. Kullanıcı mesajını ekle
-            createMessageBox(query, 'user');
-
-            // 2. Girişi temizle ve butonu devre dışı bırak
-            userInput.value = '';
-            sendButton.disabled = true;
-
-            // 3. Yükleniyor animasyonunu göster
-            createLoadingIndicator();
-
-            try {
-                // Flask sunucusuna POST isteği - 5001 portunu kullanıyoruz
-                const response = await fetch(API_URL, { 
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ query: query })
-                });
-
-                removeLoadingIndicator();
-                sendButton.disabled = false;
-
-                // HTTP 200/201 kontrolü
-                if (!response.ok) {
-                    const errorText = await response.text();
-                    let errorData;
-                    try {
-                        errorData = JSON.parse(errorText);
-                    } catch (e) {
-                        errorData = { response: `Server returned status ${response.status}. Could not parse error details.` };
-                    }
-
-                    createMessageBox(`Error (HTTP ${response.status}): ${errorData.response || 'Could not reach server or server provided a non-JSON error.'}`, 'ai');
-                    console.error('API Error:', errorData);
-                    return;
-                }
 
-                const data = await response.json();
+def timeout_response():
+    """İstek süresi (REQUEST_TIMEOUT_SECONDS) dolduğunda 504 döndürür."""
+    return jsonify({
+        "response": TIMEOUT_MESSAGE,
+        "sources": []}), 504
 
-                // 4. AI yanıtını ve kaynakları ekle
-                const sources = data.sources || [];
 
-                // NOT: Yanıtın içinde "Sources:" metni artık sunucu tarafında eklenmiyor.
-                // Sadece temiz metin alınıyor. Kaynaklar "sources" array'i içinde geliyor.
-                createMessageBox(data.response, 'ai', sources);
+def misdirected_response(lang_code: str):
+    """
+    Sorgu bu işçinin sunmadığı (SERVE_LANGS dışındaki) bir dilde: dil bazlı yönlendirme yapan ön katmanın
+    isteği doğru işçiye aktarabilmesi için 421 ve tespit edilen dil döndürülür.
+    """
+    logging.warning(f"'{lang_code}' dili bu işçide sunulmuyor (sunulan diller: {vectorstore.langs}).")
+    return jsonify({
+        "response": MISDIRECTED_MESSAGE,
+        "sources": [],
+        "lang": lang_code}), 421, {'Content-Language': lang_code}
 
-            } catch (error) {
-                removeLoadingIndicator();
-                sendButton.disabled = false;
-                console.error('Request Error:', error);
-                // Eğer sunucuya hiç ulaşılamadıysa (CORS, network hatası vb.)
-                createMessageBox(`Connection Error: Could not reach the server at ${API_URL}. (Is Flask running on 5001?)`, 'ai');
-            }
-        }
 
-        // Olay dinleyicileri
-        sendButton.addEventListener('click', sendQuery);
-        userInput.addEventListener('keydown', (event) => {
-            if (event.key === 'Enter') {
-                event.preventDefault(); // Varsayılan form gönderme davranışını engelle
-                sendQuery();
-            }
-        });
+def _stream_event(event: dict) -> str:
+    """Akış olayını tek satırlık JSON (NDJSON) olarak kodlar."""
+    return json.dumps(event, ensure_ascii=False) + "\n"
 
-    </script>
 
-</body>
-</html>
-        """
-        return html_content, 200, {'Content-Type': 'text/html'}
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    /chat ile aynı RAG akışını token token yayınlar (application/x-ndjson).
+    Olay sırası: "sources" (erişim biter bitmez), ardından "token" parçaları, en sonda "done" veya "error".
+    """
+    data = request.json
+    query = data.get('query', '').strip()
 
-    except Exception as e:
-        logging.error(f"HTML arayüzü sunulurken hata: {e}")
+    if not query:
+        return jsonify({"response": "Please enter a valid question.", "sources": []}), 400
+
+    logging.info(f"--- YENİ SORGULAMA (AKIŞ) ---")
+    logging.info(f"Kullanıcı Sorgusu: '{query}'")
+    session_id = data.get('session_id')
+
+    # 1. Dil Tespiti: akış başlamadan yapılır ki sunulmayan bir dil için 421 dönülebilsin.
+    start = time.perf_counter()
+    timings = g.stage_timings
+    lang_code = detect_and_filter(query)
+    if not vectorstore.serves(lang_code):
+        finish_request({"endpoint": "chat_stream", "query": query, "lang": lang_code, "cache": None,
+                        "status": "misdirected", "sources": []}, None, timings, start)
+        return misdirected_response(lang_code)
+
+    def generate():
+        record = {"endpoint": "chat_stream", "query": query, "lang": lang_code, "cache": None, "status": "incomplete",
+                  "sources": []}
+        answer = None
+        # Akış, görünümden döndükten sonra tüketilir; süreler bu isteğin sözlüğüne yazılsın diye yeniden bağlanır.
+        timings_token = bind_request_timings(timings)
+        try:
+            # 1.1. Oturum (devam soruları önbellek/FAQ'a bakmadan önceki bağlamla yanıtlanır)
+            session = sessions.get(session_id)
+            followup = is_followup(query, lang_code, session)
+            query_embedding = None
+            if followup:
+                record["followup"] = True
+            else:
+                session = None
+                # 1.2. Yanıt Önbelleği ve Hazır FAQ Yanıtları
+                cached, query_embedding = lookup_cached_answer(query, lang_code)
+                record["cache"] = cache_status(cached, query_embedding)
+                faq, faq_status = None, None
+                if cached is None:
+                    faq, faq_status, query_embedding = lookup_faq_answer(query, lang_code, query_embedding)
+                ready = cached or faq
+                if ready is not None:
+                    if cached is not None:
+                        logging.info(f"Yanıt önbellekten döndürüldü ({lang_code}).")
+                    else:
+                        logging.info(f"Hazır FAQ yanıtı döndürüldü ({lang_code}): '{faq.query}'")
+                        record["cache"] = faq_status
+                    answer = ready.response
+                    record.update(status="ok", sources=source_urls(ready.sources))
+                    new_session_id = sessions.record_turn(session_id, lang_code, query, answer, [])
+                    yield _stream_event({"type": "sources", "sources": ready.sources, "lang": lang_code})
+                    yield _stream_event({"type": "token", "text": ready.response})
+                    yield _stream_event({"type": "done", "timings": timings_ms(timings), "session_id": new_session_id})
+                    return
+
+            # 2. Erişim tamamlanır tamamlanmaz kaynakları gönder
+            context_text, sources, docs = retrieve_context(query, lang_code, vectorstore, query_embedding, session)
+            record["sources"] = source_urls(sources)
+            yield _stream_event({"type": "sources", "sources": sources, "lang": lang_code})
+
+            # 3. Yanıtı parça parça gönder
+            if not context_text:
+                response = get_fallback_response(lang_code)
+                record["status"] = "fallback"
+                yield _stream_event({"type": "token", "text": response})
+            else:
+                parts = []
+                history = conversation_history(session)
+                observe_prompt_size(query, context_text, lang_code, history)
+                llm_start = time.perf_counter()
+                inputs = {
+                    "question": query,
+                    "context": context_text,
+                    "lang_code": lang_code,
+                    "history": history
+                }
+                with timed(stage_seconds, "llm"):
+                    for token in iterate_with_deadline(_llm_executor, llm_limiter, lambda: rag_chain.stream(inputs),
+                                                       request_time_left()):
+                        if token:
+                            if not parts:
+                                # İlk token'a kadar geçen süre (kuyruk beklemesi dahil)
+                                first_token = time.perf_counter() - llm_start
+                                timings["llm_first_token"] = first_token
+                                stage_seconds.observe(first_token, stage="llm_first_token")
+                            parts.append(token)
+                            yield _stream_event({"type": "token", "text": token})
+                response = "".join(parts)
+                record["status"] = "ok"
+
+            answer = response
+            if not followup:
+                answer_cache.put(lang_code, query, response, sources, embedding=query_embedding)
+            new_session_id = sessions.record_turn(session_id, lang_code, query, response, docs)
+            yield _stream_event({"type": "done", "timings": timings_ms(timings), "session_id": new_session_id})
+
+        except OverloadedError as e:
+            logging.warning(f"Aşırı yük nedeniyle akışlı istek reddedildi: {e}")
+            record["status"] = "overloaded"
+            yield _stream_event({
+                "type": "error",
+                "response": OVERLOADED_MESSAGE
+            })
+
+        except DeadlineExceededError as e:
+            logging.error(f"Akışlı isteğin süresi doldu: {e}")
+            record["status"] = "timeout"
+            yield _stream_event({
+                "type": "error",
+                "response": TIMEOUT_MESSAGE
+            })
+
+        except Exception as e:
+            logging.error(f"Akışlı sorgu işlenirken beklenmeyen kritik hata oluştu: {e}")
+            record.update(status="error", error=str(e))
+            yield _stream_event({
+                "type": "error",
+                "response": "I apologize, an internal error occurred while processing your request. Please try again later."
+            })
+
+        finally:
+            # İstemci akışı yarıda keserse durum "incomplete" olarak kalır.
+            finish_request(record, answer, timings, start)
+            reset_request_timings(timings_token)
+
+    # Ara katmanların (ör. nginx) akışı tamponlamaması için başlıklar
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# İstemci loglarını istek kayıtlarıyla aynı (kuyruk tabanlı) hatta yazan endpoint
+@app.route('/log_query', methods=['POST'])
+def log_query():
+    """
+    Client tarafından gelen logları kaydeder. Tek bir kayıt ({"query", "status", ...}) veya
+    toplu gönderim ({"logs": [...]} ya da liste) kabul edilir.
+    """
+    data = request.get_json(silent=True)
+    entries = data.get("logs", [data]) if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return jsonify({"status": "invalid"}), 400
+    if len(entries) > CLIENT_LOG_MAX_BATCH:
+        return jsonify({"status": "too_many", "max": CLIENT_LOG_MAX_BATCH}), 413
+
+    for entry in entries:
+        request_log.log({
+            "endpoint": "client",
+            "query": entry.get("query", ""),
+            "status": entry.get("status", "INFO"),
+            "client_ts": entry.get("ts"),
+            "client_duration_ms": entry.get("duration_ms")
+        }, entry.get("response") if isinstance(entry.get("response"), str) else None)
+
+    return jsonify({"status": "logged", "count": len(entries)}), 200
+
+
+@app.after_request
+def add_server_timing(response):
+    """Akış olmayan yanıtlara aşama sürelerini Server-Timing başlığı olarak ekler."""
+    timings = g.get("stage_timings")
+    if timings and not response.is_streamed:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Aşama süreleri, sayaçlar ve göstergeleri Prometheus metin biçiminde döndürür."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Önbellek boyutlandırması için isabet/ıska sayaçları
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Çalışma zamanı sayaçlarını JSON olarak döndürür."""
+    return jsonify({
+        "answer_cache": answer_cache.stats(),
+        "faq_store": faq_store.stats(),
+        "sessions": sessions.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "coalescing": single_flight.stats(),
+        "language_detector": language_detector.stats(),
+        "logging": log_pipeline.stats(),
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "shards": vectorstore.stats() if vectorstore is not None else None
+    }), 200
+
+
+# Uygulama arayüzünü sunan ana endpoint
+@app.route('/')
+def serve_index():
+    """Ana HTML dosyasını (index.html) ETag, Cache-Control ve önceden sıkıştırılmış varyantlarla sunar."""
+    if index_page is None:
         return "Internal Server Error", 500
+    return index_page.response(request)
 
 
 if __name__ == '__main__':
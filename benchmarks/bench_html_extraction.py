@@ -0,0 +1,90 @@
+"""
+Kaydedilmiş klinik sayfaları üzerinde ana içerik çıkarma yollarını karşılaştırır: sayfa/sn, MB/sn, sayfa başına
+tepe bellek (tracemalloc) ve referans yolla (tüm sayfa html.parser) birebir aynı metin üretilip üretilmediği.
+Ağ erişimi gerektirmez; sayfalar önce `crawl_fixture.py save` ile kaydedilmelidir.
+
+Kullanım:
+    python benchmarks/crawl_fixture.py save --pages-dir saved_pages/
+    python benchmarks/bench_html_extraction.py --pages-dir saved_pages/ --repeat 5
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_extraction  # noqa: E402
+from html_extraction import LXML_AVAILABLE, extract_fast, extract_reference  # noqa: E402
+
+
+def load_pages(pages_dir: str) -> list[tuple[str, bytes]]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def measure_memory(extract, pages) -> tuple[float, float]:
+    """Sayfa başına tracemalloc tepe değerinin ortalaması ve en büyüğü (MB)."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _, content in pages:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            extract(content)
+            peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024 / 1024)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks), max(peaks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages-dir", default="saved_pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir)
+    if not pages:
+        sys.exit(f"{args.pages_dir} altında .html bulunamadı; önce `python benchmarks/crawl_fixture.py save` çalıştırın.")
+    total_mb = sum(len(content) for _, content in pages) / 1024 / 1024
+    print(f"{len(pages)} sayfa, toplam {total_mb:.1f} MB\n")
+
+    engines = {
+        "referans (html.parser, tüm sayfa)": extract_reference,
+        "hızlı (html.parser, süzülmüş)": lambda content: extract_fast(content, "html.parser"),
+    }
+    if LXML_AVAILABLE:
+        engines["hızlı (lxml, süzülmüş)"] = lambda content: extract_fast(content, "lxml")
+    else:
+        print("lxml kurulu değil; lxml yolu atlanıyor.\n")
+
+    expected = {name: extract_reference(content) for name, content in pages}
+    reference_seconds = None
+    for label, extract in engines.items():
+        html_extraction.extraction_counts.clear()
+        mismatched = [name for name, content in pages if extract(content) != expected[name]]
+        fallbacks = html_extraction.extraction_counts["full_parse_fallback"]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, content in pages:
+                extract(content)
+        seconds = (time.perf_counter() - start) / args.repeat
+        reference_seconds = reference_seconds or seconds
+        mean_mb, max_mb = measure_memory(extract, pages)
+
+        print(f"{label}:")
+        print(f"  {len(pages) / seconds:.1f} sayfa/sn, {total_mb / seconds:.1f} MB/sn, "
+              f"referansa göre {reference_seconds / seconds:.2f}x")
+        print(f"  sayfa başına tepe bellek: ortalama {mean_mb:.2f} MB, en fazla {max_mb:.2f} MB")
+        print(f"  referansla aynı metin: {len(pages) - len(mismatched)}/{len(pages)}"
+              + (f", tam ayrıştırmaya düşülen sayfa: {fallbacks}" if fallbacks else ""))
+        for name in mismatched[:5]:
+            print(f"    farklı: {name}")
+        print()
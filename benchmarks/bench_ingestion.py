@@ -0,0 +1,74 @@
+"""
+Parti halinde, hız sınırlı ve kontrol noktalı gömme motorunu sahte bir gömme fonksiyonuyla ölçer.
+Yarıda kesilen bir çalıştırmanın kontrol noktasından devam ettiğini de doğrular.
+
+Kullanım:
+    python benchmarks/bench_ingestion.py --chunks 3000 --latency 0.2 --failure-rate 0.05
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+import chromadb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document  # noqa: E402
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from indexing import chunk_id  # noqa: E402
+from ingestion import ingest_documents  # noqa: E402
+
+
+def make_documents(count: int) -> dict[str, Document]:
+    documents = {}
+    for i in range(count):
+        url = f"https://savaclinic.com/page-{i // 20}/"
+        doc = Document(page_content=f"Sahte parça {i} " + "lorem ipsum " * 40, metadata={"source": url, "lang": "en"})
+        documents[chunk_id(url, doc.page_content)] = doc
+    return documents
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=0.0, help="İstek/sn sınırı (0 = sınırsız)")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    documents = make_documents(args.chunks)
+    collection = chromadb.EphemeralClient().get_or_create_collection("bench_ingestion")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint_path = os.path.join(tmp, "checkpoint.json")
+
+        # 1. Kesinti simülasyonu: her çağrısı başarısız olan gömücü ile ilk çalıştırma yarıda kalır
+        class Interrupted(FakeEmbeddings):
+            def embed_documents(self, texts):
+                if len(self.batch_sizes) >= 3:
+                    raise KeyboardInterrupt
+                return super().embed_documents(texts)
+
+        try:
+            ingest_documents(collection, Interrupted(), documents.items(), batch_size=args.batch_size, max_workers=1,
+                             checkpoint_path=checkpoint_path)
+        except KeyboardInterrupt:
+            print(f"Kesinti sonrası koleksiyondaki parça sayısı: {collection.count()}")
+
+        # 2. Devam: yalnızca yazılmamış partiler gömülür
+        embedder = FakeEmbeddings(latency=args.latency, jitter=args.latency / 2, failure_rate=args.failure_rate,
+                                  seed=0)
+        stats = ingest_documents(collection, embedder, documents.items(), batch_size=args.batch_size,
+                                 max_workers=args.workers, requests_per_second=args.rps, retries=5, backoff=0.05,
+                                 checkpoint_path=checkpoint_path)
+
+    print(f"Atlanan (kontrol noktası): {stats.skipped}, gömülen: {stats.chunks}, parti: {stats.batches}, "
+          f"yeniden deneme: {stats.retries}")
+    print(f"Süre: {stats.elapsed:.2f}s, verim: {stats.chunks_per_second:.1f} parça/sn, "
+          f"koleksiyon: {collection.count()} parça")
@@ -0,0 +1,76 @@
+"""
+Yalnızca desteklenen dilleri puanlayan LanguageDetector'ı mevcut langdetect.detect ile karşılaştırır:
+sorgu başına süre (önbelleksiz ve önbellekli), kararlılık ve loglardaki gerçek sorgular üzerindeki uyum.
+
+Kullanım:
+    python benchmarks/bench_lang_detect.py --logs chat_logs.txt rag_queries.log --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langdetect import LangDetectException, detect  # noqa: E402
+
+from benchmarks.logs import DEFAULT_LOGS, load_logged_queries  # noqa: E402
+from lang_detect import LanguageDetector  # noqa: E402
+
+SUPPORTED_LANGS = ["en", "es", "sr", "fr", "tr"]
+FALLBACK_LANG = "en"
+
+
+def legacy_detect(query: str) -> str:
+    """app.py'nin önceki detect_and_filter davranışı."""
+    try:
+        lang_code = detect(query)
+    except LangDetectException:
+        return FALLBACK_LANG
+    return lang_code if lang_code in SUPPORTED_LANGS else FALLBACK_LANG
+
+
+def time_per_query(fn, queries: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", nargs="+", default=DEFAULT_LOGS)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    args = parser.parse_args()
+
+    queries = load_logged_queries(args.logs)
+    if not queries:
+        sys.exit(f"Loglarda sorgu bulunamadı: {args.logs}")
+
+    start = time.perf_counter()
+    detector = LanguageDetector(SUPPORTED_LANGS)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    def new_detect(query: str) -> str:
+        lang_code, confidence = detector._score(query)
+        return lang_code if lang_code is not None and confidence >= args.min_confidence else FALLBACK_LANG
+
+    legacy_us = time_per_query(legacy_detect, queries, args.repeat)
+    uncached_us = time_per_query(new_detect, queries, args.repeat)
+    cached_us = time_per_query(detector.detect, queries, args.repeat)
+
+    # Kararlılık: aynı sorgu tekrar tekrar tespit edildiğinde farklı sonuç veren sorgu sayısı
+    unstable_legacy = sum(len({legacy_detect(q) for _ in range(10)}) > 1 for q in queries)
+    unstable_new = sum(len({new_detect(q) for _ in range(10)}) > 1 for q in queries)
+
+    disagreements = [(q, legacy_detect(q), new_detect(q)) for q in queries if legacy_detect(q) != new_detect(q)]
+
+    print(f"{len(queries)} benzersiz sorgu, profil yükleme {load_ms:.1f} ms")
+    print(f"langdetect.detect      : {legacy_us:8.1f} µs/sorgu, kararsız sorgu: {unstable_legacy}")
+    print(f"LanguageDetector       : {uncached_us:8.1f} µs/sorgu, kararsız sorgu: {unstable_new}")
+    print(f"LanguageDetector (LRU) : {cached_us:8.1f} µs/sorgu")
+    print(f"Uyum: {1 - len(disagreements) / len(queries):.3f} ({len(disagreements)} farklı sonuç)")
+    for query, old, new in disagreements:
+        print(f"  eski={old} yeni={new}  {query}")
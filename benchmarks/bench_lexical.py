@@ -0,0 +1,85 @@
+"""
+Dil bazlı BM25 indeksinin kurulum, kaydetme/yükleme ve sorgu gecikmesini ölçer. Ağ erişimi gerektirmez.
+Kalıcı veritabanı varsa (load_data.py ile oluşturulmuş) gerçek parçalar, yoksa sentetik parçalar kullanılır;
+sorgular loglardaki gerçek kullanıcı sorgularıdır.
+
+Kullanım:
+    python benchmarks/bench_lexical.py --synthetic 5000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.logs import DEFAULT_LOGS, load_logged_queries  # noqa: E402
+from lang_detect import LanguageDetector  # noqa: E402
+from lexical_index import LexicalIndex, lexical_index_path  # noqa: E402
+
+CHROMA_DB_DIR = "chroma_db_multilang/"
+COLLECTION_NAME = "sava_clinic_knowledge_multilang"
+LANGS = ["en", "es", "sr", "fr"]
+
+
+class SyntheticCollection:
+    """Chroma koleksiyonunun get() arayüzünü taklit eder; metinler sorgu kelimelerinden üretilir."""
+
+    def __init__(self, count: int, vocabulary: list[str], seed: int = 0):
+        rng = random.Random(seed)
+        self.ids = [f"chunk-{i}" for i in range(count)]
+        self.documents = [" ".join(rng.choices(vocabulary, k=80)) for _ in range(count)]
+        self.metadatas = [{"source": f"https://savaclinic.com/{i // 20}/", "lang": LANGS[i % len(LANGS)]}
+                          for i in range(count)]
+
+    def get(self, include=None):
+        return {"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Sentetik parça sayısı (0 = kalıcı veritabanı)")
+    parser.add_argument("--logs", nargs="+", default=DEFAULT_LOGS)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--min-coverage", type=float, default=0.5)
+    args = parser.parse_args()
+
+    queries = load_logged_queries(args.logs) or ["What is a gastric sleeve?", "¿Qué es la bichectomía?"]
+    if args.synthetic:
+        vocabulary = [word for query in queries for word in query.split()] + ["lorem", "ipsum", "dolor", "sit"] * 50
+        collection = SyntheticCollection(args.synthetic, vocabulary)
+    else:
+        import chromadb
+        collection = chromadb.PersistentClient(path=CHROMA_DB_DIR).get_collection(COLLECTION_NAME)
+
+    start = time.perf_counter()
+    index = LexicalIndex.from_collection(collection)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        size_mb = os.path.getsize(lexical_index_path(tmp)) / 1024 / 1024
+        start = time.perf_counter()
+        index = LexicalIndex.load(tmp)
+        load_ms = (time.perf_counter() - start) * 1000
+
+    detector = LanguageDetector(LANGS)
+    labelled = [(query, detector.detect(query)[0] or "en") for query in queries]
+
+    latencies, hits = [], 0
+    for _ in range(args.repeat):
+        for query, lang in labelled:
+            start = time.perf_counter()
+            results = index.search(query, lang, args.k, args.min_coverage)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += bool(results)
+
+    print(f"Koleksiyon: {index.size} parça; kurulum {build_ms:.0f} ms, dosya {size_mb:.1f} MB, yükleme {load_ms:.0f} ms")
+    print(f"BM25 sorgu: p50 {np.percentile(latencies, 50):.3f} ms, p95 {np.percentile(latencies, 95):.3f} ms, "
+          f"p99 {np.percentile(latencies, 99):.3f} ms ({len(labelled)} sorgu x {args.repeat})")
+    print(f"Sonuç dönen sorgu oranı (min_coverage={args.min_coverage}): {hits / len(latencies):.2f}")
@@ -0,0 +1,357 @@
+"""
+Sohbet servisinin uçtan uca yük testi. Google API'lerine gitmeden çalışır: app, sahte gömme ve sahte LLM
+arka uçlarıyla (gecikme/jitter/hata oranı ayarlanabilir) ve geçici bir sentetik bilgi tabanıyla süreç içinde
+gerçek bir HTTP sunucusunda başlatılır. Sorgular loglardan (chat_logs.txt, rag_queries.log, request_logs.jsonl)
+gerçek sıklıklarıyla alınır ve verilen eşzamanlılık seviyelerinde tekrar oynatılır.
+
+Her seviye için uç nokta başına p50/p95/p99 gecikme, akışta ilk token süresi, verim (istek/sn) ve hata oranı
+raporlanır; sonuçlar JSON olarak kaydedilir ve --baseline ile önceki bir çalıştırmayla karşılaştırılabilir.
+
+Kullanım:
+    python benchmarks/bench_load.py --concurrency 1 8 32 --requests 300 --llm-latency 0.8 --embed-latency 0.1
+    python benchmarks/bench_load.py --mix chat=0.5,chat_stream=0.4,log_query=0.1 --retrieval-mode hybrid
+    python benchmarks/bench_load.py --baseline benchmarks/results/load_20260101-120000.json
+
+    # Çalışan bir sunucuya karşı (gerçek arka uçlarla; Google kotası harcanır)
+    python benchmarks/bench_load.py --url http://127.0.0.1:5001 --concurrency 4 --requests 50
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.logs import DEFAULT_LOGS, load_logged_queries  # noqa: E402
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+ENDPOINTS = {"chat": "/chat", "chat_stream": "/chat/stream", "log_query": "/log_query"}
+# Loglarda sorgu yoksa kullanılan örnek iş yükü
+SAMPLE_QUERIES = [
+    "What is a gastric sleeve?",
+    "How much does a hair transplant cost?",
+    "¿Qué es la bichectomía?",
+    "¿Cuánto tiempo dura la recuperación de un implante dental?",
+    "Koliko košta transplantacija kose?",
+    "Quel est le prix d'une greffe de cheveux ?",
+    "Diş implantı ne kadar sürer?",
+    "Do you offer airport transfer?",
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Bilinmeyen uç nokta: {name} (seçenekler: {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# -------------------------------------------------------------------------
+# Süreç içi sunucu: sahte arka uçlar + sentetik bilgi tabanı
+# -------------------------------------------------------------------------
+
+def build_synthetic_kb(db_dir: str, queries: list[str], fake, detect_lang, coverage: float, seed: int,
+                       collection_name: str, langs: list[str]):
+    """
+    Sorguların `coverage` oranı için, sorgunun sahte gömmesine yakın 1-3 parça ekler (eşik üstü skor);
+    kalan sorgular bağlam bulamaz ve sabit yanıt yolunu ölçer. Parça metinleri sorgu kelimelerini içerir,
+    böylece hibrit modda BM25 de sonuç döndürür. Parçalar load_data.py gibi dil başına koleksiyonlara yazılır.
+    """
+    import chromadb
+
+    from index_shards import ShardedCollection, save_shard_layout, shard_collection_name
+
+    rng = np.random.default_rng(seed)
+    ids, texts, vectors, metadatas = [], [], [], []
+    for i, query in enumerate(queries):
+        if rng.random() >= coverage:
+            continue
+        anchor = np.asarray(fake._vector(query), dtype=np.float32)
+        for j in range(int(rng.integers(1, 4))):
+            noise = rng.standard_normal(anchor.shape[0]).astype(np.float32)
+            vec = anchor + noise / np.linalg.norm(noise) * (0.1 + 0.1 * j)
+            ids.append(f"synthetic-{i}-{j}")
+            texts.append(f"{query} " + " ".join(rng.permutation(query.split() * 10)))
+            vectors.append((vec / np.linalg.norm(vec)).tolist())
+            metadatas.append({"source": f"https://savaclinic.com/synthetic-{i}/", "lang": detect_lang(query)})
+
+    client = chromadb.PersistentClient(path=db_dir)
+    names = {lang: shard_collection_name(collection_name, lang) for lang in langs}
+    collection = ShardedCollection({lang: client.get_or_create_collection(name) for lang, name in names.items()})
+    for start in range(0, len(ids), 1000):
+        end = start + 1000
+        collection.upsert(ids=ids[start:end], embeddings=vectors[start:end], documents=texts[start:end],
+                          metadatas=metadatas[start:end])
+    save_shard_layout(db_dir, names)
+    return collection
+
+
+def start_local_server(args, queries: list[str], work_dir: str):
+    """app'i sahte arka uçlarla başlatır; (taban URL, durdurma fonksiyonu, arka uç sayaç fonksiyonu) döndürür."""
+    # app modülü yapılandırmayı içe aktarılırken ortam değişkenlerinden okur.
+    os.environ.update({
+        "CHAT_LOG_PATH": os.path.join(work_dir, "chat_logs.txt"),
+        "REQUEST_LOG_PATH": os.path.join(work_dir, "request_logs.jsonl"),
+        "EMBEDDING_CACHE_PATH": os.path.join(work_dir, "embedding_cache.sqlite3"),
+        "SESSION_STORE_PATH": os.path.join(work_dir, "sessions.sqlite3"),
+        "RETRIEVAL_BACKEND": args.retrieval_backend,
+        "RETRIEVAL_MODE": args.retrieval_mode,
+    })
+    if args.answer_cache_size is not None:
+        os.environ["ANSWER_CACHE_SIZE"] = str(args.answer_cache_size)
+
+    import logging
+
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from lexical_index import LexicalIndex
+    from vector_index import VectorIndex
+
+    logging.getLogger().setLevel(getattr(logging, args.app_log_level))
+
+    fake_embeddings = FakeEmbeddings(latency=args.embed_latency, jitter=args.embed_jitter,
+                                     failure_rate=args.embed_failure_rate, seed=args.seed)
+    fake_llm = FakeChatModel(latency=args.llm_latency, jitter=args.llm_jitter, token_latency=args.token_latency,
+                             tokens=args.tokens, failure_rate=args.llm_failure_rate, seed=args.seed)
+
+    def detect_lang(query: str) -> str:
+        lang_code, confidence = app_module.language_detector.detect(query)
+        if lang_code is not None and confidence >= app_module.LANG_DETECT_MIN_CONFIDENCE:
+            return lang_code
+        return app_module.FALLBACK_LANG
+
+    db_dir = os.path.join(work_dir, "chroma_db")
+    collection = build_synthetic_kb(db_dir, list(dict.fromkeys(queries)), fake_embeddings, detect_lang,
+                                    args.kb_coverage, args.seed, app_module.COLLECTION_NAME,
+                                    app_module.SUPPORTED_LANGS)
+    if args.retrieval_mode == "hybrid":
+        LexicalIndex.from_collection(collection).save(db_dir)
+    if args.retrieval_backend == "compact":
+        VectorIndex.from_collection(collection).save_compact(db_dir)
+    app_module.CHROMA_DB_DIR = db_dir
+
+    app_module.initialize_rag_system(embeddings=fake_embeddings, llm=fake_llm)
+    if app_module.init_state["status"] != "ready":
+        sys.exit(f"app başlatılamadı: {app_module.init_state['error']}")
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def backend_calls() -> dict:
+        return {"embedding_calls": len(fake_embeddings.batch_sizes),
+                "embedded_texts": sum(fake_embeddings.batch_sizes),
+                "llm_calls": fake_llm.calls}
+
+    def stop():
+        server.shutdown()
+        app_module.log_pipeline.stop()
+
+    return f"http://127.0.0.1:{server.server_port}", stop, backend_calls
+
+
+# -------------------------------------------------------------------------
+# İstemci
+# -------------------------------------------------------------------------
+
+def send(base_url: str, endpoint: str, query: str, timeout: float) -> dict:
+    """Tek bir isteği gönderir; durum kodu, toplam süre ve (akışta) ilk token süresini döndürür."""
+    if endpoint == "log_query":
+        body = {"logs": [{"query": query, "status": "SUCCESS", "ts": datetime.now().isoformat(),
+                          "duration_ms": 1000}]}
+    else:
+        body = {"query": query}
+    req = urllib.request.Request(base_url + ENDPOINTS[endpoint], data=json.dumps(body).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    result = {"endpoint": endpoint, "status": None, "error": False, "first_token_ms": None}
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            result["status"] = resp.status
+            if endpoint == "chat_stream":
+                for line in resp:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "token" and result["first_token_ms"] is None:
+                        result["first_token_ms"] = (time.perf_counter() - start) * 1000
+                    elif event["type"] == "error":
+                        result["error"] = True
+                        result["status"] = "stream_error"
+            else:
+                resp.read()
+    except urllib.error.HTTPError as e:
+        e.read()
+        result.update(status=e.code, error=True)
+    except (OSError, ValueError) as e:
+        result.update(status=type(e).__name__, error=True)
+    result["latency_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def run_level(base_url: str, plan: list[tuple[str, str]], concurrency: int, timeout: float) -> dict:
+    """Planı kapalı döngüde (`concurrency` eşzamanlı istemci) çalıştırır ve uç nokta başına özetler."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda item: send(base_url, item[0], item[1], timeout), plan))
+    wall = time.perf_counter() - start
+
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[result["endpoint"]].append(result)
+
+    summary = {"concurrency": concurrency, "requests": len(results), "wall_seconds": round(wall, 3),
+               "throughput_rps": round(len(results) / wall, 2), "endpoints": {}}
+    for endpoint, items in sorted(by_endpoint.items()):
+        latencies = [item["latency_ms"] for item in items]
+        first_tokens = [item["first_token_ms"] for item in items if item["first_token_ms"] is not None]
+        errors = sum(item["error"] for item in items)
+        summary["endpoints"][endpoint] = {
+            "requests": len(items),
+            "throughput_rps": round(len(items) / wall, 2),
+            "error_rate": round(errors / len(items), 4),
+            "status_codes": dict(Counter(str(item["status"]) for item in items)),
+            "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                           "p99": percentile(latencies, 99), "mean": round(float(np.mean(latencies)), 2),
+                           "max": round(max(latencies), 2)},
+        }
+        if first_tokens:
+            summary["endpoints"][endpoint]["first_token_ms"] = {
+                "p50": percentile(first_tokens, 50), "p95": percentile(first_tokens, 95),
+                "p99": percentile(first_tokens, 99)}
+    return summary
+
+
+def fetch_json(url: str) -> dict | None:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return json.load(resp)
+    except (OSError, ValueError):
+        return None
+
+
+def print_level(level: dict, baseline: dict | None):
+    print(f"\n== Eşzamanlılık {level['concurrency']}: {level['requests']} istek, {level['wall_seconds']} s, "
+          f"{level['throughput_rps']} istek/sn")
+    print(f"{'uç nokta':<12} {'istek':>6} {'istek/sn':>9} {'hata':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'ilk token p95':>14}")
+    for endpoint, stats in level["endpoints"].items():
+        latency = stats["latency_ms"]
+        first_token = stats.get("first_token_ms", {}).get("p95")
+        print(f"{endpoint:<12} {stats['requests']:>6} {stats['throughput_rps']:>9} {stats['error_rate']:>7.2%} "
+              f"{latency['p50']:>9} {latency['p95']:>9} {latency['p99']:>9} {first_token if first_token is not None else '-':>14}")
+        base = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if base:
+            print(f"{'  önceki':<12} {base['requests']:>6} {base['throughput_rps']:>9} {base['error_rate']:>7.2%} "
+                  f"{base['latency_ms']['p50']:>9} {base['latency_ms']['p95']:>9} {base['latency_ms']['p99']:>9}"
+                  f"  (p95 {latency['p95'] / base['latency_ms']['p95'] - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Çalışan bir sunucunun taban URL'si (verilmezse süreç içinde sahte arka uçlarla başlatılır)")
+    parser.add_argument("--logs", nargs="+", default=DEFAULT_LOGS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Eşzamanlılık seviyesi başına istek sayısı")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.6,chat_stream=0.3,log_query=0.1"))
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    # Sahte arka uçlar
+    parser.add_argument("--embed-latency", type=float, default=0.1)
+    parser.add_argument("--embed-jitter", type=float, default=0.03)
+    parser.add_argument("--embed-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="İlk token'a kadar geçen süre (sn)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=80)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    # Süreç içi app yapılandırması
+    parser.add_argument("--kb-coverage", type=float, default=0.8, help="Bilgi tabanında bağlamı bulunan sorgu oranı")
+    parser.add_argument("--retrieval-mode", choices=["vector", "hybrid"], default="vector")
+    parser.add_argument("--retrieval-backend", choices=["chroma", "numpy", "compact"], default="chroma")
+    parser.add_argument("--answer-cache-size", type=int, help="0 = yanıt önbelleği kapalı (varsayılan: app ayarı)")
+    parser.add_argument("--app-log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    # Sonuçlar
+    parser.add_argument("--output", help="Sonuç JSON dosyası (varsayılan: benchmarks/results/load_<zaman>.json)")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki sonuç dosyası")
+    args = parser.parse_args()
+
+    # Gerçek dağılım korunur: sık sorulan sorgular iş yükünde de sık görünür.
+    queries = load_logged_queries(args.logs, unique=False) or SAMPLE_QUERIES
+    rng = random.Random(args.seed)
+    endpoints, weights = zip(*args.mix.items())
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stop, backend_calls = None, None
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            base_url, stop, backend_calls = start_local_server(args, queries, work_dir)
+
+        baseline_levels = {}
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline_levels = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+        print(f"Hedef: {base_url}, {len(queries)} sorgu ({len(set(queries))} benzersiz), karışım: {args.mix}")
+        levels = []
+        try:
+            for concurrency in args.concurrency:
+                plan = [(rng.choices(endpoints, weights)[0], rng.choice(queries)) for _ in range(args.requests)]
+                calls_before = backend_calls() if backend_calls else None
+                level = run_level(base_url, plan, concurrency, args.timeout)
+                if backend_calls:
+                    level["backend_calls"] = {name: value - calls_before[name]
+                                              for name, value in backend_calls().items()}
+                levels.append(level)
+                print_level(level, baseline_levels.get(concurrency))
+            server_stats = fetch_json(base_url + "/stats")
+        finally:
+            if stop:
+                stop()
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "target": args.url or "in-process (fake backends)",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "workload": {"queries": len(queries), "unique_queries": len(set(queries))},
+        "levels": levels,
+        "server_stats": server_stats,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nSonuçlar kaydedildi: {output}")
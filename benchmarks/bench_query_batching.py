@@ -0,0 +1,66 @@
+"""
+Eşzamanlı /chat isteklerinin sorgu gömmelerini, mikro-partileme kapalıyken ve açıkken karşılaştırır.
+Sahte gömme fonksiyonu her çağrının parti boyutunu kaydeder; böylece kaç API çağrısı yapıldığı ölçülür.
+
+Kullanım:
+    python benchmarks/bench_query_batching.py --requests 400 --concurrency 32 --latency 0.08 --window-ms 5
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from embedding_cache import CachedEmbeddings  # noqa: E402
+
+
+def run(requests: int, concurrency: int, latency: float, window_ms: float, max_batch: int) -> dict:
+    fake = FakeEmbeddings(latency=latency)
+    # Disk önbelleği yok; her sorgu benzersiz olduğundan hepsi gömme çağrısına düşer.
+    embeddings = CachedEmbeddings(fake, model_name="fake", query_batch_window_ms=window_ms,
+                                  query_batch_size=max_batch)
+
+    def one(i: int) -> tuple[float, bool]:
+        text = f"soru {i}: implant fiyatları nedir?"
+        start = time.perf_counter()
+        vector = embeddings.embed_query(text)
+        elapsed = (time.perf_counter() - start) * 1000
+        # Dağıtılan vektör, tek başına gömülmüş vektörle aynı olmalı
+        return elapsed, np.allclose(vector, fake._vector(text))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed for elapsed, _ in results]
+    return {
+        "calls": len(fake.batch_sizes),
+        "batch_sizes": Counter(fake.batch_sizes),
+        "correct": all(ok for _, ok in results),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "qps": requests / wall,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.08, help="Sahte gömme çağrısı gecikmesi (sn)")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    for label, window in (("partileme yok", 0.0), (f"pencere {args.window_ms:g} ms", args.window_ms)):
+        result = run(args.requests, args.concurrency, args.latency, window, args.max_batch)
+        common = ", ".join(f"{size}x{count}" for size, count in result["batch_sizes"].most_common(5))
+        print(f"{label:>16}: {result['calls']} gömme çağrısı, p50 {result['p50']:.1f} ms, p95 {result['p95']:.1f} ms, "
+              f"{result['qps']:.0f} sorgu/sn, doğru: {result['correct']} (parti boyutu x adet: {common})")
@@ -0,0 +1,113 @@
+"""
+Mevcut Chroma erişim yolunu (as_retriever + lang filtresi) bellek içi NumPy indeksiyle karşılaştırır.
+Sorgu gömmesi her iki yolda da sahte gömme fonksiyonundan gelir; böylece yalnızca arama maliyeti ölçülür.
+
+Kullanım:
+    # Kalıcı veritabanı üzerinde (load_data.py ile oluşturulmuş)
+    python benchmarks/bench_retrieval.py --queries 500
+
+    # Veritabanı yoksa sentetik koleksiyon üzerinde
+    python benchmarks/bench_retrieval.py --synthetic 3000 --queries 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import zlib
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.vectorstores import Chroma  # noqa: E402
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from vector_index import NumpyRetriever, VectorIndex  # noqa: E402
+
+CHROMA_DB_DIR = "chroma_db_multilang/"
+COLLECTION_NAME = "sava_clinic_knowledge_multilang"
+LANGS = ["en", "es", "sr", "fr"]
+
+
+class QueryVectorEmbeddings(FakeEmbeddings):
+    """Sorguları, koleksiyondaki bir parçanın gürültülü kopyasına gömer (gerçekçi skor dağılımı için)."""
+
+    def __init__(self, anchors: np.ndarray, dim: int):
+        super().__init__(dim=dim)
+        self.anchors = anchors
+
+    def embed_query(self, text: str) -> list[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vec = self.anchors[rng.integers(len(self.anchors))] + rng.standard_normal(self.dim) * 0.02
+        return (vec / np.linalg.norm(vec)).astype(np.float32).tolist()
+
+
+def synthetic_collection(count: int, dim: int):
+    collection = chromadb.EphemeralClient().get_or_create_collection(COLLECTION_NAME)
+    fake = FakeEmbeddings(dim=dim)
+    for start in range(0, count, 1000):
+        ids = [f"chunk-{i}" for i in range(start, min(start + 1000, count))]
+        texts = [f"Sahte parça {i}" for i in range(start, min(start + 1000, count))]
+        collection.add(ids=ids, documents=texts, embeddings=fake.embed_documents(texts),
+                       metadatas=[{"source": f"https://savaclinic.com/{i // 20}/", "lang": LANGS[i % len(LANGS)]}
+                                  for i in range(start, min(start + 1000, count))])
+    return collection
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def time_retriever(make_retriever, queries: list[tuple[str, str]]) -> tuple[list[float], list[list[str]]]:
+    latencies, results = [], []
+    for query, lang in queries:
+        start = time.perf_counter()
+        docs = make_retriever(lang).invoke(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([doc.page_content for doc in docs])
+    return latencies, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Sentetik koleksiyondaki parça sayısı")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--score-threshold", type=float, default=0.65)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        collection = synthetic_collection(args.synthetic, args.dim)
+        client = collection._client
+    else:
+        client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+        collection = client.get_collection(COLLECTION_NAME)
+
+    index = VectorIndex.from_collection(collection)
+    anchors = np.concatenate([shard.matrix for shard in index.shards.values()])
+    embeddings = QueryVectorEmbeddings(anchors, anchors.shape[1])
+    vectorstore = Chroma(client=client, collection_name=collection.name, embedding_function=embeddings)
+    queries = [(f"soru {i}", LANGS[i % len(LANGS)]) for i in range(args.queries)]
+
+    chroma_latencies, chroma_results = time_retriever(
+        lambda lang: vectorstore.as_retriever(
+            search_type="similarity_score_threshold",
+            search_kwargs={"score_threshold": args.score_threshold, "filter": {"lang": lang}, "k": args.k}),
+        queries)
+    numpy_latencies, numpy_results = time_retriever(
+        lambda lang: NumpyRetriever(index=index, embeddings=embeddings, lang_code=lang, k=args.k,
+                                    score_threshold=args.score_threshold),
+        queries)
+
+    agreement = statistics.mean(
+        len(set(a) & set(b)) / max(len(a), len(b)) if (a or b) else 1.0
+        for a, b in zip(chroma_results, numpy_results)
+    )
+    print(f"Koleksiyon: {index.size} parça, NumPy indeksi {index.nbytes / 1024 / 1024:.1f} MB")
+    for label, latencies in (("chroma", chroma_latencies), ("numpy", numpy_latencies)):
+        print(f"{label:>7}: p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms, "
+              f"p99 {percentile(latencies, 99):.2f} ms, {len(latencies) / (sum(latencies) / 1000):.0f} sorgu/sn")
+    print(f"Sonuç uyumu (top-{args.k} örtüşme): {agreement:.3f}")
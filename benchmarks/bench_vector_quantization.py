@@ -0,0 +1,179 @@
+"""
+Tam float32 NumPy indeksini (RETRIEVAL_BACKEND=numpy) bellek eşlemeli float16/int8 indeksle
+(RETRIEVAL_BACKEND=compact: yaklaşık tarama + float32 yeniden sıralama) karşılaştırır:
+float32 sonuçlarına göre geri çağırma (recall), gecikme ve işçi başına bellek.
+
+Bellek her yol için ayrı (fork edilmiş) bir süreçte, indeks yüklenip tüm sorgular çalıştırıldıktan sonra ölçülür:
+"özel" (RssAnon) her işçinin kendi kopyasıdır, "eşlemeli" (RssFile) dosya sayfalarıdır ve aynı makinedeki
+işçiler arasında sayfa önbelleğinde paylaşılır. /proc olmayan sistemlerde yalnızca indeksin kendi bayt sayıları yazılır.
+
+Kullanım:
+    # Sentetik, konu kümeli gömmeler üzerinde
+    python benchmarks/bench_vector_quantization.py --chunks 20000 --queries 500 --candidates 20 50 200
+
+    # load_data.py'nin yazdığı dosyalar üzerinde
+    python benchmarks/bench_vector_quantization.py --db-dir chroma_db_multilang/
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document  # noqa: E402
+
+from vector_index import QUANTIZATIONS, CompactVectorIndex, VectorIndex  # noqa: E402
+
+LANGS = ["en", "es", "sr", "fr", "tr"]
+
+
+def synthetic_kb(db_dir: str, chunks: int, dim: int, topic_size: int, spread: float, seed: int):
+    """Her dilde, konu merkezleri etrafında kümelenmiş birim vektörler (yakın parçaların skorları birbirine yakın)."""
+    rng = np.random.default_rng(seed)
+    grouped = {}
+    per_lang = chunks // len(LANGS)
+    for lang in LANGS:
+        centers = rng.standard_normal((max(per_lang // topic_size, 1), dim)).astype(np.float32)
+        centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+        noise = rng.standard_normal((per_lang, dim)).astype(np.float32)
+        noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+        vectors = centers[rng.integers(len(centers), size=per_lang)] + spread * noise
+        documents = [Document(page_content=f"Sahte parça {lang}-{i}",
+                              metadata={"source": f"https://savaclinic.com/{lang}/{i // 20}/", "lang": lang},
+                              id=f"{lang}-{i}")
+                     for i in range(per_lang)]
+        grouped[lang] = (vectors, documents)
+    VectorIndex.from_vectors(grouped).save_compact(db_dir)
+
+
+def make_queries(index: VectorIndex, count: int, noise: float, seed: int) -> list[tuple[np.ndarray, str]]:
+    """Sorgular, rastgele bir parçanın gürültülü kopyasıdır."""
+    rng = np.random.default_rng(seed)
+    langs = sorted(index.shards)
+    queries = []
+    for i in range(count):
+        lang = langs[i % len(langs)]
+        matrix = index.shards[lang].matrix
+        vector = matrix[rng.integers(len(matrix))] + rng.standard_normal(matrix.shape[1]).astype(np.float32) * noise
+        queries.append((vector.astype(np.float32), lang))
+    return queries
+
+
+def load_float32(db_dir: str) -> VectorIndex:
+    """numpy arka ucunun işçi belleğinde tuttuğu float32 matrislerin aynısı."""
+    compact = CompactVectorIndex.load(db_dir)
+    return VectorIndex.from_vectors(
+        {lang: (np.array(shard.exact), shard.documents) for lang, shard in compact.shards.items()}, compact.space)
+
+
+def load_variant(db_dir: str, quantization: str, candidates: int) -> VectorIndex:
+    if quantization == "float32":
+        return load_float32(db_dir)
+    return CompactVectorIndex.load(db_dir, quantization, candidates)
+
+
+def rss_kb() -> dict[str, int]:
+    """/proc/self/status'tan RssAnon ve RssFile (KB); desteklenmiyorsa boş."""
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("RssAnon", "RssFile"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+def _measure_worker(db_dir, quantization, candidates, queries, k, results):
+    before = rss_kb()
+    index = load_variant(db_dir, quantization, candidates)
+    for vector, lang in queries:
+        index.search(vector, lang, k)
+    after = rss_kb()
+    results.put({key: after[key] - before.get(key, 0) for key in after})
+
+
+def measure_worker_memory(db_dir: str, quantization: str, candidates: int, queries, k: int) -> dict[str, int]:
+    """İndeksi yükleyip sorguları çalıştıran yeni bir işçinin bellek artışı (KB)."""
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return {}
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_measure_worker, args=(db_dir, quantization, candidates, queries, k, results))
+    process.start()
+    measured = results.get()
+    process.join()
+    return measured
+
+
+def run_queries(index: VectorIndex, queries, k: int, score_threshold: float | None):
+    latencies, results = [], []
+    for vector, lang in queries:
+        start = time.perf_counter()
+        hits = index.search(vector, lang, k, score_threshold)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([doc.id for doc, _ in hits])
+    return latencies, results
+
+
+def recall(reference: list[list[str]], results: list[list[str]]) -> tuple[float, float]:
+    """Ortalama geri çağırma (boş olmayan referanslar üzerinde) ve sıralamasıyla birebir aynı sonuç oranı."""
+    recalls = [len(set(ref) & set(res)) / len(ref) for ref, res in zip(reference, results) if ref]
+    identical = sum(ref == res for ref, res in zip(reference, results)) / len(reference)
+    return (statistics.mean(recalls) if recalls else 1.0), identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-dir", help="load_data.py'nin yazdığı compact_vectors/ dizinini içeren veritabanı dizini")
+    parser.add_argument("--chunks", type=int, default=20000, help="Sentetik parça sayısı (tüm diller)")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--topic-size", type=int, default=20, help="Sentetik konu başına ortalama parça")
+    parser.add_argument("--spread", type=float, default=0.8, help="Sentetik parçaların konu merkezinden sapması")
+    parser.add_argument("--query-noise", type=float, default=0.03)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--score-threshold", type=float, default=0.65)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50, 200])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_dir = args.db_dir
+        if db_dir is None:
+            db_dir = work_dir
+            synthetic_kb(db_dir, args.chunks, args.dim, args.topic_size, args.spread, args.seed)
+
+        exact = load_float32(db_dir)
+        queries = make_queries(exact, args.queries, args.query_noise, args.seed)
+        print(f"{exact.size} parça, {len(exact.shards)} dil, {len(queries)} sorgu, k={args.k}, "
+              f"eşik={args.score_threshold}\n")
+
+        references = {threshold: run_queries(exact, queries, args.k, threshold)
+                      for threshold in (None, args.score_threshold)}
+        variants = [("float32", 0)] + [(q, c) for q in QUANTIZATIONS for c in args.candidates]
+        for quantization, candidates in variants:
+            index = exact if quantization == "float32" else load_variant(db_dir, quantization, candidates)
+            label = "float32 (numpy)" if quantization == "float32" else f"{quantization}, {candidates} aday"
+            print(f"{label}:")
+            print(f"  indeks: işçi belleğinde {index.nbytes / 1024 / 1024:.2f} MB, "
+                  f"eşlemeli {index.mapped_bytes / 1024 / 1024:.2f} MB")
+            memory = measure_worker_memory(db_dir, quantization, candidates, queries, args.k)
+            if memory:
+                print(f"  ölçülen işçi artışı: özel {memory.get('RssAnon', 0) / 1024:.1f} MB, "
+                      f"eşlemeli (paylaşılan) {memory.get('RssFile', 0) / 1024:.1f} MB")
+            for threshold, (_, reference) in references.items():
+                latencies, results = run_queries(index, queries, args.k, threshold)
+                mean_recall, identical = recall(reference, results)
+                print(f"  {'top-k' if threshold is None else f'eşik {threshold}'}: recall@{args.k} {mean_recall:.4f}, "
+                      f"birebir aynı {identical:.3f}, p50 {np.percentile(latencies, 50):.3f} ms, "
+                      f"p95 {np.percentile(latencies, 95):.3f} ms")
+            print()
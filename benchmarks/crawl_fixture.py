@@ -0,0 +1,127 @@
+"""
+Kaydedilmiş klinik sayfalarını yerel bir HTTP sunucusundan sunarak crawler'ı ağ olmadan ölçer.
+
+Kullanım:
+    # Sayfaları bir kez indirip kaydet (ağ gerekir)
+    python benchmarks/crawl_fixture.py save --pages-dir saved_pages/
+
+    # Yerel sunucu üzerinden sıralı ve eşzamanlı çekmeyi karşılaştır
+    python benchmarks/crawl_fixture.py run --pages-dir saved_pages/ --delay 0.3 --fail-rate 0.1
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import fetch_all, saved_page_name  # noqa: E402
+from load_data import LANG_URLS, clean_html  # noqa: E402
+
+
+class FixturePageServer:
+    """Kaydedilmiş sayfaları, yapay gecikme ve geçici hata oranıyla sunan yerel HTTP sunucusu."""
+
+    def __init__(self, pages_dir: str, delay: float = 0.0, fail_rate: float = 0.0):
+        self.pages_dir = pages_dir
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.request_count = 0
+        self._lock = threading.Lock()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fixture._lock:
+                    fixture.request_count += 1
+                if fixture.delay:
+                    time.sleep(fixture.delay * (0.5 + random.random()))
+                if fixture.fail_rate and random.random() < fixture.fail_rate:
+                    self.send_error(503)
+                    return
+                # Yol, orijinal URL'nin sunucu + yol kısmını taşır: /savaclinic.com/treatments/...
+                path = os.path.join(fixture.pages_dir, saved_page_name(f"http:/{self.path}"))
+                if not os.path.exists(path):
+                    self.send_error(404)
+                    return
+                with open(path, "rb") as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def local_url(self, url: str) -> str:
+        """Gerçek URL'yi yerel sunucudaki karşılığına çevirir."""
+        parts = urlsplit(url)
+        return f"{self.base_url}/{parts.netloc}{parts.path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def save_pages(pages_dir: str):
+    """LANG_URLS sayfalarını indirip dosya olarak kaydeder."""
+    os.makedirs(pages_dir, exist_ok=True)
+    for result in fetch_all(LANG_URLS):
+        if result.ok:
+            with open(os.path.join(pages_dir, saved_page_name(result.url)), "wb") as f:
+                f.write(result.content)
+
+
+def run_benchmark(pages_dir: str, delay: float, fail_rate: float, workers: int, per_host_limit: int):
+    """Aynı fikstür üzerinde sıralı (1 işçi) ve eşzamanlı çekmeyi karşılaştırır."""
+    with FixturePageServer(pages_dir, delay=delay, fail_rate=fail_rate) as fixture:
+        local_urls = {lang: [fixture.local_url(u) for u in urls] for lang, urls in LANG_URLS.items()}
+
+        timings = {}
+        for label, max_workers in (("sıralı", 1), ("eşzamanlı", workers)):
+            start = time.perf_counter()
+            results = fetch_all(local_urls, max_workers=max_workers, per_host_limit=per_host_limit,
+                                retries=3, backoff=0.05)
+            timings[label] = time.perf_counter() - start
+            ok = sum(1 for r in results if r.ok)
+            chunks_text = sum(len(clean_html(r.content, r.url)) for r in results if r.ok)
+            print(f"{label:>10}: {timings[label]:.2f}s, {ok}/{len(results)} sayfa, {chunks_text} karakter temiz metin")
+
+        print(f"Hızlanma: {timings['sıralı'] / timings['eşzamanlı']:.1f}x, "
+              f"sunucuya giden istek sayısı: {fixture.request_count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["save", "run"])
+    parser.add_argument("--pages-dir", default="saved_pages")
+    parser.add_argument("--delay", type=float, default=0.2, help="İstek başına ortalama yapay gecikme (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Rastgele 503 döndürme oranı")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host-limit", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.mode == "save":
+        save_pages(args.pages_dir)
+    else:
+        run_benchmark(args.pages_dir, args.delay, args.fail_rate, args.workers, args.per_host_limit)
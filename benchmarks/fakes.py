@@ -0,0 +1,111 @@
+"""
+Google API'lerine gitmeden ölçüm yapmak için sahte (fake) arka uçlar.
+Gecikme ve hata oranı ayarlanabilir; vektörler metnin özetinden deterministik olarak üretilir.
+"""
+import hashlib
+import random
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministik, birim uzunluklu vektörler üreten ve çağrı/parti boyutlarını kaydeden sahte gömme fonksiyonu."""
+
+    def __init__(self, dim: int = 768, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 seed: int | None = None):
+        self.dim = dim
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.batch_sizes: list[int] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    def _simulate_call(self, batch_size: int):
+        with self._lock:
+            self.batch_sizes.append(batch_size)
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            fail = self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("Sahte gömme hatası (429 Resource exhausted)")
+
+    def embed_documents(self, texts: list[str], task_type: str | None = None) -> list[list[float]]:
+        self._simulate_call(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self._simulate_call(1)
+        return self._vector(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Gemini yerine kullanılan sahte sohbet modeli: ilk token'a kadar `latency` (± `jitter`) saniye, sonraki
+    her token için `token_latency` saniye bekler. Yanıt, istemdeki kelimelerden deterministik olarak üretilir.
+    """
+    latency: float = 0.5
+    jitter: float = 0.0
+    token_latency: float = 0.005
+    tokens: int = 60
+    failure_rate: float = 0.0
+    seed: int | None = None
+
+    _random: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context):
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def _start_call(self):
+        with self._lock:
+            self._calls += 1
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            fail = self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("Sahte LLM hatası (503 Service unavailable)")
+
+    def _answer_tokens(self, messages) -> list[str]:
+        words = " ".join(str(message.content) for message in messages).split() or ["yanıt"]
+        return [words[i % len(words)] + " " for i in range(self.tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._start_call()
+        tokens = self._answer_tokens(messages)
+        if self.token_latency > 0:
+            time.sleep(self.token_latency * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._start_call()
+        for i, token in enumerate(self._answer_tokens(messages)):
+            if i and self.token_latency > 0:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,18 @@
+"""
+Ölçümlerde kullanılan gerçek kullanıcı sorgularını loglardan okur: metin logları (chat_logs.txt,
+"Kullanıcı Sorgusu: '...'" satırları) ve yapılandırılmış kayıtlar (request_logs.jsonl, rag_queries.log).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_logs import iter_logged_queries  # noqa: E402
+
+DEFAULT_LOGS = ["chat_logs.txt", "rag_queries.log", "request_logs.jsonl"]
+
+
+def load_logged_queries(paths: list[str], unique: bool = True) -> list[str]:
+    """Sorguları loglardaki sırayla döndürür; unique=False ise tekrarlar korunur (gerçek dağılım için)."""
+    queries = [query for _, query, _ in iter_logged_queries(paths)]
+    return list(dict.fromkeys(queries)) if unique else queries
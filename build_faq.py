@@ -0,0 +1,73 @@
+"""
+Sık sorulan soruların yanıtlarını çevrimdışı üretir: sohbet loglarından dil başına en sık sorgular çıkarılır,
+her biri mevcut RAG zinciriyle (app.py) bir kez yanıtlanır ve yanıtlar kaynaklarıyla birlikte Chroma deposunun
+yanındaki faq_answers.json dosyasına yazılır. load_data.py bilgi tabanı değiştiğinde bu betiği kendisi çalıştırır.
+
+Kullanım:
+    python build_faq.py
+"""
+import os
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Üretim sırasında yazılan loglar, bir sonraki madencilikte kullanıcı sorgusu sayılmasın diye ayrı dosyaya gider.
+os.environ.setdefault("CHAT_LOG_PATH", "faq_build_logs.txt")
+os.environ.setdefault("REQUEST_LOG_PATH", "faq_build_requests.jsonl")
+
+import app  # noqa: E402
+from faq_store import FaqAnswer, faq_store_path, mine_frequent_queries, save_faq_store  # noqa: E402
+from kb_version import read_kb_version  # noqa: E402
+from query_logs import expand_log_paths, iter_logged_queries  # noqa: E402
+
+# Madenciliğe katılan loglar (döndürülmüş dosyalar dahil)
+FAQ_LOG_PATTERNS = os.getenv("FAQ_LOG_PATTERNS", "chat_logs.txt*,rag_queries.log,request_logs.jsonl*").split(",")
+# Bir sorgunun hazır yanıt alması için loglarda en az kaç kez geçmesi gerektiği
+FAQ_MIN_COUNT = int(os.getenv("FAQ_MIN_COUNT", "3"))
+FAQ_MAX_PER_LANG = int(os.getenv("FAQ_MAX_PER_LANG", "200"))
+FAQ_BUILD_WORKERS = int(os.getenv("FAQ_BUILD_WORKERS", "4"))
+
+
+def generate_answer(lang_code: str, query: str, count: int) -> FaqAnswer | None:
+    """Sorguyu canlı istekle aynı erişim ve zincirden geçirir; bağlam bulunamazsa None döner."""
+    try:
+        response, sources, _ = app.dynamically_retrieve_and_run(query, lang_code, app.vectorstore)
+        if not response:
+            logging.info(f"[{lang_code}] Bağlam bulunamadı, atlanıyor: '{query}'")
+            return None
+        embedding = app.vectorstore.embeddings.embed_query(query)
+    except Exception as e:
+        logging.error(f"[{lang_code}] '{query}' için yanıt üretilemedi: {e}")
+        return None
+    return FaqAnswer(lang_code, query, response, sources, count, embedding)
+
+
+def build_faq_store() -> int:
+    """Depoyu yeniden üretir ve yazılan yanıt sayısını döndürür."""
+    if not app.ensure_rag_initialized():
+        raise RuntimeError(f"RAG sistemi yüklenemedi: {app.init_state['error']}")
+
+    # Yanıtlar bu sürüm için üretilir; üretim sırasında bilgi tabanı değişirse app depoyu eski sayar.
+    kb_version = read_kb_version(app.CHROMA_DB_DIR)
+    log_paths = expand_log_paths(FAQ_LOG_PATTERNS)
+    frequent = mine_frequent_queries(iter_logged_queries(log_paths), app.detect_and_filter,
+                                     FAQ_MIN_COUNT, FAQ_MAX_PER_LANG)
+    logging.info(f"{len(log_paths)} log dosyasından {len(frequent)} sık sorgu bulundu (en az {FAQ_MIN_COUNT} kez).")
+
+    with ThreadPoolExecutor(max_workers=FAQ_BUILD_WORKERS) as executor:
+        answers = [answer for answer in executor.map(lambda item: generate_answer(*item), frequent) if answer]
+
+    path = faq_store_path(app.CHROMA_DB_DIR)
+    save_faq_store(path, answers, kb_version)
+    logging.info(f"FAQ deposu kaydedildi: {path} ({len(answers)} yanıt, bilgi tabanı sürümü {kb_version})")
+    return len(answers)
+
+
+if __name__ == "__main__":
+    try:
+        build_faq_store()
+    except Exception as e:
+        logging.critical(f"FAQ deposu oluşturulamadı: {e}")
+        sys.exit(1)
+    finally:
+        app.log_pipeline.stop()
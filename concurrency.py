@@ -0,0 +1,209 @@
+import queue
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+
+
+class OverloadedError(Exception):
+    """Eşzamanlılık sınırı ve bekleme kuyruğu dolu olduğunda fırlatılır; istemciye 503 döndürülür."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    """İstek süresi (app.py: REQUEST_TIMEOUT_SECONDS) dolduğunda fırlatılır; istemciye 504 döndürülür."""
+
+
+class ConcurrencyLimiter:
+    """
+    Pahalı çağrıları (ör. Gemini) aynı anda en fazla `max_concurrency` ile sınırlar.
+    Boş yer yoksa en fazla `max_queue` istek `acquire_timeout` saniye bekler; kuyruk doluysa
+    veya süre dolarsa OverloadedError hemen fırlatılır, böylece aşırı yükte iş parçacıkları birikmez.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, acquire_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    @contextmanager
+    def slot(self):
+        """Bir çalışma yeri ayırır; çıkışta serbest bırakır."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self):
+        """
+        Bir çalışma yeri ayırır (slot() ile aynı kurallar). Yer başka bir iş parçacığında yapılan çağrı için
+        ayrıldıysa (bkz. call_with_deadline) çağrı bitince release() ile serbest bırakılmalıdır.
+        """
+        acquired = self._semaphore.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self._counters["rejected"] += 1
+                    raise OverloadedError("Sunucu yoğun: bekleme kuyruğu dolu.")
+                self._waiting += 1
+                self._counters["queued"] += 1
+            try:
+                acquired = self._semaphore.acquire(timeout=self.acquire_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self._counters["timed_out"] += 1
+                raise OverloadedError("Sunucu yoğun: bekleme süresi aşıldı.")
+
+        with self._lock:
+            self._active += 1
+            self._counters["admitted"] += 1
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+
+def call_with_deadline(executor, limiter: ConcurrencyLimiter, fn, timeout: float):
+    """
+    fn()'i limiter'dan yer alarak executor'da çalıştırır ve en fazla `timeout` saniye bekler; süre dolarsa
+    DeadlineExceededError fırlatır. Askıda kalan çağrı istek iş parçacığını tutmaz, ancak bitene kadar
+    yerini korur: böylece limiter gerçekten süren çağrıları sayar.
+    """
+    limiter.acquire()
+    try:
+        future = executor.submit(fn)
+    except BaseException:
+        limiter.release()
+        raise
+    future.add_done_callback(lambda _: limiter.release())
+    try:
+        return future.result(timeout=max(timeout, 0.0))
+    except FuturesTimeout:
+        raise DeadlineExceededError(f"Çağrı {timeout:.1f} saniyede tamamlanmadı.") from None
+
+
+_STREAM_END = object()
+
+
+def iterate_with_deadline(executor, limiter: ConcurrencyLimiter, make_iterator, timeout: float):
+    """
+    call_with_deadline'ın akış karşılığı: make_iterator()'ın ürettiği öğeleri executor'daki bir üretici
+    üzerinden verir. Akışın tamamı `timeout` saniyede bitmezse DeadlineExceededError fırlatılır. Tüketici
+    erken çıkarsa (istemci bağlantıyı kesti) üretici bir sonraki öğede durur.
+    """
+    deadline = time.monotonic() + timeout
+    items = queue.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in make_iterator():
+                if stop.is_set():
+                    return
+                items.put((item, None))
+        except BaseException as e:
+            items.put((_STREAM_END, e))
+        else:
+            items.put((_STREAM_END, None))
+
+    limiter.acquire()
+    try:
+        future = executor.submit(produce)
+    except BaseException:
+        limiter.release()
+        raise
+    future.add_done_callback(lambda _: limiter.release())
+    try:
+        while True:
+            try:
+                item, error = items.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                raise DeadlineExceededError(f"Akış {timeout:.1f} saniyede tamamlanmadı.") from None
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Aynı anahtarla eşzamanlı gelen çağrıları birleştirir: ilk çağrı (lider) işi yapar,
+    aynı anda gelen kopyalar sonucunu (veya hatasını) bekleyip paylaşır. Bir kopya `max_wait`
+    saniyeden uzun beklerse lideri beklemeyi bırakıp işi kendisi yapar.
+    """
+
+    def __init__(self, max_wait: float):
+        self.max_wait = max_wait
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0, "wait_timeouts": 0}
+
+    def do(self, key, fn):
+        """fn() sonucunu ve sonucun başka bir çağrıdan paylaşılıp paylaşılmadığını döndürür."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _InFlightCall()
+                leader = True
+                self._counters["leaders"] += 1
+            else:
+                leader = False
+
+        if not leader:
+            if call.done.wait(self.max_wait):
+                with self._lock:
+                    self._counters["coalesced"] += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            with self._lock:
+                self._counters["wait_timeouts"] += 1
+            return fn(), False
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls)}
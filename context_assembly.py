@@ -0,0 +1,181 @@
+import math
+import re
+from dataclasses import dataclass, field
+
+from langchain_core.documents import Document
+
+# Parçalar istemde bu ayraçla birleştirilir (app.py'nin önceki biçimiyle aynı).
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+# Gemini tokenizer'ı yerelde yok; istem boyutu karakter sayısından tahmin edilir (Latin alfabeli diller için ~4).
+CHARS_PER_TOKEN = 4
+# Ardışık parçaların birleştirilmesi için gereken en kısa ortak kısım; kısa tesadüfi eşleşmeleri önler.
+MIN_OVERLAP_CHARS = 20
+# Bundan kısa cümleler ("Yes.", "Fiyat:") tekrar sayılmaz.
+MIN_DEDUPE_SENTENCE_CHARS = 20
+# Bütçe sonunda bundan az token kalıyorsa yarım pasaj eklenmez.
+MIN_TAIL_TOKENS = 30
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])(\s+)")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class Passage:
+    """Aynı kaynaktan gelen, birleştirilmiş ardışık parçalar."""
+    source: str | None
+    text: str
+
+
+@dataclass
+class AssembledContext:
+    """İsteme girecek bağlam ve önce/sonra boyutları."""
+    text: str
+    sources: list = field(default_factory=list)
+    chunks: int = 0
+    passages: int = 0
+    merged_chunks: int = 0
+    duplicate_sentences: int = 0
+    truncated: bool = False
+    chars_before: int = 0
+
+    @property
+    def chars_after(self) -> int:
+        return len(self.text)
+
+    @property
+    def tokens_before(self) -> int:
+        return math.ceil(self.chars_before / CHARS_PER_TOKEN)
+
+    @property
+    def tokens_after(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def _overlap(left: str, right: str) -> int:
+    """left'in sonu ile right'ın başı arasındaki en uzun ortak kısmın uzunluğu (MIN_OVERLAP_CHARS altındaysa 0)."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge(passage: Passage, text: str) -> bool:
+    """
+    Parçayı aynı kaynaktaki pasaja eklemeye çalışır: biri diğerini kapsıyorsa veya uçları örtüşüyorsa
+    (chunk_overlap nedeniyle ardışık parçalar) tek metne birleştirir.
+    """
+    if text in passage.text:
+        return True
+    if passage.text in text:
+        passage.text = text
+        return True
+    after, before = _overlap(passage.text, text), _overlap(text, passage.text)
+    if not (after or before):
+        return False
+    # İki yönde de eşleşme varsa daha uzun örtüşme gerçek komşuluktur.
+    if after >= before:
+        passage.text += text[after:]
+    else:
+        passage.text = text + passage.text[before:]
+    return True
+
+
+def _normalize_sentence(sentence: str) -> str:
+    return " ".join(sentence.casefold().split())
+
+
+def _remove_duplicate_sentences(passages: list[Passage]) -> int:
+    """Daha önceki pasajlarda (veya aynı pasajda) geçen cümleleri çıkarır; çıkarılan cümle sayısını döndürür."""
+    seen = set()
+    removed = 0
+    for passage in passages:
+        pieces = _SENTENCE_SPLIT_RE.split(passage.text)
+        kept = []
+        # pieces: [cümle, ayraç, cümle, ayraç, ..., cümle]
+        for i in range(0, len(pieces), 2):
+            sentence = pieces[i]
+            separator = pieces[i + 1] if i + 1 < len(pieces) else ""
+            key = _normalize_sentence(sentence)
+            if len(key) >= MIN_DEDUPE_SENTENCE_CHARS:
+                if key in seen:
+                    removed += 1
+                    continue
+                seen.add(key)
+            kept.append(sentence + separator)
+        passage.text = "".join(kept).strip()
+    return removed
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Metni max_chars'a, mümkünse son cümle sonundan, değilse son boşluktan keser."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+    if boundary >= max_chars // 2:
+        return cut[:boundary + 1].rstrip()
+    boundary = cut.rfind(" ")
+    return (cut[:boundary] if boundary > 0 else cut).rstrip() + " …"
+
+
+def assemble_context(docs: list[Document], token_budget: int = 0) -> AssembledContext:
+    """
+    Erişilen parçalardan istem bağlamını oluşturur: aynı kaynaktan gelen örtüşen/ardışık parçaları birleştirir,
+    tekrarlanan cümleleri çıkarır ve (token_budget > 0 ise) alaka sırasını koruyarak bütçeye sığdırır.
+    Bütçe dışında kalan pasajların kaynakları da listeden çıkar.
+    """
+    passages: list[Passage] = []
+    for doc in docs:
+        source = doc.metadata.get("source")
+        text = doc.page_content.strip()
+        if not text:
+            continue
+        target = next((passage for passage in passages if passage.source == source and _merge(passage, text)), None)
+        if target is None:
+            passages.append(Passage(source, text))
+            continue
+        # Yeni parça iki pasaj arasındaki boşluğu doldurmuş olabilir (ör. sıra 3, 1, 2 geldiğinde).
+        for other in [p for p in passages if p is not target and p.source == source]:
+            if _merge(target, other.text):
+                passages.remove(other)
+
+    merged = sum(1 for doc in docs if doc.page_content.strip()) - len(passages)
+    duplicates = _remove_duplicate_sentences(passages)
+    passages = [passage for passage in passages if passage.text]
+
+    truncated = False
+    if token_budget > 0:
+        remaining = token_budget * CHARS_PER_TOKEN
+        kept = []
+        for passage in passages:
+            cost = len(passage.text) + (len(CONTEXT_SEPARATOR) if kept else 0)
+            if cost <= remaining:
+                kept.append(passage)
+                remaining -= cost
+                continue
+            truncated = True
+            tail_chars = remaining - (len(CONTEXT_SEPARATOR) if kept else 0)
+            # En alakalı pasaj her zaman (gerekirse kısaltılarak) istemde kalır.
+            if not kept or tail_chars >= MIN_TAIL_TOKENS * CHARS_PER_TOKEN:
+                kept.append(Passage(passage.source, _truncate(passage.text, tail_chars)))
+            break
+        passages = kept
+
+    sources = []
+    for passage in passages:
+        if passage.source and {"url": passage.source} not in sources:
+            sources.append({"url": passage.source})
+
+    return AssembledContext(
+        text=CONTEXT_SEPARATOR.join(passage.text for passage in passages),
+        sources=sources,
+        chunks=len(docs),
+        passages=len(passages),
+        merged_chunks=merged,
+        duplicate_sentences=duplicates,
+        truncated=truncated,
+        chars_before=len(CONTEXT_SEPARATOR.join(doc.page_content for doc in docs)),
+    )
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from crawler import FetchResult, saved_page_name
+
+# Önbellek dizinindeki sayfa listesi (URL -> doğrulayıcılar ve içerik özeti)
+CRAWL_CACHE_INDEX = "index.json"
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclass
+class CachedPage:
+    """Önbellekteki bir sayfanın kaydı. indexed_sha256: bilgi tabanına en son başarıyla işlenen içeriğin özeti."""
+    url: str
+    lang: str
+    sha256: str
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: str | None = None
+    indexed_sha256: str | None = None
+
+
+class CrawlCache:
+    """
+    Ham sayfa yanıtlarını doğrulayıcılarıyla (ETag, Last-Modified) ve içerik özetiyle diskte tutar.
+    Yenilemede koşullu istek başlıklarını üretir, 304 yanıtlarında gövdeyi diskten verir ve hangi içeriğin
+    bilgi tabanına işlendiğini hatırlar; ağ olmadan önbellekten yeniden oluşturmaya da olanak tanır.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pages: dict[str, CachedPage] = {}
+        self._counters = {"stored": 0, "changed": 0, "not_modified": 0}
+        path = os.path.join(directory, CRAWL_CACHE_INDEX)
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._pages = {item["url"]: CachedPage(**item) for item in json.load(f).get("pages", [])}
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                logging.warning(f"Çekme önbelleği okunamadı, boş başlanıyor: {e}")
+
+    def _body_path(self, url: str) -> str:
+        return os.path.join(self.directory, saved_page_name(url))
+
+    def load(self, url: str) -> bytes | None:
+        """Sayfanın önbellekteki ham gövdesi; yoksa veya özeti tutmuyorsa None."""
+        page = self._pages.get(url)
+        if page is None:
+            return None
+        try:
+            with open(self._body_path(url), "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        return content if content_hash(content) == page.sha256 else None
+
+    def conditional_headers(self, url: str) -> dict:
+        """Gövdesi diskte sağlam duran sayfalar için If-None-Match / If-Modified-Since başlıkları."""
+        page = self._pages.get(url)
+        if page is None or self.load(url) is None:
+            return {}
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def resolve(self, result: FetchResult) -> FetchResult:
+        """
+        Çekme sonucunu önbellekle birleştirir: 200 yanıtının gövdesi kaydedilir, 304 yanıtına gövde önbellekten
+        eklenir. 304 gelip gövde okunamazsa sonuç hatalı sayılır (sayfanın eski parçaları korunur).
+        """
+        if result.not_modified:
+            result.content = self.load(result.url)
+            with self._lock:
+                self._counters["not_modified"] += 1
+                page = self._pages.get(result.url)
+                if page is not None:
+                    # Sunucu 304 ile güncel doğrulayıcıları da gönderebilir.
+                    page.etag = result.etag or page.etag
+                    page.last_modified = result.last_modified or page.last_modified
+            if result.content is None:
+                result.status = None
+                result.error = "304 döndü ancak sayfa önbellekte yok"
+            return result
+        if result.content is not None:
+            self.store(result)
+        return result
+
+    def store(self, result: FetchResult):
+        sha256 = content_hash(result.content)
+        with self._lock:
+            previous = self._pages.get(result.url)
+            changed = previous is None or previous.sha256 != sha256
+            self._counters["stored"] += 1
+            self._counters["changed"] += changed
+        if changed or not os.path.exists(self._body_path(result.url)):
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._body_path(result.url)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(result.content)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._pages[result.url] = CachedPage(
+                url=result.url,
+                lang=result.lang_code,
+                sha256=sha256,
+                etag=result.etag,
+                last_modified=result.last_modified,
+                fetched_at=datetime.now().isoformat(timespec="seconds"),
+                indexed_sha256=previous.indexed_sha256 if previous else None
+            )
+
+    def is_indexed(self, url: str, content: bytes) -> bool:
+        """Bu içerik bilgi tabanına daha önce başarıyla işlendi mi?"""
+        page = self._pages.get(url)
+        return page is not None and page.indexed_sha256 == content_hash(content)
+
+    def mark_indexed(self, urls):
+        """Sayfaların önbellekteki içeriğini bilgi tabanına işlenmiş olarak işaretler."""
+        with self._lock:
+            for url in urls:
+                page = self._pages.get(url)
+                if page is not None:
+                    page.indexed_sha256 = page.sha256
+
+    def replay(self, lang_urls: dict[str, list[str]]):
+        """Ağa çıkmadan, önbellekteki gövdelerden çekme sonuçları üretir; önbellekte olmayan sayfalar hatalıdır."""
+        for lang_code, urls in lang_urls.items():
+            for url in urls:
+                content = self.load(url)
+                if content is None:
+                    yield FetchResult(url=url, lang_code=lang_code, error="sayfa çekme önbelleğinde yok")
+                else:
+                    page = self._pages[url]
+                    yield FetchResult(url=url, lang_code=lang_code, content=content, status=200,
+                                      etag=page.etag, last_modified=page.last_modified)
+
+    def save(self):
+        """Sayfa listesini atomik olarak yazar."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, CRAWL_CACHE_INDEX)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            pages = [asdict(page) for page in self._pages.values()]
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": datetime.now().isoformat(), "pages": pages}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "pages": len(self._pages)}
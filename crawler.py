@@ -0,0 +1,214 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# User-Agent ekleyelim, bazı siteler botları engeller.
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+# Geçici kabul edilen ve yeniden denenecek HTTP durum kodları
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    """Tek bir sayfanın çekilme sonucu."""
+    url: str
+    lang_code: str
+    content: bytes | None = None
+    status: int | None = None
+    elapsed: float = 0.0
+    attempts: int = 0
+    error: str | None = None
+    # Koşullu istekler için sunucunun doğrulayıcıları
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        """Koşullu isteğe 304 döndü: içerik gövdesiz gelir, önbellekteki kopya geçerlidir."""
+        return self.status == 304
+
+    @property
+    def ok(self) -> bool:
+        return self.content is not None or self.not_modified
+
+
+def saved_page_name(url: str) -> str:
+    """Kaydedilmiş sayfalar için URL'den okunabilir ve benzersiz bir dosya adı üretir."""
+    parts = urlsplit(url)
+    slug = f"{parts.netloc}{parts.path}".strip("/").replace("/", "__")
+    return f"{slug}.html"
+
+
+def create_session(pool_size: int = 16) -> requests.Session:
+    """Tüm iş parçacıklarının paylaştığı, bağlantı havuzlu bir oturum oluşturur."""
+    session = requests.Session()
+    # Yeniden deneme mantığı fetch_page içinde (backoff ile) yönetildiği için adapter denemesi kapalı.
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+class HostLimiter:
+    """Aynı sunucuya aynı anda açılan istek sayısını sınırlar."""
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = per_host_limit
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+
+def fetch_page(session: requests.Session, url: str, lang_code: str = "", timeout: float = 15,
+               retries: int = 3, backoff: float = 0.5, limiter: HostLimiter | None = None,
+               headers: dict | None = None) -> FetchResult:
+    """
+    Sayfayı geçici hatalarda üstel geri çekilme (backoff) ile yeniden deneyerek çeker.
+    headers ile koşullu istek (If-None-Match / If-Modified-Since) gönderilebilir; 304 yanıtı başarılıdır.
+    """
+    result = FetchResult(url=url, lang_code=lang_code)
+    start = time.perf_counter()
+
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        retryable = False
+        try:
+            if limiter is not None:
+                with limiter.for_url(url):
+                    response = session.get(url, timeout=timeout, headers=headers)
+            else:
+                response = session.get(url, timeout=timeout, headers=headers)
+            result.status = response.status_code
+
+            if response.status_code in RETRYABLE_STATUS:
+                retryable = True
+                result.error = f"HTTP {response.status_code}"
+            else:
+                response.raise_for_status()
+                if not result.not_modified:
+                    result.content = response.content
+                result.etag = response.headers.get("ETag")
+                result.last_modified = response.headers.get("Last-Modified")
+                result.error = None
+                break
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            retryable = True
+            result.error = str(e)
+        except requests.exceptions.RequestException as e:
+            # 404 gibi kalıcı hatalar yeniden denenmez.
+            result.error = str(e)
+            break
+
+        if not retryable or attempt == retries:
+            break
+        # Sunucuyu aynı anda yeniden yüklememek için rastgele sapmalı üstel bekleme
+        delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+        logging.warning(f"Tekrar denenecek ({attempt + 1}/{retries}): {url} - {result.error} - {delay:.2f}s sonra")
+        time.sleep(delay)
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def iter_fetch(lang_urls: dict[str, list[str]], max_workers: int = 8, per_host_limit: int = 4,
+               timeout: float = 15, retries: int = 3, backoff: float = 0.5,
+               session: requests.Session | None = None, max_pending: int | None = None, request_headers=None):
+    """
+    URL'leri eşzamanlı çeker ve (girdi sırası, FetchResult) çiftlerini tamamlandıkça üretir.
+    Aynı anda en fazla max_pending (varsayılan 2 x max_workers) sayfa çekilir veya tüketilmeyi bekler;
+    böylece tüketici yavaşsa çekilmiş sayfalar bellekte birikmez.
+    request_headers(url) verilirse dönen başlıklar (ör. koşullu istek başlıkları) o URL'nin isteğine eklenir.
+    """
+    jobs = [(lang_code, url) for lang_code, urls in lang_urls.items() for url in urls]
+    if not jobs:
+        return
+    max_pending = max(max_pending or 2 * max_workers, 1)
+
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size=max_workers)
+    limiter = HostLimiter(per_host_limit)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawler") as executor:
+            remaining = iter(enumerate(jobs))
+            futures = {}
+            done_count = 0
+            try:
+                while True:
+                    for index, (lang_code, url) in islice(remaining, max_pending - len(futures)):
+                        headers = request_headers(url) if request_headers else None
+                        future = executor.submit(fetch_page, session, url, lang_code, timeout, retries, backoff,
+                                                 limiter, headers)
+                        futures[future] = index
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = futures.pop(future)
+                        result = future.result()
+                        done_count += 1
+                        status = ("DEĞİŞMEDİ (304)" if result.not_modified else "OK") if result.ok \
+                            else f"HATA ({result.error})"
+                        logging.info(f"[{done_count}/{len(jobs)}] {result.url} - {status} - {result.elapsed:.2f}s")
+                        yield index, result
+            finally:
+                # Tüketici erken durursa (hata/kesinti) henüz başlamamış istekler gönderilmez.
+                for future in futures:
+                    future.cancel()
+    finally:
+        if own_session:
+            session.close()
+
+
+def fetch_all(lang_urls: dict[str, list[str]], max_workers: int = 8, per_host_limit: int = 4,
+              timeout: float = 15, retries: int = 3, backoff: float = 0.5,
+              session: requests.Session | None = None) -> list[FetchResult]:
+    """
+    Tüm dillerdeki URL'leri paylaşılan oturum ve iş parçacığı havuzu ile eşzamanlı çeker.
+    Sonuçlar, girdideki (dil, URL) sırasıyla döndürülür; böylece sonraki adımlar deterministik kalır.
+    """
+    start = time.perf_counter()
+    jobs_count = sum(len(urls) for urls in lang_urls.values())
+    results = dict(iter_fetch(lang_urls, max_workers, per_host_limit, timeout, retries, backoff, session,
+                              max_pending=max(jobs_count, 1)))
+    ordered = [results[index] for index in range(len(results))]
+    if ordered:
+        log_fetch_summary(ordered, time.perf_counter() - start)
+    return ordered
+
+
+def log_fetch_summary(results: list[FetchResult], total_seconds: float):
+    """Çekme aşamasının süre ve başarı özetini loglar."""
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    total_bytes = sum(len(r.content or b"") for r in succeeded)
+    sequential_seconds = sum(r.elapsed for r in results)
+    logging.info(
+        f"Çekme özeti: {len(succeeded)}/{len(results)} sayfa başarılı, {len(failed)} başarısız, "
+        f"{total_bytes / 1024:.1f} KB, toplam {total_seconds:.2f}s "
+        f"(sıralı olsaydı ~{sequential_seconds:.2f}s)"
+    )
+    if results:
+        slowest = max(results, key=lambda r: r.elapsed)
+        logging.info(f"En yavaş sayfa: {slowest.url} ({slowest.elapsed:.2f}s, {slowest.attempts} deneme)")
+    for r in failed:
+        logging.error(f"Hata: {r.url} adresine erişilemedi: {r.error}")
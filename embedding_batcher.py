@@ -0,0 +1,72 @@
+import logging
+import threading
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.texts: list[str] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.vectors: list[list[float]] | None = None
+        self.error: BaseException | None = None
+
+
+class QueryEmbeddingBatcher:
+    """
+    Kısa bir zaman penceresinde gelen sorgu metinlerini toplayıp tek bir toplu gömme çağrısıyla gömer
+    ve her vektörü bekleyen çağırana geri dağıtır. Ayrı bir iş parçacığı kullanılmaz: partiyi açan
+    ilk çağrı pencere süresi kadar (veya parti dolana kadar) bekler ve çağrıyı kendisi yapar.
+    """
+
+    def __init__(self, embed_batch_fn, window_ms: float = 5.0, max_batch_size: int = 32):
+        self.embed_batch_fn = embed_batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._open: _PendingBatch | None = None
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "batches": 0, "max_batch_size_seen": 0, "errors": 0}
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _PendingBatch()
+            index = len(batch.texts)
+            batch.texts.append(text)
+            self._counters["queries"] += 1
+            if len(batch.texts) >= self.max_batch_size:
+                # Dolan parti kapatılır; sonraki sorgular yeni bir parti açar.
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+                self._counters["batches"] += 1
+                self._counters["max_batch_size_seen"] = max(self._counters["max_batch_size_seen"], len(batch.texts))
+            try:
+                batch.vectors = self.embed_batch_fn(list(batch.texts))
+            except BaseException as e:
+                batch.error = e
+                with self._lock:
+                    self._counters["errors"] += 1
+                logging.warning(f"Toplu sorgu gömmesi başarısız ({len(batch.texts)} sorgu): {e}")
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.vectors[index]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["avg_batch_size"] = round(stats["queries"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["window_ms"] = self.window * 1000.0
+        stats["max_batch_size"] = self.max_batch_size
+        return stats
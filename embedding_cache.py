@@ -0,0 +1,176 @@
+import hashlib
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_batcher import QueryEmbeddingBatcher
+
+# Sorgu ve doküman gömmeleri farklı görev tipleriyle üretilir (retrieval_query / retrieval_document),
+# bu yüzden aynı metin için iki ayrı kayıt tutulur.
+QUERY_TASK = "query"
+DOCUMENT_TASK = "document"
+
+
+def normalize_text(text: str) -> str:
+    """Gömme anahtarı için metni normalleştirir (Unicode NFC ve boşluk sadeleştirme)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _encode(vector) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode(blob: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Herhangi bir LangChain gömme fonksiyonunu bellek içi LRU + disk (SQLite) önbelleği ile sarar.
+    Anahtar; model adı, görev tipi ve normalleştirilmiş metnin özetidir, böylece yeniden başlatmalardan
+    sonra da tekrar eden sorgular ve aynı metin parçaları ağ çağrısı yapmadan döner.
+    query_batch_window_ms > 0 ise önbellekte bulunmayan sorgular kısa bir pencerede toplanıp
+    tek bir toplu çağrıyla gömülür.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, db_path: str | None = None,
+                 memory_size: int = 4096, query_batch_window_ms: float = 0.0, query_batch_size: int = 32):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self.query_batcher = None
+        if query_batch_window_ms > 0:
+            self.query_batcher = QueryEmbeddingBatcher(self._embed_query_batch, query_batch_window_ms,
+                                                       query_batch_size)
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def _key(self, text: str, task: str) -> str:
+        raw = f"{self.model_name}\x00{task}\x00{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- Önbellek katmanları ---
+
+    def _remember(self, key: str, vector: list[float]):
+        """Vektörü bellek içi LRU'ya ekler (kilit altında çağrılır)."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: list[str]) -> dict[str, list[float]]:
+        """Önce bellekte, sonra diskte arar; bulunanları anahtar -> vektör olarak döndürür."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self._counters["memory_hits"] += 1
+
+            remaining = [key for key in keys if key not in found]
+            if remaining and self._db is not None:
+                # SQLite parametre sınırına takılmamak için parçalı sorgu
+                for start in range(0, len(remaining), 500):
+                    part = remaining[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = _decode(blob)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self._counters["disk_hits"] += 1
+        return found
+
+    def _store(self, items: dict[str, list[float]]):
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is not None and items:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                        [(key, self.model_name, _encode(vector)) for key, vector in items.items()]
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # Disk önbelleği yazılamasa bile gömme sonucu kullanılabilir.
+                    logging.warning(f"Gömme önbelleği diske yazılamadı: {e}")
+
+    def _embed_cached(self, texts: list[str], task: str, embed_fn) -> list[list[float]]:
+        keys = [self._key(text, task) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Aynı istekte tekrar eden metinler yalnızca bir kez gömülür.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            with self._lock:
+                self._counters["misses"] += len(missing)
+            vectors = embed_fn(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    # --- Embeddings arayüzü ---
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed_cached(texts, DOCUMENT_TASK, self.underlying.embed_documents)
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.query_batcher is not None:
+            embed_one = self.query_batcher.embed_query
+        else:
+            embed_one = self.underlying.embed_query
+        return self._embed_cached([text], QUERY_TASK, lambda missing: [embed_one(missing[0])])[0]
+
+    def _embed_query_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Birden fazla sorguyu tek çağrıda gömer. Google istemcisi embed_documents'a task_type kabul eder;
+        böylece vektörler embed_query ile aynı (retrieval_query) görev tipinde üretilir.
+        Desteklemeyen gömme fonksiyonlarında sorgular tek tek gömülür.
+        """
+        if len(texts) > 1 and "task_type" in inspect.signature(self.underlying.embed_documents).parameters:
+            return self.underlying.embed_documents(texts, task_type="retrieval_query")
+        return [self.underlying.embed_query(text) for text in texts]
+
+    def stats(self) -> dict:
+        """Bellek/disk isabet ve ıska sayaçlarını döndürür."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_size"] = len(self._memory)
+        stats["max_memory_size"] = self.memory_size
+        stats["persistent"] = self._db is not None
+        if self.query_batcher is not None:
+            stats["query_batching"] = self.query_batcher.stats()
+        return stats
@@ -0,0 +1,235 @@
+import base64
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+from answer_cache import normalize_query
+from lexical_index import tokenize
+
+# build_faq.py'nin ürettiği, Chroma deposunun yanında tutulan hazır yanıt dosyası
+FAQ_STORE_FILE = "faq_answers.json"
+# Döndürülmüş log dosyalarının zaman eki (request_log.SizeAndTimeRotatingFileHandler, logrotate.conf)
+_ROTATION_SUFFIX_RE = re.compile(r"\.\d{4}-\d{2}-\d{2}[^/\\]*$")
+# Benzerlik eşleşmesinde karşılaştırılan anahtar kelimelerin en kısa uzunluğu ("is", "la", "ne" sayılmaz)
+MIN_KEY_TERM_CHARS = 4
+
+
+def faq_store_path(db_dir: str) -> str:
+    return os.path.join(db_dir, FAQ_STORE_FILE)
+
+
+def key_terms(text: str) -> frozenset[str]:
+    return frozenset(token for token in tokenize(text) if len(token) >= MIN_KEY_TERM_CHARS)
+
+
+@dataclass
+class FaqAnswer:
+    """Çevrimdışı üretilmiş tek bir sık sorulan soru yanıtı."""
+    lang: str
+    query: str
+    response: str
+    sources: list
+    count: int
+    embedding: np.ndarray | None = field(default=None, repr=False)
+
+
+def _encode_embedding(embedding) -> str | None:
+    if embedding is None:
+        return None
+    return base64.b64encode(np.asarray(embedding, dtype=np.float16).tobytes()).decode("ascii")
+
+
+def _decode_embedding(data: str | None) -> np.ndarray | None:
+    if not data:
+        return None
+    return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
+
+def mine_frequent_queries(logged_queries, detect_lang, min_count: int = 3,
+                          max_per_lang: int = 200) -> list[tuple[str, str, int]]:
+    """
+    Loglardaki (yol, sorgu, dil) kayıtlarından dil başına en sık sorulan soruları (dil, sorgu, sayı) olarak döndürür.
+    Sorgular normalize_query ile gruplanır; grubun en sık yazılışı temsilci seçilir. Aynı istek hem metin
+    loguna hem JSONL kaydına yazıldığından sayılar log ailesi (döndürülmüş dosyalar dahil) başına tutulur ve
+    aileler arasında en büyüğü alınır.
+    """
+    counts_by_family: dict[str, Counter] = defaultdict(Counter)
+    spellings: dict[tuple, Counter] = defaultdict(Counter)
+    for path, query, lang in logged_queries:
+        query = query.strip()
+        key = normalize_query(query)
+        if not key:
+            continue
+        group = (lang or detect_lang(query), key)
+        counts_by_family[_ROTATION_SUFFIX_RE.sub("", path)][group] += 1
+        spellings[group][query] += 1
+
+    totals = Counter()
+    for counts in counts_by_family.values():
+        for group, count in counts.items():
+            totals[group] = max(totals[group], count)
+
+    per_lang = Counter()
+    frequent = []
+    for (lang, key), count in totals.most_common():
+        if count < min_count:
+            break
+        if per_lang[lang] >= max_per_lang:
+            continue
+        per_lang[lang] += 1
+        frequent.append((lang, spellings[(lang, key)].most_common(1)[0][0], count))
+    return frequent
+
+
+def save_faq_store(path: str, answers: list[FaqAnswer], kb_version: str | None):
+    """Yanıtları, üretildikleri bilgi tabanı sürümüyle birlikte atomik olarak kaydeder."""
+    payload = {
+        "kb_version": kb_version,
+        "built_at": datetime.now().isoformat(),
+        "answers": [{
+            "lang": answer.lang,
+            "query": answer.query,
+            "response": answer.response,
+            "sources": answer.sources,
+            "count": answer.count,
+            "embedding": _encode_embedding(answer.embedding)
+        } for answer in answers]
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class FaqStore:
+    """
+    Hazır yanıt deposu: önce (dil, normalleştirilmiş sorgu) ile birebir eşleşme, ardından (açıksa)
+    sorgu gömmesinin dil bazlı matrisle kosinüs benzerliği. Dosya değiştiğinde yeniden yüklenir; dosya
+    geçerli bilgi tabanı sürümü (version_fn) için üretilmemişse hiçbir yanıt döndürülmez.
+
+    Adları yakın tedaviler (sleeve/bypass, FUE/DHI) eşiği kolayca geçtiğinden benzerlik eşleşmesi ayrıca
+    anahtar kelimelerle doğrulanır: eşleşen sorunun anahtar kelimelerinin tümü sorguda geçmeli, sorgunun o dildeki
+    hazır sorularda geçen anahtar kelimeleri de eşleşen soruda bulunmalıdır.
+    """
+
+    def __init__(self, path_fn, version_fn=None, similarity_threshold: float = 0.0, check_interval: float = 5.0):
+        self._path_fn = path_fn
+        self._version_fn = version_fn
+        self.similarity_threshold = similarity_threshold
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._exact: dict[tuple[str, str], FaqAnswer] = {}
+        self._matrices: dict[str, tuple[np.ndarray, list[FaqAnswer]]] = {}
+        # dil -> hazır soruların anahtar kelimeleri (soru başına) ve dildeki tüm anahtar kelimeler
+        self._terms: dict[str, tuple[list[frozenset[str]], frozenset[str]]] = {}
+        self._loaded_key = None
+        self._checked_at = 0.0
+        self._state = {"entries": 0, "kb_version": None, "stale": False}
+        self._counters = {"hits": 0, "similar_hits": 0, "similar_rejected": 0, "misses": 0}
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity_threshold > 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        path = self._path_fn()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        version = self._version_fn() if self._version_fn else None
+        if (path, mtime, version) != self._loaded_key:
+            self._load(path, mtime, version)
+
+    def _load(self, path: str, mtime, version):
+        exact, by_lang = {}, defaultdict(list)
+        state = {"entries": 0, "kb_version": None, "stale": False}
+        if mtime is not None:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    payload = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"FAQ deposu okunamadı ({path}): {e}")
+                payload = {"answers": []}
+            state["kb_version"] = payload.get("kb_version")
+            if self._version_fn and payload.get("kb_version") != version:
+                # Bilgi tabanı yeniden oluşturulmuş, depo henüz yeniden üretilmemiş: eski yanıtlar sunulmaz.
+                state["stale"] = True
+                logging.warning("FAQ deposu bilgi tabanının eski bir sürümü için üretilmiş; yeniden üretilene kadar kullanılmıyor.")
+            else:
+                for item in payload.get("answers", []):
+                    answer = FaqAnswer(item["lang"], item["query"], item["response"], item.get("sources", []),
+                                       item.get("count", 0), _decode_embedding(item.get("embedding")))
+                    exact[(answer.lang, normalize_query(answer.query))] = answer
+                    if answer.embedding is not None:
+                        by_lang[answer.lang].append(answer)
+                state["entries"] = len(exact)
+
+        matrices, terms = {}, {}
+        for lang, answers in by_lang.items():
+            matrix = np.stack([answer.embedding for answer in answers])
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            matrices[lang] = (matrix, answers)
+            answer_terms = [key_terms(answer.query) for answer in answers]
+            terms[lang] = (answer_terms, frozenset().union(*answer_terms))
+
+        with self._lock:
+            self._exact, self._matrices, self._terms, self._state = exact, matrices, terms, state
+            self._loaded_key = (path, mtime, version)
+        if state["entries"]:
+            logging.info(f"FAQ deposu yüklendi: {state['entries']} hazır yanıt.")
+
+    def has_language(self, lang_code: str) -> bool:
+        self._refresh()
+        return lang_code in self._matrices
+
+    def get(self, lang_code: str, query: str) -> FaqAnswer | None:
+        """Birebir (normalleştirilmiş) eşleşme."""
+        self._refresh()
+        answer = self._exact.get((lang_code, normalize_query(query)))
+        with self._lock:
+            self._counters["hits" if answer is not None else "misses"] += 1
+        return answer
+
+    def get_similar(self, lang_code: str, query: str, embedding) -> FaqAnswer | None:
+        """
+        Sorgu gömmesine en yakın hazır yanıtı, benzerlik eşiği aşılıyor ve anahtar kelimeler uyuşuyorsa döndürür.
+        """
+        with self._lock:
+            entry = self._matrices.get(lang_code)
+            answer_terms, vocabulary = self._terms.get(lang_code, ([], frozenset()))
+        if not self.similarity_enabled or entry is None:
+            return None
+        matrix, answers = entry
+        vector = np.asarray(embedding, dtype=np.float32)
+        scores = matrix @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        query_terms = key_terms(query)
+        if not answer_terms[best] <= query_terms or not (query_terms & vocabulary) <= answer_terms[best]:
+            logging.info(f"FAQ benzerlik eşleşmesi anahtar kelimeler uyuşmadığı için reddedildi "
+                         f"({scores[best]:.3f}): '{query}' ~ '{answers[best].query}'")
+            with self._lock:
+                self._counters["similar_rejected"] += 1
+            return None
+        with self._lock:
+            self._counters["similar_hits"] += 1
+        return answers[best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._state, **self._counters, "similarity_threshold": self.similarity_threshold}
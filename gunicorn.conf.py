@@ -0,0 +1,32 @@
+# Üretim sunucusu yapılandırması
+# Kullanım: gunicorn -c gunicorn.conf.py
+#
+# /chat istekleri zamanlarının neredeyse tamamını Gemini ve gömme API'lerini beklerken geçirir (G/Ç).
+# Bu yüzden "gthread" işçileri kullanılır: her işçi süreci çok sayıda iş parçacığıyla yüzlerce eşzamanlı
+# oturumu taşır, LLM çağrıları ise app.py'deki LLM_MAX_CONCURRENCY/LLM_MAX_QUEUE ile sınırlanır.
+# Örn. 4 işçi x 64 iş parçacığı = 256 eşzamanlı bağlantı; kuyruk dolarsa istemci hızlıca 503 alır.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+wsgi_app = "app:app"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "64"))
+# Kabul edilmeyi bekleyen bağlantı kuyruğu
+backlog = int(os.getenv("GUNICORN_BACKLOG", "2048"))
+# gthread işçilerinde bu bir istek süresi DEĞİLDİR: ana süreç, bu kadar saniye canlılık sinyali göndermeyen
+# işçiyi yeniden başlatır (askıda bir LLM çağrısı işçinin sinyal göndermesini engellemez). İstek başına üst süre
+# app.py'deki REQUEST_TIMEOUT_SECONDS'tır (süre dolunca 504); bu değer ondan büyük tutulmalıdır.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# app modülü ana süreçte bir kez içe aktarılır (bellek paylaşımı için); RAG bileşenleri (gRPC istemcileri,
+# SQLite bağlantıları) fork'a karşı güvenli olmadığından ana süreçte YÜKLENMEZ, her işçi kendisi yükler.
+preload_app = True
+
+
+def post_worker_init(worker):
+    """İşçi istek kabul etmeden önce RAG sistemini hazır hale getirir; /readyz ancak bundan sonra 200 döner."""
+    from app import initialize_rag_system
+    initialize_rag_system()
@@ -0,0 +1,129 @@
+import logging
+import os
+from collections import Counter
+
+from bs4 import BeautifulSoup, UnicodeDammit
+
+try:
+    from bs4.filter import ElementFilter
+except ImportError:  # bs4 < 4.13: yalnızca tam ayrıştırma kullanılır
+    ElementFilter = None
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Ana içeriğin arandığı yerler, öncelik sırasıyla: <main>, <article>, id="content"
+CONTENT_TAGS = ("main", "article")
+CONTENT_ID = "content"
+
+# "fast": yalnızca ana içerik alt ağaçları ağaca alınır; "reference": tüm sayfa html.parser ile ayrıştırılır
+HTML_EXTRACTION_ENGINE = os.getenv("HTML_EXTRACTION_ENGINE", "fast")
+# Hızlı yolun ayrıştırıcısı. html.parser referansla birebir aynı metni üretir; lxml (C) daha hızlıdır ancak
+# bozuk işaretlemede (noktalı virgülsüz varlıklar, bozuk yorumlar, CDATA) farklı metin üretebilir.
+HTML_EXTRACTION_PARSER = os.getenv("HTML_EXTRACTION_PARSER", "html.parser")
+
+# Hızlı yolun kaç sayfada kullanıldığı ve kaç sayfada tam ayrıştırmaya düşüldüğü
+extraction_counts = Counter()
+
+
+def _find_main_content(soup: BeautifulSoup):
+    return soup.find(CONTENT_TAGS[0]) or soup.find(CONTENT_TAGS[1]) or soup.find(id=CONTENT_ID)
+
+
+def _normalize(main_content) -> str:
+    # Birden fazla boşluğu ve yeni satırı tek boşluğa indirgeyin
+    return " ".join(main_content.get_text().split())
+
+
+if ElementFilter is not None:
+    class _MainContentFilter(ElementFilter):
+        """
+        Ayrıştırma sırasında yalnızca aday ana içerik elemanlarının (ve tüm alt ağaçlarının) ağaca eklenmesine
+        izin verir. BeautifulSoup bu kararı yalnızca en üst seviyede sorar; aday bir elemanın içindeki her şey korunur.
+        """
+
+        def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+            return name in CONTENT_TAGS or (attrs or {}).get("id") == CONTENT_ID
+
+        def allow_string_creation(self, string) -> bool:
+            return False
+
+    _MAIN_CONTENT_FILTER = _MainContentFilter()
+else:
+    _MAIN_CONTENT_FILTER = None
+
+
+class _MainContentSoup(BeautifulSoup):
+    """
+    Süzülmüş ağaçta, aday elemanların dışındaki açık etiketler yığında yoktur. Tam ayrıştırmada bunların
+    sonucu değiştirebildiği iki durum işaretlenir (needs_full_parse):
+    - aday içinde, içeride açık karşılığı olmayan bir kapanış etiketi (ör. <div><main>...</div>): tam ağaçta
+      dıştaki elemanı ve onunla birlikte adayı kapatır;
+    - dışarıda açık bir <template> içindeki aday: metinleri TemplateString olur ve get_text'e girmez.
+    """
+
+    def reset(self):
+        super().reset()
+        self.needs_full_parse = False
+        self._outer_templates = 0
+
+    def handle_starttag(self, name, *args, **kwargs):
+        outside = len(self.tagStack) <= 1
+        if outside and name == "template":
+            self._outer_templates += 1
+        tag = super().handle_starttag(name, *args, **kwargs)
+        if outside and tag is not None and self._outer_templates:
+            self.needs_full_parse = True
+        return tag
+
+    def handle_endtag(self, name, nsprefix=None):
+        if len(self.tagStack) > 1:
+            if not self.open_tag_counter.get(name):
+                self.needs_full_parse = True
+        elif name == "template" and self._outer_templates:
+            self._outer_templates -= 1
+        super().handle_endtag(name, nsprefix)
+
+
+def resolve_parser(parser: str = HTML_EXTRACTION_PARSER) -> str:
+    if parser == "lxml" and not LXML_AVAILABLE:
+        logging.warning("HTML_EXTRACTION_PARSER=lxml ancak lxml kurulu değil; html.parser kullanılıyor.")
+        return "html.parser"
+    return parser
+
+
+def extract_reference(content: bytes) -> str | None:
+    """Tüm sayfayı html.parser ile ayrıştırır (önceki yol); ana içerik yoksa None."""
+    main_content = _find_main_content(BeautifulSoup(content, "html.parser"))
+    return _normalize(main_content) if main_content else None
+
+
+def extract_fast(content: bytes, parser: str = HTML_EXTRACTION_PARSER) -> str | None:
+    """
+    Yalnızca <main>/<article>/#content alt ağaçlarını ağaca alır; sayfanın geri kalanı (menü, footer, script)
+    için Tag nesnesi oluşturulmaz. html.parser ile sonucun referanstan farklı olabileceği sayfalarda
+    tam ayrıştırmaya düşülür.
+    """
+    if _MAIN_CONTENT_FILTER is None:
+        extraction_counts["reference"] += 1
+        return extract_reference(content)
+    parser = resolve_parser(parser)
+    # Kod çözme, referans yolla aynı UnicodeDammit sezgisiyle bir kez yapılır.
+    markup = UnicodeDammit(content, is_html=True).unicode_markup if isinstance(content, bytes) else content
+    soup = _MainContentSoup(markup, parser, parse_only=_MAIN_CONTENT_FILTER)
+    if parser == "html.parser" and soup.needs_full_parse:
+        extraction_counts["full_parse_fallback"] += 1
+        return extract_reference(content)
+    extraction_counts["fast"] += 1
+    main_content = _find_main_content(soup)
+    return _normalize(main_content) if main_content else None
+
+
+def extract_main_text(content: bytes, engine: str = HTML_EXTRACTION_ENGINE) -> str | None:
+    """Sayfanın ana içerik metnini boşlukları tekilleştirilmiş olarak döndürür; ana içerik yoksa None."""
+    if engine == "reference":
+        return extract_reference(content)
+    return extract_fast(content)
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from ingestion import iter_batches
+
+# Dil -> Chroma koleksiyonu eşlemesi (CHROMA_DB_DIR içinde, load_data.py yazar). Dosya yoksa depo eski,
+# tüm dilleri tek koleksiyonda tutan düzendedir ve aramalar dil filtresiyle yapılır.
+SHARD_LAYOUT_FILE = "index_shards.json"
+# Eski koleksiyondan kopyalarken tek seferde okunan kayıt sayısı
+_COPY_BATCH_SIZE = 500
+
+
+def shard_collection_name(base_name: str, lang_code: str) -> str:
+    return f"{base_name}_{lang_code}"
+
+
+def shard_layout_path(db_dir: str) -> str:
+    return os.path.join(db_dir, SHARD_LAYOUT_FILE)
+
+
+def read_shard_layout(db_dir: str) -> dict[str, str] | None:
+    """Dil -> koleksiyon adı eşlemesi; dosya yoksa veya okunamazsa None (tek koleksiyonlu eski düzen)."""
+    try:
+        with open(shard_layout_path(db_dir), encoding="utf-8") as f:
+            return json.load(f)["collections"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_shard_layout(db_dir: str, collections: dict[str, str]):
+    """Eşlemeyi atomik olarak yazar."""
+    os.makedirs(db_dir, exist_ok=True)
+    path = shard_layout_path(db_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": datetime.now().isoformat(), "collections": collections}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class ShardedCollection:
+    """
+    Dil başına Chroma koleksiyonlarını, eşitleme ve gömme kodunun beklediği tek koleksiyon arayüzüyle
+    (get/upsert/delete) sunar: yazılan kayıtlar metadata'daki dile göre kendi koleksiyonuna yönlendirilir,
+    okumalar tüm koleksiyonları birleştirir.
+    """
+
+    def __init__(self, collections: dict[str, object]):
+        self.collections = collections
+
+    @property
+    def metadata(self) -> dict:
+        # Tüm koleksiyonlar aynı ayarlarla (uzaklık uzayı) oluşturulur.
+        return next((collection.metadata or {} for collection in self.collections.values()), {})
+
+    def get(self, where: dict | None = None, include=("metadatas",)) -> dict:
+        merged = {"ids": [], **{key: [] for key in include}}
+        for collection in self.collections.values():
+            data = collection.get(where=where, include=list(include))
+            for key in merged:
+                if data.get(key) is not None:
+                    merged[key].extend(data[key])
+        return merged
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        grouped: dict[str, tuple[list, list, list, list]] = {}
+        for record in zip(ids, embeddings, documents, metadatas):
+            lang = (record[3] or {}).get("lang")
+            if lang not in self.collections:
+                raise ValueError(f"'{lang}' dili için koleksiyon yok (parça {record[0]})")
+            for values, value in zip(grouped.setdefault(lang, ([], [], [], [])), record):
+                values.append(value)
+        for lang, (lang_ids, lang_embeddings, lang_documents, lang_metadatas) in grouped.items():
+            self.collections[lang].upsert(ids=lang_ids, embeddings=lang_embeddings, documents=lang_documents,
+                                          metadatas=lang_metadatas)
+
+    def delete(self, ids):
+        # Kimlikler içerik özetidir; hangi dilde olduğuna bakmadan her koleksiyondan silinir (olmayanlar yok sayılır).
+        for collection in self.collections.values():
+            collection.delete(ids=list(ids))
+
+    def copy_from(self, collection) -> int:
+        """
+        Tek koleksiyonlu eski düzenden geçiş: parçaları gömmeleriyle birlikte dil koleksiyonlarına kopyalar
+        (gömme API'si çağrılmaz). Yapılandırmada olmayan dillerin parçaları atlanır. Kopyalanan sayıyı döndürür.
+        """
+        copied = 0
+        ids = collection.get(include=[])["ids"]
+        for batch in iter_batches(ids, _COPY_BATCH_SIZE):
+            data = collection.get(ids=batch, include=["embeddings", "documents", "metadatas"])
+            records = [record for record in zip(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+                       if (record[3] or {}).get("lang") in self.collections]
+            if records:
+                self.upsert(*map(list, zip(*records)))
+                copied += len(records)
+        return copied
+
+
+class LanguageShards:
+    """
+    Dil başına vektör deposunu (ve varsa bellekteki vektör indeksini) ilk kullanımda yükler; her dil yalnızca
+    kendi parçalarını yükler ve arar. langs verilirse işçi bu dillere sabitlenir, diğer diller hiç yüklenmez.
+    Eski tek koleksiyonlu düzende (lang_filter=True) tüm diller aynı depoyu paylaşır ve dil filtresi kullanılır.
+
+    open_store(koleksiyon adı) bir LangChain Chroma deposu, load_index(dil, depo, filtre) bir VectorIndex
+    (veya None) döndürür.
+    """
+
+    def __init__(self, collections: dict[str, str], embeddings, open_store, langs=None, load_index=None,
+                 lang_filter: bool = False):
+        self.collections = collections
+        self.embeddings = embeddings
+        self.langs = list(langs) if langs is not None else list(collections)
+        self.lang_filter = lang_filter
+        self._open_store = open_store
+        self._load_index = load_index
+        self._stores: dict[str, object] = {}
+        self._indexes: dict[str, object] = {}
+        self._load_seconds: dict[str, float] = {}
+        self._locks = {lang: threading.Lock() for lang in self.langs}
+
+    @property
+    def layout(self) -> str:
+        return "legacy" if self.lang_filter else "per_lang"
+
+    def serves(self, lang_code: str) -> bool:
+        return lang_code in self._locks
+
+    def search_filter(self, lang_code: str) -> dict | None:
+        return {"lang": lang_code} if self.lang_filter else None
+
+    def _load(self, lang_code: str) -> bool:
+        """Dilin deposunu ve indeksini (bir kez) yükler; dil bu işçide sunulmuyorsa veya parçası yoksa False."""
+        if lang_code in self._stores:
+            return self._stores[lang_code] is not None
+        lock = self._locks.get(lang_code)
+        if lock is None:
+            return False
+        with lock:
+            if lang_code not in self._stores:
+                start = time.perf_counter()
+                name = self.collections.get(lang_code)
+                store = None
+                if name is not None:
+                    # Eski düzende diller aynı koleksiyonu paylaşır; depo bir kez açılır.
+                    store = next((s for lang, s in list(self._stores.items())
+                                  if s is not None and self.collections.get(lang) == name), None)
+                    if store is None:
+                        store = self._open_store(name)
+                if store is not None and self._load_index is not None:
+                    self._indexes[lang_code] = self._load_index(lang_code, store, self.search_filter(lang_code))
+                self._load_seconds[lang_code] = round(time.perf_counter() - start, 3)
+                self._stores[lang_code] = store
+                if store is None:
+                    logging.warning(f"'{lang_code}' dili için bilgi tabanında parça yok.")
+                else:
+                    logging.info(f"'{lang_code}' dili yüklendi ({self._load_seconds[lang_code]}s).")
+        return self._stores[lang_code] is not None
+
+    def store(self, lang_code: str):
+        """Dilin Chroma deposu; dil sunulmuyorsa veya parçası yoksa None."""
+        return self._stores[lang_code] if self._load(lang_code) else None
+
+    def index(self, lang_code: str):
+        """Dilin bellekteki vektör indeksi (numpy/compact arka uçları); yoksa None."""
+        return self._indexes.get(lang_code) if self._load(lang_code) else None
+
+    def preload(self, langs):
+        for lang_code in langs:
+            self._load(lang_code)
+
+    @property
+    def loaded_langs(self) -> list[str]:
+        return [lang for lang, store in self._stores.items() if store is not None]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(index.nbytes for index in list(self._indexes.values()) if index is not None)
+
+    @property
+    def mapped_bytes(self) -> int:
+        return sum(index.mapped_bytes for index in list(self._indexes.values()) if index is not None)
+
+    def stats(self) -> dict:
+        return {
+            "layout": self.layout,
+            "served": self.langs,
+            "loaded": dict(self._load_seconds),
+            "vector_index": {lang: index.stats() for lang, index in list(self._indexes.items()) if index is not None},
+        }
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable
+
+from langchain_core.documents import Document
+
+from ingestion import iter_batches
+
+# Koleksiyonda nelerin indekslendiğini kaydeden dosya (CHROMA_DB_DIR içinde)
+MANIFEST_FILE = "index_manifest.json"
+# Chroma'ya tek seferde gönderilecek en fazla kayıt sayısı
+UPSERT_BATCH_SIZE = 500
+
+
+def chunk_id(url: str, text: str) -> str:
+    """URL ve parça içeriğinden kararlı bir kimlik üretir; içerik değişmedikçe kimlik de değişmez."""
+    return hashlib.sha256(f"{url}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def manifest_path(db_dir: str) -> str:
+    return os.path.join(db_dir, MANIFEST_FILE)
+
+
+def indexed_sources(db_dir: str) -> set[str]:
+    """Manifeste göre koleksiyonda parçası bulunan sayfalar; manifest yoksa veya okunamazsa boş küme."""
+    try:
+        with open(manifest_path(db_dir), encoding="utf-8") as f:
+            chunks = json.load(f).get("chunks", {})
+    except (OSError, ValueError):
+        return set()
+    return {metadata.get("source") for metadata in chunks.values()}
+
+
+def save_manifest(db_dir: str, chunks: dict[str, dict], **extra):
+    """Manifesti atomik olarak yazar."""
+    os.makedirs(db_dir, exist_ok=True)
+    path = manifest_path(db_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": datetime.now().isoformat(), **extra, "chunks": chunks}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class SyncPlan:
+    """Koleksiyonun güncel doküman kümesiyle eşitlenmesinin sonucu."""
+    added: int = 0
+    to_delete: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.to_delete)
+
+
+def indexed_chunks(vectorstore) -> dict[str, dict]:
+    """Koleksiyondaki tüm kimlikleri metadata'larıyla (source, lang) birlikte döndürür."""
+    existing = vectorstore.get(include=["metadatas"])
+    return {cid: metadata or {} for cid, metadata in zip(existing["ids"], existing["metadatas"])}
+
+
+def sync_collection(vectorstore, documents: Iterable[Document], db_dir: str,
+                    synced_sources: set[str] | None, known_sources: set[str], ingest=None) -> SyncPlan:
+    """
+    Koleksiyonu içerik özetine dayalı olarak artımlı günceller: yalnızca yeni parçalar gömülür,
+    kaybolan parçalar silinir, değişmeyenlere dokunulmaz. Sonunda manifest yeniden yazılır.
+
+    documents akış olarak tüketilir: yeni parçalar geldikçe (kimlik, Document) çiftleri halinde ingest'e
+    aktarılır, bellekte yalnızca kimlikler ve metadata tutulur.
+    synced_sources: bu çalıştırmada başarıyla çekilen sayfalar; yalnızca bunların eski parçaları silinir,
+    böylece geçici olarak erişilemeyen bir sayfanın içeriği indeksten düşmez. Akış tüketilirken
+    doldurulabilir; None ise dokümanlardaki kaynaklar kullanılır.
+    known_sources: yapılandırmadaki tüm URL'ler; listeden çıkarılan sayfaların parçaları silinir.
+    ingest: yeni parçaları gömüp yazan fonksiyon; verilmezse add_documents kullanılır.
+    """
+    indexed = indexed_chunks(vectorstore)
+    plan = SyncPlan()
+    # Bu çalıştırmadaki her parçanın kaynağı ve dili; aynı sayfadaki birebir tekrar eden parçalar tekilleştirilir.
+    current: dict[str, dict] = {}
+
+    def new_documents():
+        for doc in documents:
+            cid = chunk_id(doc.metadata["source"], doc.page_content)
+            if cid in current:
+                continue
+            current[cid] = {"source": doc.metadata["source"], "lang": doc.metadata["lang"]}
+            if cid in indexed:
+                plan.unchanged += 1
+                continue
+            plan.added += 1
+            yield cid, doc
+
+    # Önce ekleme, sonra silme: yarıda kalan bir çalıştırma indeksi eksik bırakmaz.
+    if ingest is not None:
+        ingest(new_documents())
+    else:
+        for batch in iter_batches(new_documents(), UPSERT_BATCH_SIZE):
+            vectorstore.add_documents([doc for _, doc in batch], ids=[cid for cid, _ in batch])
+
+    if synced_sources is None:
+        synced_sources = {metadata["source"] for metadata in current.values()}
+    plan.to_delete = [
+        cid for cid, metadata in indexed.items()
+        if cid not in current and (metadata.get("source") in synced_sources
+                                   or metadata.get("source") not in known_sources)
+    ]
+    for batch in iter_batches(plan.to_delete, UPSERT_BATCH_SIZE):
+        vectorstore.delete(ids=batch)
+
+    logging.info(
+        f"İndeks eşitlendi: {plan.added} yeni parça gömüldü, "
+        f"{len(plan.to_delete)} parça silindi, {plan.unchanged} parça değişmedi."
+    )
+
+    # Manifest: koleksiyonda şu an bulunan her parçanın kaynağı ve dili
+    deleted = set(plan.to_delete)
+    chunks = {
+        cid: {"source": metadata.get("source"), "lang": metadata.get("lang")}
+        for cid, metadata in indexed.items() if cid not in deleted
+    }
+    chunks.update(current)
+    save_manifest(db_dir, chunks, added=plan.added, deleted=len(plan.to_delete), unchanged=plan.unchanged)
+
+    return plan
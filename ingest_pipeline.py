@@ -0,0 +1,220 @@
+import logging
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:  # Windows: tepe bellek raporlanmaz
+    resource = None
+
+# Aşamalar arasındaki kuyrukların varsayılan kapasitesi (öğe)
+DEFAULT_QUEUE_SIZE = 8
+# Durdurma isteğinin kuyruk beklemelerinde fark edilme aralığı (s)
+_POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+@dataclass
+class StageStats:
+    """Tek bir aşamanın sayaçları. busy: üst aşamayı beklemeden geçen iş süresi; blocked: alt aşamanın
+    kuyruğu dolu olduğu için bekleme (geri basınç)."""
+    name: str
+    items: int = 0
+    bytes: int = 0
+    started: float | None = None
+    finished: float | None = None
+    busy: float = 0.0
+    waiting: float = 0.0
+    blocked: float = 0.0
+    max_queue: int = 0
+    threaded: bool = True
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def peak_memory_mb() -> float | None:
+    """Sürecin şimdiye kadarki en yüksek RSS değeri (MB)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Pipeline:
+    """
+    Üreteç tabanlı aşamaları ayrı iş parçacıklarında çalıştırıp sınırlı kuyruklarla birbirine bağlar:
+    bir aşama yavaşsa önündeki kuyruk dolar ve üst aşamalar bekler, böylece bellekte en fazla
+    queue_size öğe birikir. Bir aşamadaki hata tüketiciye aktarılır; blok bittiğinde tüm aşamalar durdurulur.
+
+        with Pipeline() as pipeline:
+            pages = pipeline.stage("fetch", lambda _: fetch_pages())
+            texts = pipeline.stage("clean", clean_pages, pages)
+            for text in pipeline.measure("write", texts):
+                ...
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.stages: dict[str, StageStats] = {}
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def _put(self, out: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                out.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, source: queue.Queue, stats: StageStats | None):
+        """Kuyruktan okuyan üreteç; okuyan aşamanın bekleme süresi stats.waiting'e eklenir."""
+        while True:
+            start = time.perf_counter()
+            item = None
+            while not self._stop.is_set():
+                try:
+                    item = source.get(timeout=_POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    continue
+            if stats is not None:
+                stats.waiting += time.perf_counter() - start
+            if item is _DONE or self._stop.is_set():
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def _upstream(self, upstream, stats: StageStats):
+        """Kuyruk dışı bir kaynaktan (liste, üreteç) okurken bekleme süresini ölçer."""
+        iterator = iter(upstream)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stats.waiting += time.perf_counter() - start
+            yield item
+
+    def _input(self, upstream, stats: StageStats):
+        if upstream is None:
+            return iter(())
+        if isinstance(upstream, _StageOutput):
+            return self._drain(upstream.queue, stats)
+        return self._upstream(upstream, stats)
+
+    def stage(self, name: str, fn, upstream=None, size=None) -> "_StageOutput":
+        """
+        fn(girdi) üretecini ayrı bir iş parçacığında çalıştırır ve çıktısını sınırlı bir kuyruktan okunan
+        bir yinelenebilir olarak döndürür. size(öğe) verilirse aşamanın ürettiği bayt sayısı da tutulur.
+        """
+        stats = self.stages[name] = StageStats(name)
+        out = queue.Queue(maxsize=self.queue_size)
+
+        def run():
+            stats.started = time.perf_counter()
+            try:
+                iterator = iter(fn(self._input(upstream, stats)))
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        stats.busy += time.perf_counter() - start
+                        break
+                    stats.busy += time.perf_counter() - start
+                    stats.items += 1
+                    if size is not None:
+                        stats.bytes += size(item)
+                    start = time.perf_counter()
+                    if not self._put(out, item):
+                        return
+                    stats.blocked += time.perf_counter() - start
+                    stats.max_queue = max(stats.max_queue, out.qsize())
+                self._put(out, _DONE)
+            except BaseException as e:
+                self._put(out, _Failure(e))
+            finally:
+                stats.busy -= stats.waiting
+                stats.finished = time.perf_counter()
+
+        thread = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return _StageOutput(self, out)
+
+    def measure(self, name: str, upstream, size=None):
+        """Son aşama için: çağıran iş parçacığında tüketilen akışı sayar ve üst aşamayı bekleme süresini ölçer."""
+        stats = self.stages[name] = StageStats(name, threaded=False)
+        stats.started = time.perf_counter()
+        try:
+            for item in self._input(upstream, stats):
+                stats.items += 1
+                if size is not None:
+                    stats.bytes += size(item)
+                yield item
+        finally:
+            stats.finished = time.perf_counter()
+            stats.busy = max(stats.elapsed - stats.waiting, 0.0)
+
+    def log_report(self):
+        """Aşama başına verim, meşguliyet, geri basınç ve sürecin tepe belleğini loglar."""
+        total = time.perf_counter() - self._started
+        logging.info(f"Veri hattı özeti (toplam {total:.2f}s, kuyruk kapasitesi {self.queue_size}):")
+        for stats in self.stages.values():
+            volume = f", {stats.bytes / 1024:.1f} KB ({stats.bytes / 1024 / stats.elapsed:.1f} KB/sn)" \
+                if stats.bytes and stats.elapsed > 0 else ""
+            backpressure = f", dolu kuyruk bekleme {stats.blocked:.2f}s, en fazla {stats.max_queue} öğe kuyrukta" \
+                if stats.threaded else ""
+            logging.info(
+                f"  {stats.name:<8} {stats.items} öğe, {stats.elapsed:.2f}s, {stats.items_per_second:.1f} öğe/sn{volume}; "
+                f"meşgul {stats.busy:.2f}s, üst aşamayı bekleme {stats.waiting:.2f}s{backpressure}"
+            )
+        peak = peak_memory_mb()
+        if peak is not None:
+            logging.info(f"Tepe bellek (RSS): {peak:.1f} MB")
+
+
+class _StageOutput:
+    """Bir aşamanın çıktı kuyruğu; bir sonraki aşamaya girdi olarak verilir veya doğrudan yinelenebilir."""
+
+    def __init__(self, pipeline: Pipeline, out: queue.Queue):
+        self.pipeline = pipeline
+        self.queue = out
+
+    def __iter__(self):
+        return self.pipeline._drain(self.queue, None)
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable
+
+from langchain_core.documents import Document
+
+
+class TokenBucket:
+    """Gömme API'sine giden istekleri saniye başına `rate` ile sınırlayan jeton kovası."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Yeterli jeton birikene kadar bekler (rate <= 0 ise sınırlama yoktur)."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class IngestCheckpoint:
+    """Kalıcı olarak yazılmış (commit edilmiş) parça kimliklerini diske kaydeder."""
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.committed: set[str] = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.committed = set(json.load(f).get("committed", []))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Kontrol noktası okunamadı, baştan başlanıyor: {e}")
+
+    def commit(self, ids: list[str]):
+        self.committed.update(ids)
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"committed": sorted(self.committed)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.committed.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class IngestStats:
+    """Gömme/yazma işinin özet istatistikleri."""
+    chunks: int = 0
+    skipped: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _embed_with_retry(embedder, texts: list[str], limiter: TokenBucket, retries: int, backoff: float,
+                      stats: IngestStats, stats_lock: threading.Lock) -> list[list[float]]:
+    """Bir partiyi hız sınırına uyarak gömer; geçici hatalarda üstel bekleme ile yeniden dener."""
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            return embedder.embed_documents(texts)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            with stats_lock:
+                stats.retries += 1
+            delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            logging.warning(f"Gömme partisi başarısız ({attempt + 1}/{retries}): {e} - {delay:.2f}s sonra tekrar")
+            time.sleep(delay)
+
+
+def iter_batches(items: Iterable, size: int):
+    """Öğeleri en fazla size uzunluğunda listeler halinde üretir; girdiyi akış olarak tüketir."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def ingest_documents(collection, embedder, documents: Iterable[tuple[str, Document]], batch_size: int = 100,
+                     max_workers: int = 4, requests_per_second: float = 0.0, retries: int = 5,
+                     backoff: float = 1.0, checkpoint_path: str | None = None,
+                     max_pending: int | None = None) -> IngestStats:
+    """
+    (kimlik, Document) akışını yapılandırılabilir partiler halinde, sınırlı paralellikle gömer ve Chroma
+    koleksiyonuna yazar. Girdi tüketildikçe partiler oluşturulur; aynı anda en fazla max_pending
+    (varsayılan 2 x max_workers) parti gömülür veya yazılmayı bekler, böylece üst aşamalar bu aşamadan
+    hızlı ilerleyemez. Her parti yazıldıktan sonra kontrol noktası güncellenir; yarıda kalan bir
+    çalıştırma tekrarlandığında yazılmış partiler atlanır. Başarıyla bittiğinde kontrol noktası silinir.
+    """
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    if checkpoint.committed:
+        logging.info(f"Kontrol noktasından devam ediliyor: {len(checkpoint.committed)} parça zaten yazılmış.")
+    stats = IngestStats()
+    max_workers = max(1, max_workers)
+    max_pending = max(max_pending or 2 * max_workers, 1)
+    limiter = TokenBucket(requests_per_second)
+    stats_lock = threading.Lock()
+
+    def pending_documents():
+        for cid, doc in documents:
+            if cid in checkpoint.committed:
+                stats.skipped += 1
+                continue
+            yield cid, doc
+
+    def write(future, batch):
+        embeddings = future.result()
+        collection.upsert(
+            ids=[cid for cid, _ in batch],
+            embeddings=embeddings,
+            documents=[doc.page_content for _, doc in batch],
+            metadatas=[doc.metadata for _, doc in batch]
+        )
+        checkpoint.commit([cid for cid, _ in batch])
+        stats.chunks += len(batch)
+        stats.batches += 1
+        logging.info(f"Parti yazıldı: {stats.batches}. parti ({stats.chunks} parça)")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed") as executor:
+        futures = {}
+        try:
+            for batch in iter_batches(pending_documents(), batch_size):
+                futures[executor.submit(
+                    _embed_with_retry, embedder, [doc.page_content for _, doc in batch],
+                    limiter, retries, backoff, stats, stats_lock
+                )] = batch
+                # Yazma işlemleri bu iş parçacığında, partiler tamamlandıkça yapılır.
+                while len(futures) >= max_pending:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(future, futures.pop(future))
+            for future in as_completed(list(futures)):
+                write(future, futures.pop(future))
+        except BaseException:
+            # Kalıcı hata veya kesinti: bekleyen partileri iptal et, yazılanlar kontrol noktasında kalır.
+            for future in futures:
+                future.cancel()
+            logging.error(f"Gömme yarıda kaldı: {stats.chunks} parça yazıldı; "
+                          f"tekrar çalıştırıldığında kontrol noktasından devam edilecek.")
+            raise
+
+    stats.elapsed = time.perf_counter() - start
+    checkpoint.clear()
+    if stats.skipped:
+        logging.info(f"Kontrol noktası nedeniyle {stats.skipped} parça atlandı.")
+    logging.info(
+        f"Gömme tamamlandı: {stats.chunks} parça, {stats.batches} parti, {stats.retries} yeniden deneme, "
+        f"{stats.elapsed:.2f}s ({stats.chunks_per_second:.1f} parça/sn)"
+    )
+    return stats
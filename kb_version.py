@@ -0,0 +1,35 @@
+import os
+import json
+import uuid
+from datetime import datetime
+
+# Bilgi tabanı (Chroma koleksiyonu) her yeniden oluşturulduğunda bu dosya güncellenir.
+# app.py gibi tüketiciler, önbelleklerini geçersiz kılmak için bu damgayı izler.
+KB_VERSION_FILE = "kb_version.json"
+
+
+def kb_version_path(db_dir: str) -> str:
+    """Sürüm damgası dosyasının tam yolunu döndürür."""
+    return os.path.join(db_dir, KB_VERSION_FILE)
+
+
+def bump_kb_version(db_dir: str) -> str:
+    """Bilgi tabanı için yeni bir sürüm damgası yazar ve sürümü döndürür."""
+    version = uuid.uuid4().hex
+    os.makedirs(db_dir, exist_ok=True)
+    path = kb_version_path(db_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "built_at": datetime.now().isoformat()}, f)
+    # Okuyucuların yarım yazılmış bir dosya görmemesi için atomik değiştirme
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_kb_version(db_dir: str) -> str | None:
+    """Geçerli sürüm damgasını okur; dosya yoksa veya bozuksa None döner."""
+    try:
+        with open(kb_version_path(db_dir), encoding="utf-8") as f:
+            return json.load(f).get("version")
+    except (OSError, ValueError):
+        return None
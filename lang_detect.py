@@ -0,0 +1,128 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from langdetect.detector_factory import PROFILES_DIRECTORY
+from langdetect.utils.ngram import NGram
+
+# langdetect'te Sırpça profili yoktur; Latin alfabeli Sırpça Hırvatça profiline, Kiril alfabeli Sırpça
+# Makedonca profiline en yakındır. Anahtar uygulamanın dil kodu, değer kullanılan profil(ler)dir.
+PROFILE_ALIASES = {"sr": ["hr", "mk"]}
+
+# langdetect'in yumuşatma sabitleri (Detector.ALPHA_DEFAULT / Detector.BASE_FREQ)
+_ALPHA = 0.5
+_BASE_FREQ = 10000
+# Uzun metinlerde karar için ilk bu kadar n-gram yeterlidir.
+_MAX_NGRAMS = 1000
+
+_URL_RE = re.compile(r'https?://[-_.?&~;+=/#0-9A-Za-z]{1,2076}')
+_MAIL_RE = re.compile(r'[-_.0-9A-Za-z]{1,64}@[-_0-9A-Za-z]{1,255}[-_.0-9A-Za-z]{1,255}')
+
+
+def _extract_ngrams(text: str) -> list[str]:
+    """langdetect ile aynı kurallarla 1-3 karakterlik n-gramları çıkarır (profillerle uyumlu olması için)."""
+    text = NGram.normalize_vi(_MAIL_RE.sub(" ", _URL_RE.sub(" ", text)))
+    ngram = NGram()
+    grams = []
+    for ch in text:
+        ngram.add_char(ch)
+        if ngram.capitalword:
+            continue
+        for n in range(1, NGram.N_GRAM + 1):
+            gram = ngram.get(n)
+            if gram is None:
+                break
+            if gram != " ":
+                grams.append(gram)
+    return grams
+
+
+class LanguageDetector:
+    """
+    Yalnızca desteklenen dillerin n-gram profillerini puanlayan deterministik dil tespitçisi.
+    langdetect'in rastgele örneklemesi yerine tüm n-gramlar üzerinde naive Bayes log-olasılığı toplanır;
+    aynı metin her zaman aynı sonucu verir. Profiller bir kez yüklenir, sonuçlar LRU önbellekte tutulur.
+    """
+
+    def __init__(self, languages: list[str], profiles_dir: str = PROFILES_DIRECTORY, cache_size: int = 4096,
+                 min_letters: int = 3):
+        self.languages = list(languages)
+        self.cache_size = cache_size
+        # Bundan az harf içeren metinler ("ok", "hi") puanlanmaz; güvenilir bir sinyal taşımazlar.
+        self.min_letters = min_letters
+        self._cache: OrderedDict[str, tuple[str | None, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+        # Her profil bir sütun; birden fazla profil aynı dile eşlenebilir (ör. sr -> hr, mk).
+        columns, self._column_langs = [], []
+        for lang in self.languages:
+            for profile_name in PROFILE_ALIASES.get(lang, [lang]):
+                path = os.path.join(profiles_dir, profile_name)
+                if not os.path.isfile(path):
+                    logging.warning(f"Dil profili bulunamadı: {profile_name} ({lang}); bu dil atlanıyor.")
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    columns.append(json.load(f))
+                self._column_langs.append(lang)
+        if not columns:
+            raise ValueError(f"Desteklenen diller için hiçbir profil yüklenemedi: {self.languages}")
+
+        # n-gram -> her profil için log(alpha / BASE_FREQ + p(n-gram | dil))
+        floor = math.log(_ALPHA / _BASE_FREQ)
+        self._log_probs: dict[str, np.ndarray] = {}
+        for column, profile in enumerate(columns):
+            n_words = profile["n_words"]
+            for gram, count in profile["freq"].items():
+                if not 1 <= len(gram) <= NGram.N_GRAM or not n_words[len(gram) - 1]:
+                    continue
+                row = self._log_probs.get(gram)
+                if row is None:
+                    row = self._log_probs[gram] = np.full(len(columns), floor)
+                row[column] = math.log(_ALPHA / _BASE_FREQ + count / n_words[len(gram) - 1])
+
+    def _score(self, text: str) -> tuple[str | None, float]:
+        if sum(ch.isalpha() for ch in text) < self.min_letters:
+            return None, 0.0
+        rows = [self._log_probs[gram] for gram in _extract_ngrams(text) if gram in self._log_probs]
+        if not rows:
+            return None, 0.0
+        scores = np.sum(rows[:_MAX_NGRAMS], axis=0)
+        # Sütunlardan dillere: aynı dile eşlenen profillerden en yükseği alınır.
+        best = {}
+        for lang, score in zip(self._column_langs, scores):
+            best[lang] = max(best.get(lang, -math.inf), float(score))
+        langs = list(best)
+        values = np.array([best[lang] for lang in langs])
+        probs = np.exp(values - values.max())
+        probs /= probs.sum()
+        top = int(np.argmax(probs))
+        return langs[top], float(probs[top])
+
+    def detect(self, text: str) -> tuple[str | None, float]:
+        """(dil kodu, güven) döndürür; metin çok kısaysa veya bilinen n-gram yoksa (None, 0.0)."""
+        key = unicodedata.normalize("NFC", " ".join(text.split()))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._counters["hits"] += 1
+                return cached
+            self._counters["misses"] += 1
+
+        result = self._score(key)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "size": len(self._cache), "max_size": self.cache_size}
@@ -0,0 +1,200 @@
+import json
+import logging
+import math
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+from langchain_core.documents import Document
+
+from indexing import chunk_id
+
+# Chroma deposunun yanında (CHROMA_DB_DIR içinde) tutulan sözcüksel indeks dosyası
+LEXICAL_INDEX_FILE = "lexical_index.json"
+# Karşılıklı sıra füzyonu (RRF) sabiti; literatürdeki yaygın değer
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Küçük harfe çevirir, aksanları kaldırır ("cirugía" = "cirugia") ve kelimelere ayırır."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [token for token in _TOKEN_RE.findall(text) if len(token) > 1 or token.isdigit()]
+
+
+def lexical_index_path(db_dir: str) -> str:
+    return os.path.join(db_dir, LEXICAL_INDEX_FILE)
+
+
+class _LexicalShard:
+    """Tek bir dile ait BM25 ters indeksi: terim -> (doküman sırası, terim frekansı) dizileri."""
+
+    def __init__(self, ids: list[str], texts: list[str], sources: list[str], doc_len: list[int],
+                 postings: dict[str, tuple[list[int], list[int]]], k1: float, b: float):
+        self.ids = ids
+        self.texts = texts
+        self.sources = sources
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.postings = {
+            term: (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (rows, tfs) in postings.items()
+        }
+        self.k1 = k1
+        self.b = b
+        count = len(ids)
+        self.avgdl = float(self.doc_len.mean()) if count else 0.0
+        self.idf = {term: math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                    for term, (rows, _) in self.postings.items()}
+        # Korpusta hiç geçmeyen bir terim en nadir terim kadar ağırlık taşır.
+        self.unknown_idf = math.log(1 + (count + 0.5) / 0.5)
+
+    @classmethod
+    def build(cls, ids: list[str], texts: list[str], sources: list[str], k1: float, b: float) -> "_LexicalShard":
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        doc_len = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len.append(len(tokens))
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                rows, tfs = postings.setdefault(token, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+        return cls(ids, texts, sources, doc_len, postings, k1, b)
+
+    def to_dict(self) -> dict:
+        return {
+            "ids": self.ids,
+            "texts": self.texts,
+            "sources": self.sources,
+            "doc_len": self.doc_len.astype(int).tolist(),
+            "postings": {term: [rows.tolist(), tfs.astype(int).tolist()] for term, (rows, tfs) in self.postings.items()},
+        }
+
+    def search(self, tokens: list[str], k: int, min_coverage: float) -> list[tuple[int, float]]:
+        """
+        BM25 skoruna göre en iyi k satırı döndürür. min_coverage: sorgu terimlerinin (idf ağırlıklı)
+        en az bu oranını içermeyen parçalar elenir; yalnızca "what", "is" gibi sık kelimelerle eşleşen
+        parçalar böylece sonuç sayılmaz.
+        """
+        terms = list(dict.fromkeys(tokens))
+        if not terms or not self.ids:
+            return []
+        total_idf = sum(self.idf.get(term, self.unknown_idf) for term in terms)
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        coverage = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            idf = self.idf[term]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[rows] / self.avgdl)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            coverage[rows] += idf
+
+        candidates = np.flatnonzero((scores > 0) & (coverage >= min_coverage * total_idf))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(int(row), float(scores[row])) for row in candidates]
+
+
+class LexicalIndex:
+    """
+    Chroma'daki parçaların aynısı üzerinde dil bazlı BM25 indeksi. Gömme API'si gerektirmez;
+    load_data.py tarafından oluşturulur ve CHROMA_DB_DIR içine kaydedilir.
+    """
+
+    def __init__(self, shards: dict[str, _LexicalShard], k1: float = 1.5, b: float = 0.75):
+        self.shards = shards
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def from_collection(cls, collection, k1: float = 1.5, b: float = 0.75) -> "LexicalIndex":
+        """Chroma koleksiyonundaki tüm parçalardan (gömmeler olmadan) indeksi kurar."""
+        start = time.perf_counter()
+        data = collection.get(include=["documents", "metadatas"])
+        grouped: dict[str, tuple[list, list, list]] = {}
+        for cid, text, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            metadata = metadata or {}
+            ids, texts, sources = grouped.setdefault(metadata.get("lang"), ([], [], []))
+            ids.append(cid)
+            texts.append(text)
+            sources.append(metadata.get("source"))
+
+        shards = {lang: _LexicalShard.build(ids, texts, sources, k1, b) for lang, (ids, texts, sources) in grouped.items()}
+        index = cls(shards, k1, b)
+        logging.info(f"Sözcüksel (BM25) indeks oluşturuldu: {index.size} parça, {len(shards)} dil, "
+                     f"{time.perf_counter() - start:.2f}s")
+        return index
+
+    @property
+    def size(self) -> int:
+        return sum(len(shard.ids) for shard in self.shards.values())
+
+    def save(self, db_dir: str):
+        """İndeksi atomik olarak kaydeder."""
+        os.makedirs(db_dir, exist_ok=True)
+        path = lexical_index_path(db_dir)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "built_at": datetime.now().isoformat(),
+                "k1": self.k1,
+                "b": self.b,
+                "langs": {lang: shard.to_dict() for lang, shard in self.shards.items()},
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, db_dir: str, langs=None) -> "LexicalIndex | None":
+        """Kaydedilmiş indeksi (langs verilirse yalnızca bu dillerinkini) yükler; dosya yoksa None döndürür."""
+        path = lexical_index_path(db_dir)
+        if not os.path.exists(path):
+            return None
+        start = time.perf_counter()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        k1, b = data["k1"], data["b"]
+        shards = {
+            lang: _LexicalShard(shard["ids"], shard["texts"], shard["sources"], shard["doc_len"],
+                                shard["postings"], k1, b)
+            for lang, shard in data["langs"].items() if langs is None or lang in langs
+        }
+        index = cls(shards, k1, b)
+        logging.info(f"Sözcüksel (BM25) indeks yüklendi: {index.size} parça, {time.perf_counter() - start:.2f}s")
+        return index
+
+    def search(self, query: str, lang_code: str, k: int = 3,
+               min_coverage: float = 0.0) -> list[tuple[Document, float]]:
+        """Verilen dilde en iyi k parçayı (doküman, BM25 skoru) olarak döndürür."""
+        shard = self.shards.get(lang_code)
+        if shard is None or k <= 0:
+            return []
+        return [
+            (Document(page_content=shard.texts[row], metadata={"source": shard.sources[row], "lang": lang_code},
+                      id=shard.ids[row]), score)
+            for row, score in shard.search(tokenize(query), k, min_coverage)
+        ]
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = RRF_K) -> list[Document]:
+    """Birden fazla sıralamayı karşılıklı sıra füzyonu ile birleştirir; aynı parça bir kez yer alır."""
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = chunk_id(doc.metadata.get("source"), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
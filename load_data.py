@@ -1,12 +1,26 @@
 import os
-import requests
+import sys
+import subprocess
+from itertools import chain
+from typing import Iterable
 import logging
-from bs4 import BeautifulSoup
 from langchain_community.vectorstores import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from dotenv import load_dotenv
+from kb_version import bump_kb_version
+from embedding_cache import CachedEmbeddings
+from crawler import iter_fetch
+from crawl_cache import CrawlCache
+from indexing import indexed_sources, sync_collection
+from index_shards import ShardedCollection, read_shard_layout, save_shard_layout, shard_collection_name
+from ingestion import ingest_documents
+from ingest_pipeline import Pipeline
+from lexical_index import LexicalIndex, lexical_index_path
+from vector_index import VectorIndex, compact_vectors_path
+from faq_store import faq_store_path
+from html_extraction import extract_main_text
 
 # --- Log Ayarları ---
 # Loglama seviyesini DEBUG'a ayarlayalım ki tüm adımları görelim.
@@ -88,37 +102,46 @@ LANG_URLS = {
 }
 
 CHROMA_DB_DIR = "chroma_db_multilang/"  # Farklı bir klasör kullanalım
+# Dil koleksiyonlarının ortak ön adı (<ad>_<dil>); eski tek koleksiyonlu düzende koleksiyonun kendi adı
 COLLECTION_NAME = "sava_clinic_knowledge_multilang"
 # KRİTİK GÜNCELLEME: app.py'deki 'text-embedding-004' ile eşleşmelidir.
 EMBEDDING_MODEL = "text-embedding-004"
+# Eşzamanlı çekme ayarları: tek bir yavaş sayfa tüm yeniden oluşturmayı bekletmesin.
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "4"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", "0.5"))
+# Ham sayfa önbelleği: yenilemede koşullu istek gönderilir, değişmeyen sayfalar yeniden işlenmez ("" = kapalı).
+CRAWL_CACHE_DIR = os.getenv("CRAWL_CACHE_DIR", "crawl_cache/")
+# 1: ağa çıkmadan yalnızca çekme önbelleğindeki sayfalardan yeniden oluştur (tüm sayfalar baştan işlenir)
+CRAWL_FROM_CACHE = os.getenv("CRAWL_FROM_CACHE", "0") == "1"
+# Gömme aşaması: parti boyutu, paralellik, API hız sınırı (istek/sn, 0 = sınırsız) ve kontrol noktası
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+EMBED_REQUESTS_PER_SECOND = float(os.getenv("EMBED_REQUESTS_PER_SECOND", "2"))
+EMBED_RETRIES = int(os.getenv("EMBED_RETRIES", "5"))
+INGEST_CHECKPOINT_PATH = os.path.join(CHROMA_DB_DIR, "ingest_checkpoint.json")
+# Çekme → temizleme → parçalama → gömme aşamaları arasındaki kuyrukların kapasitesi
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+# Bilgi tabanı değiştiğinde hazır FAQ yanıtları (build_faq.py) yeni içerikle yeniden üretilir.
+FAQ_REBUILD_ON_KB_CHANGE = os.getenv("FAQ_REBUILD_ON_KB_CHANGE", "1") == "1"
+# app.py ile ortak gömme önbelleği: değişmeyen metin parçaları yeniden gömülmez.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
 
 
 # =========================================================================
 # 1. VERİ ÇEKME VE TEMİZLEME
 # =========================================================================
 
-def fetch_and_clean_data(url: str) -> str:
-    """Belirtilen URL'den HTML çeker ve temiz metin döndürür."""
-    logging.info(f"Veri çekiliyor: {url}")
+def clean_html(content: bytes, url: str) -> str:
+    """Ham HTML içeriğinden ana metni çıkarır ve temizler."""
     try:
-        # User-Agent ekleyelim, bazı siteler botları engeller.
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, timeout=15, headers=headers)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Sadece ana içeriği veya makale içeriğini hedefleyin
-        # Bu, menü, footer gibi gürültüyü azaltır.
-        main_content = soup.find('main') or soup.find('article') or soup.find(id='content')
-
-        if main_content:
-            # Metin çıkarma ve temizleme
-            text = main_content.get_text()
-            # Birden fazla boşluğu ve yeni satırı tek boşluğa indirgeyin
-            text = ' '.join(text.split())
+        # Sadece ana içeriği veya makale içeriğini hedefleyin (main, article, #content)
+        # Bu, menü, footer gibi gürültüyü azaltır; yalnızca bu alt ağaçlar ayrıştırılır.
+        text = extract_main_text(content)
 
+        if text is not None:
             # Gürültü filtrelemesi: Kısa metinleri (örneğin sadece menü isimleri) ele
             if len(text) < 100:
                 logging.warning(f"Uyarı: {url} adresinden çekilen metin çok kısa ({len(text)} karakter), atlanıyor.")
@@ -129,9 +152,6 @@ def fetch_and_clean_data(url: str) -> str:
             logging.warning(f"Uyarı: {url} adresinde ana içerik bulunamadı.")
             return ""
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Hata: {url} adresine erişilemedi: {e}")
-        return ""
     except Exception as e:
         logging.error(f"Hata: {url} verileri işlenirken hata oluştu: {e}")
         return ""
@@ -141,20 +161,20 @@ def fetch_and_clean_data(url: str) -> str:
 # 2. METİNİ PARÇALAMA VE DİL METADATA EKLEME
 # =========================================================================
 
-def chunk_data(text: str, url: str, lang_code: str) -> list[Document]:
-    """Metni Langchain Document objelerine böler ve dil kodunu metadata olarak ekler."""
+# Daha kararlı gömme için 512/100 ayarı; bölücü durumsuzdur, tüm sayfalar ve iş parçacıkları aynısını kullanır.
+TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=512,
+    chunk_overlap=100,
+    length_function=len
+)
 
-    # Daha kararlı gömme için 512/100 ayarı
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=512,
-        chunk_overlap=100,
-        length_function=len
-    )
 
+def chunk_data(text: str, url: str, lang_code: str) -> list[Document]:
+    """Metni Langchain Document objelerine böler ve dil kodunu metadata olarak ekler."""
     if not text:
         return []
 
-    chunks = text_splitter.split_text(text)
+    chunks = TEXT_SPLITTER.split_text(text)
 
     # Her dokümana 'source' (URL) ve 'lang' (dil kodu) metadata'sı ekliyoruz
     documents = [
@@ -169,38 +189,195 @@ def chunk_data(text: str, url: str, lang_code: str) -> list[Document]:
 # 3. VERİTABANI OLUŞTURMA
 # =========================================================================
 
-def create_chroma_db(documents: list[Document]):
-    """Dokümanları gömer ve Chroma veritabanını diske kaydeder."""
+def create_chroma_db(documents: Iterable[Document], synced_sources: set[str] | None = None,
+                     unchanged_sources: set[str] | None = None):
+    """
+    Dokümanları dil başına Chroma koleksiyonlarıyla artımlı olarak eşitler ve diske kaydeder.
+    Yalnızca yeni/değişen parçalar gömülür; kaybolan parçalar silinir.
+    documents bir akış olabilir (parçalar üretildikçe gömülür); synced_sources ve unchanged_sources akış
+    tüketilirken doldurulabilir. synced_sources verilmezse dokümanlardaki kaynaklar başarıyla çekilmiş kabul edilir.
+    unchanged_sources: içeriği değişmediği için işlenmeyen sayfalar; parçaları olduğu gibi korunur.
+    Başarılı olursa eşitleme planını döndürür.
+    """
     if not API_KEY:
         logging.error("Veritabanı oluşturulamadı: API Anahtarı eksik.")
         return
 
-    if not documents:
-        logging.warning("Veritabanına kaydedilecek doküman bulunamadı.")
-        return
+    known_sources = {url for urls in LANG_URLS.values() for url in urls}
 
     try:
-        # 1. Gömme Fonksiyonunu Tanımla
-        embedding_function = GoogleGenerativeAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            google_api_key=API_KEY
+        # Hiç doküman gelmezse (ör. tüm sayfalar erişilemez) veritabanına dokunulmaz. Sayfalar değişmediği
+        # için doküman gelmediyse eşitleme yine yapılır: yapılandırmadan çıkarılan sayfalar silinir.
+        documents = iter(documents)
+        first = next(documents, None)
+        if first is None and not unchanged_sources:
+            logging.warning("Veritabanına kaydedilecek doküman bulunamadı.")
+            return
+        documents = chain([first], documents) if first is not None else documents
+
+        # 1. Gömme Fonksiyonunu Tanımla (aynı parçalar önbellekten gelir)
+        embedding_function = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                google_api_key=API_KEY
+            ),
+            model_name=EMBEDDING_MODEL,
+            db_path=EMBEDDING_CACHE_PATH
         )
 
-        # 2. Chroma Veritabanını Oluştur ve Kaydet
+        # 2. Dil başına Chroma koleksiyonlarını aç (yoksa oluşturulur); app.py her dili ayrı ve ihtiyaç halinde yükler
         # Persistence'ı etkinleştirmek için "persist_directory" kullanıyoruz
-        Chroma.from_documents(
-            documents=documents,
-            embedding=embedding_function,
-            persist_directory=CHROMA_DB_DIR,
-            collection_name=COLLECTION_NAME
-        )
+        def open_store(collection_name: str) -> Chroma:
+            return Chroma(
+                persist_directory=CHROMA_DB_DIR,
+                embedding_function=embedding_function,
+                collection_name=collection_name
+            )
+
+        previous_layout = read_shard_layout(CHROMA_DB_DIR)
+        # Yapılandırmadan çıkarılan dillerin koleksiyonları da açılır ki parçaları silinebilsin.
+        removed_langs = [lang for lang in previous_layout or {} if lang not in LANG_URLS]
+        stores = {lang: open_store(shard_collection_name(COLLECTION_NAME, lang))
+                  for lang in [*LANG_URLS, *removed_langs]}
+        shards = ShardedCollection({lang: store._collection for lang, store in stores.items()})
+
+        # 2.1. Tek koleksiyonlu eski düzenden geçiş: parçalar gömmeleriyle birlikte kopyalanır (yeniden gömülmez),
+        # eski koleksiyon ancak eşitleme başarılı olursa silinir.
+        legacy_store = None
+        if previous_layout is None:
+            legacy_store = open_store(COLLECTION_NAME)
+            copied = shards.copy_from(legacy_store._collection)
+            if copied:
+                logging.info(f"Eski tek koleksiyondan {copied} parça dil koleksiyonlarına kopyalandı.")
+
+        # 3. Kararlı parça kimlikleriyle artımlı eşitleme; yeni parçalar partiler halinde gömülür
+        def ingest(new_documents):
+            ingest_documents(
+                shards,
+                embedding_function,
+                new_documents,
+                batch_size=EMBED_BATCH_SIZE,
+                max_workers=EMBED_MAX_WORKERS,
+                requests_per_second=EMBED_REQUESTS_PER_SECOND,
+                retries=EMBED_RETRIES,
+                checkpoint_path=INGEST_CHECKPOINT_PATH
+            )
+
+        plan = sync_collection(shards, documents, CHROMA_DB_DIR, synced_sources, known_sources, ingest=ingest)
+
+        # 3.1. Dil koleksiyonları eşlemesini yaz; eski koleksiyonu ve artık boş kalan dillerin koleksiyonlarını kaldır
+        save_shard_layout(CHROMA_DB_DIR, {lang: shard_collection_name(COLLECTION_NAME, lang) for lang in LANG_URLS})
+        for lang in removed_langs:
+            stores[lang].delete_collection()
+            logging.info(f"Yapılandırmadan çıkarılan '{lang}' dilinin koleksiyonu silindi.")
+        if legacy_store is not None:
+            legacy_store.delete_collection()
+            logging.info("Bilgi tabanı dil başına koleksiyonlara taşındı; eski tek koleksiyon silindi.")
+        # Düzen değiştiyse çalışan uygulamalar içerik aynı olsa da depoları yeniden açmalıdır.
+        layout_changed = legacy_store is not None or bool(removed_langs)
+
+        logging.info(f"Vektör veritabanı başarıyla güncellendi ve diske kaydedildi: {CHROMA_DB_DIR}")
+        logging.info(f"Gömme önbelleği istatistikleri: {embedding_function.stats()}")
+
+        # 4. Aynı parçalar üzerinde dil bazlı BM25 indeksi (hibrit/çevrimdışı erişim için)
+        if plan.has_changes or not os.path.exists(lexical_index_path(CHROMA_DB_DIR)):
+            LexicalIndex.from_collection(shards).save(CHROMA_DB_DIR)
+            logging.info(f"Sözcüksel indeks kaydedildi: {lexical_index_path(CHROMA_DB_DIR)}")
+
+        # 4.1. Dil başına bellek eşlemeli float32/float16/int8 vektör dosyaları (RETRIEVAL_BACKEND=compact için)
+        if plan.has_changes or not os.path.exists(compact_vectors_path(CHROMA_DB_DIR)):
+            VectorIndex.from_collection(shards).save_compact(CHROMA_DB_DIR)
+            logging.info(f"Sıkıştırılmış vektör dosyaları kaydedildi: {compact_vectors_path(CHROMA_DB_DIR)}")
+
+        # Çalışan uygulamaların yanıt önbelleklerini geçersiz kılmak için sürüm damgasını güncelle
+        if plan.has_changes or layout_changed:
+            version = bump_kb_version(CHROMA_DB_DIR)
+            logging.info(f"Bilgi tabanı sürümü güncellendi: {version}")
+        else:
+            logging.info("Bilgi tabanında değişiklik yok; sürüm damgası korunuyor.")
 
-        logging.info(f"Vektör veritabanı başarıyla oluşturuldu ve diske kaydedildi: {CHROMA_DB_DIR}")
+        # 5. Hazır FAQ yanıtları eski sürümle üretildiyse (veya hiç yoksa) yeniden üret
+        if FAQ_REBUILD_ON_KB_CHANGE and (plan.has_changes or layout_changed
+                                         or not os.path.exists(faq_store_path(CHROMA_DB_DIR))):
+            rebuild_faq_store()
+        return plan
 
     except Exception as e:
         logging.error(f"ChromaDB oluşturulurken kritik hata: {e}")
 
 
+def rebuild_faq_store():
+    """
+    build_faq.py'yi ayrı bir süreçte çalıştırır (app.py'nin RAG zinciri ve log yapılandırması bu süreci etkilemez).
+    Başarısız olursa app eski sürüm için üretilmiş yanıtları zaten sunmaz; betik elle yeniden çalıştırılabilir.
+    """
+    logging.info("Hazır FAQ yanıtları yeniden üretiliyor (build_faq.py)...")
+    result = subprocess.run([sys.executable, "build_faq.py"], cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        logging.error(f"FAQ deposu yeniden üretilemedi (çıkış kodu {result.returncode}).")
+
+
+# =========================================================================
+# 4. VERİ HATTI (ÇEKME → TEMİZLEME → PARÇALAMA → GÖMME)
+# =========================================================================
+
+def stream_documents(pipeline: Pipeline, synced_sources: set[str], crawl_cache: CrawlCache | None = None,
+                     unchanged_sources: set[str] | None = None):
+    """
+    Çekme, temizleme ve parçalama aşamalarını veri hattında eşzamanlı çalıştırır; parçaları üretildikçe döndürür.
+    Başarıyla çekilen sayfalar synced_sources'a eklenir. crawl_cache verilirse koşullu istek gönderilir ve
+    bilgi tabanına aynı içerikle işlenmiş sayfalar temizleme/parçalama/gömme yapılmadan unchanged_sources'a eklenir.
+    """
+    # Değişmeyen sayfa atlanmadan önce parçalarının gerçekten indekste olduğu doğrulanır (ör. veritabanı silinmişse).
+    skippable = indexed_sources(CHROMA_DB_DIR) if crawl_cache is not None and not CRAWL_FROM_CACHE else set()
+
+    # 1. Tüm dillerdeki sayfaları paylaşılan bağlantı havuzu ile eşzamanlı çek (veya önbellekten oku)
+    def fetch(_):
+        if CRAWL_FROM_CACHE:
+            yield from crawl_cache.replay(LANG_URLS)
+            return
+        results = (result for _, result in iter_fetch(
+            LANG_URLS,
+            max_workers=FETCH_MAX_WORKERS,
+            per_host_limit=FETCH_PER_HOST_LIMIT,
+            timeout=FETCH_TIMEOUT,
+            retries=FETCH_RETRIES,
+            backoff=FETCH_BACKOFF,
+            request_headers=crawl_cache.conditional_headers if crawl_cache is not None else None
+        ))
+        for result in results:
+            yield crawl_cache.resolve(result) if crawl_cache is not None else result
+
+    fetched = pipeline.stage("fetch", fetch, size=lambda result: len(result.content or b""))
+
+    # 2. Veriyi Temizle
+    def clean(results):
+        for result in results:
+            if not result.ok:
+                logging.error(f"Hata: {result.url} adresine erişilemedi: {result.error}")
+                continue
+            if result.url in skippable and crawl_cache.is_indexed(result.url, result.content):
+                unchanged_sources.add(result.url)
+                continue
+            # Erişilen sayfalar eşitlemeye dahil edilir; erişilemeyenlerin eski parçaları korunur.
+            synced_sources.add(result.url)
+            raw_text = clean_html(result.content, result.url)
+            if raw_text:
+                yield result.url, result.lang_code, raw_text
+
+    cleaned = pipeline.stage("clean", clean, fetched, size=lambda page: len(page[2]))
+
+    # 3. Metni Parçalara Böl ve Dil Kodunu Ekle
+    def chunk(pages):
+        for url, lang_code, raw_text in pages:
+            yield from chunk_data(raw_text, url, lang_code)
+
+    chunked = pipeline.stage("chunk", chunk, cleaned, size=lambda doc: len(doc.page_content))
+
+    # 4. Gömme ve yazma, create_chroma_db içinde bu iş parçacığında
+    return pipeline.measure("embed", chunked, size=lambda doc: len(doc.page_content))
+
+
 # =========================================================================
 # ANA ÇALIŞMA FONKSİYONU
 # =========================================================================
@@ -208,24 +385,28 @@ def create_chroma_db(documents: list[Document]):
 if __name__ == "__main__":
     logging.info("--- SAVA Clinic ÇOK DİLLİ RAG Veritabanı Oluşturma Başladı ---")
 
-    all_documents = []
-
-    # Her dildeki tüm URL'leri döngüye sok
-    for lang_code, urls in LANG_URLS.items():
-        logging.info(f"--- DİL: {lang_code.upper()} Verileri İşleniyor ---")
-        for url in urls:
-            # 1. Veriyi Çek ve Temizle
-            raw_text = fetch_and_clean_data(url)
-
-            if raw_text:
-                # 2. Metni Parçalara Böl ve Dil Kodunu Ekle
-                documents = chunk_data(raw_text, url, lang_code)
-                all_documents.extend(documents)
-
-    if all_documents:
-        # 3. Veritabanını Oluştur
-        create_chroma_db(all_documents)
-    else:
+    crawl_cache = CrawlCache(CRAWL_CACHE_DIR) if CRAWL_CACHE_DIR else None
+    if CRAWL_FROM_CACHE and crawl_cache is None:
+        logging.critical("CRAWL_FROM_CACHE=1 için CRAWL_CACHE_DIR ayarlanmalıdır.")
+        sys.exit(1)
+    if CRAWL_FROM_CACHE:
+        logging.info(f"Ağa çıkılmıyor: sayfalar çekme önbelleğinden okunuyor ({CRAWL_CACHE_DIR}).")
+
+    synced_sources, unchanged_sources = set(), set()
+    with Pipeline(queue_size=INGEST_QUEUE_SIZE) as pipeline:
+        # Aşamalar birbirini beklemez: ilk sayfanın parçaları, diğer sayfalar çekilirken gömülür.
+        plan = create_chroma_db(stream_documents(pipeline, synced_sources, crawl_cache, unchanged_sources),
+                                synced_sources, unchanged_sources)
+
+    if crawl_cache is not None:
+        # Yalnızca başarıyla eşitlenen içerik işlenmiş sayılır; yarıda kalan sayfalar sonraki çalıştırmada yeniden işlenir.
+        if plan is not None:
+            crawl_cache.mark_indexed(synced_sources)
+        crawl_cache.save()
+        logging.info(f"Çekme önbelleği: {crawl_cache.stats()}, değişmediği için atlanan sayfa: {len(unchanged_sources)}")
+
+    if not pipeline.stages["chunk"].items and not unchanged_sources:
         logging.error("KRİTİK HATA: Hiçbir URL'den geçerli içerik çekilemedi. Veritabanı oluşturulmadı.")
+    pipeline.log_report()
 
     logging.info("--- SAVA Clinic ÇOK DİLLİ RAG Veritabanı Oluşturma Tamamlandı ---")
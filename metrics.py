@@ -0,0 +1,159 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Saniye cinsinden süre kovaları: dil tespiti (µs) ile Gemini çağrısı (saniyeler) arasını kapsar.
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Karakter sayısı kovaları (bağlam, istem ve yanıt boyutları)
+SIZE_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# İstek başına aşama süreleri; her istek (iş parçacığı) kendi sözlüğünü görür. İstek bitince bağ geri alınır,
+# böylece aynı iş parçacığında sonraki istek (veya istek dışı kod) önceki isteğin sözlüğüne yazmaz.
+_request_timings: contextvars.ContextVar[dict | None] = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Etiketli, yalnızca artan sayaç."""
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value:g}" for key, value in values.items()]
+
+
+class Histogram:
+    """Sabit kovalı, etiketli histogram (Prometheus _bucket/_sum/_count biçiminde yayınlanır)."""
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # etiketler -> [kova sayıları..., +Inf sayısı], toplam
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            state[0][index] += 1
+            state[1][0] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Değeri okunduğu anda bir fonksiyondan alınan gösterge (ör. aktif LLM çağrısı sayısı)."""
+    type = "gauge"
+
+    def __init__(self, name: str, help_text: str, value_fn):
+        self.name = name
+        self.help = help_text
+        self.value_fn = value_fn
+
+    def render(self) -> list[str]:
+        return [f"{self.name} {float(self.value_fn()):g}"]
+
+
+class MetricsRegistry:
+    """Süreç içi metrik kaydı; /metrics için Prometheus metin biçiminde çıktı üretir."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, label_names: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: tuple = (),
+                  buckets: tuple = DURATION_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, value_fn) -> Gauge:
+        return self._register(Gauge(name, help_text, value_fn))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def bind_request_timings(timings: dict) -> contextvars.Token:
+    """
+    `timings` sözlüğünü geçerli isteğin aşama süreleri olarak bağlar. Dönen belirteç istek bitiminde
+    (hata olsa da) reset_request_timings'e verilmelidir.
+    """
+    return _request_timings.set(timings)
+
+
+def reset_request_timings(token: contextvars.Token):
+    """bind_request_timings'ten önceki duruma döner."""
+    _request_timings.reset(token)
+
+
+@contextmanager
+def timed(histogram: Histogram, stage: str):
+    """Bloğun süresini histograma ve (varsa) geçerli isteğin aşama sürelerine ekler."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timings_ms(timings: dict) -> dict:
+    return {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+
+def server_timing_header(timings: dict) -> str:
+    """Aşama sürelerini Server-Timing başlığına çevirir (ör. "embed;dur=120.4, llm;dur=830.1")."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
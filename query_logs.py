@@ -0,0 +1,44 @@
+import glob
+import json
+import os
+import re
+
+# Metin loglarındaki (chat_logs.txt) sorgu satırı: "... - INFO - Kullanıcı Sorgusu: '...'"
+QUERY_RE = re.compile(r"Kullanıcı Sorgusu: '(.*)'")
+# İstek kayıtlarında sohbet sorgusu taşıyan uç noktalar (istemci kayıtları aynı sorguların tekrarıdır)
+CHAT_ENDPOINTS = ("chat", "chat_stream")
+
+
+def expand_log_paths(patterns: list[str]) -> list[str]:
+    """Desenleri (ör. "chat_logs.txt*" döndürülmüş dosyalar dahil) mevcut dosya yollarına açar."""
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or ([pattern] if os.path.exists(pattern) else []):
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def iter_logged_queries(paths: list[str]):
+    """
+    Loglardaki kullanıcı sorgularını dosya sırasıyla (yol, sorgu, dil) olarak üretir. Metin logları
+    ve JSON satırları (request_logs.jsonl, rag_queries.log) aynı dosyada karışık olabilir; dil yalnızca
+    yapılandırılmış kayıtlarda bulunur, diğerlerinde None'dır.
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.startswith("{"):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if (isinstance(record, dict) and record.get("query")
+                            and record.get("endpoint", "chat") in CHAT_ENDPOINTS):
+                        yield path, record["query"], record.get("lang")
+                    continue
+                match = QUERY_RE.search(line)
+                if match:
+                    yield path, match.group(1), None
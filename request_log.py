@@ -0,0 +1,169 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+from datetime import datetime
+
+# Yapılandırılmış istek kayıtlarının yazıldığı logger; metin loglarına karışmaz.
+REQUEST_LOGGER_NAME = "sava.requests"
+TEXT_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# "external": dosyalar dışarıdan (logrotate) döndürülür, her süreç taşınan dosyayı fark edip yenisini açar
+# (çok işçili gunicorn için güvenli). "internal": süreç dosyayı kendisi döndürür; yalnızca tek süreç yazıyorsa.
+LOG_ROTATIONS = ("external", "internal")
+
+
+class JsonLineFormatter(logging.Formatter):
+    """İstek kaydını (record.payload) zaman damgasıyla tek satırlık JSON olarak biçimlendirir."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = getattr(record, "payload", None) or {"message": record.getMessage()}
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        return json.dumps({"ts": timestamp, **payload}, ensure_ascii=False)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Dosyayı hem zamana (`when`, ör. gece yarısı) hem boyuta (`max_bytes`) göre döndürür.
+    Döndürülen dosyalar saniye hassasiyetinde zaman ekiyle adlandırılır; aynı gün içindeki
+    boyut kaynaklı döndürmeler birbirinin üzerine yazmaz, en fazla `backup_count` dosya tutulur.
+    Döndürme süreçler arasında eşgüdümlü değildir: aynı dosyaya birden fazla süreç yazıyorsa kullanılmamalıdır.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, when: str = "midnight", backup_count: int = 14):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+        self.suffix = "%Y-%m-%d_%H-%M-%S"
+        self.extMatch = re.compile(r"^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(\.\d+)?$", re.ASCII)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+        return False
+
+    def rotation_filename(self, default_name: str) -> str:
+        name = f"{self.baseFilename}.{time.strftime(self.suffix)}"
+        counter = 1
+        while os.path.exists(name):
+            name = f"{self.baseFilename}.{time.strftime(self.suffix)}.{counter}"
+            counter += 1
+        return name
+
+
+def log_file_handler(path: str, rotation: str, max_bytes: int, when: str = "midnight",
+                     backup_count: int = 14) -> logging.Handler:
+    """Log dosyası yazıcısı: "external" için WatchedFileHandler, "internal" için SizeAndTimeRotatingFileHandler."""
+    if rotation == "external":
+        return logging.handlers.WatchedFileHandler(path, encoding="utf-8", delay=True)
+    if rotation == "internal":
+        return SizeAndTimeRotatingFileHandler(path, max_bytes, when, backup_count)
+    raise ValueError(f"Bilinmeyen log döndürme modu: {rotation!r} (beklenen: {', '.join(LOG_ROTATIONS)})")
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Kuyruk doluysa isteği bekletmek yerine kaydı düşürür ve sayar."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Uygulama loglarını ve yapılandırılmış istek kayıtlarını tek bir kuyruk üzerinden arka plan
+    iş parçacığına aktarır; disk G/Ç'si istek yolunda yapılmaz.
+    """
+
+    def __init__(self, handlers: list[logging.Handler], queue_size: int):
+        self.handlers = handlers
+        self.queue_size = queue_size
+        self.queue_handler = _DroppingQueueHandler(queue.Queue(queue_size))
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, *handlers,
+                                                       respect_handler_level=True)
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        """Kuyrukta kalan kayıtları yazar ve arka plan iş parçacığını durdurur."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def restart_after_fork(self):
+        """Fork sonrası çocuk süreçte arka plan iş parçacığı yoktur; yeni kuyruk ve dinleyici başlatılır."""
+        self.queue_handler.queue = queue.Queue(self.queue_size)
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, *self.handlers,
+                                                       respect_handler_level=True)
+        self.listener.start()
+
+    def stats(self) -> dict:
+        return {"queued": self.queue_handler.queue.qsize(), "dropped": self.queue_handler.dropped}
+
+
+class RequestLog:
+    """
+    İstek başına bir JSONL kaydı yazar. Tam yanıt metni yalnızca `answer_sample_rate` oranında
+    örneklenen kayıtlara eklenir; diğerlerinde yalnızca yanıt uzunluğu tutulur.
+    """
+
+    def __init__(self, answer_sample_rate: float = 0.0):
+        self.answer_sample_rate = answer_sample_rate
+        self.logger = logging.getLogger(REQUEST_LOGGER_NAME)
+
+    def log(self, record: dict, answer: str | None = None):
+        if answer is not None:
+            record["answer_chars"] = len(answer)
+            if self.answer_sample_rate > 0 and random.random() < self.answer_sample_rate:
+                record["answer"] = answer
+        self.logger.info("request", extra={"payload": record})
+
+
+def setup_logging(text_log_path: str, request_log_path: str, max_bytes: int, when: str = "midnight",
+                  backup_count: int = 14, queue_size: int = 10000, rotation: str = "external") -> LogPipeline:
+    """
+    Kök logger'ı kuyruk tabanlı hale getirir: metin logları `text_log_path` dosyasına ve konsola,
+    istek kayıtları `request_log_path` JSONL dosyasına yazılır. `rotation` "internal" ise her iki dosya da
+    boyut/zamana göre süreç içinde döndürülür (max_bytes, when, backup_count yalnızca bu modda kullanılır).
+    """
+    text_formatter = logging.Formatter(TEXT_LOG_FORMAT)
+    is_request = logging.Filter(REQUEST_LOGGER_NAME)
+
+    text_file = log_file_handler(text_log_path, rotation, max_bytes, when, backup_count)
+    text_file.setFormatter(text_formatter)
+    console = logging.StreamHandler()
+    console.setFormatter(text_formatter)
+    for handler in (text_file, console):
+        handler.addFilter(lambda record: not is_request.filter(record))
+
+    request_file = log_file_handler(request_log_path, rotation, max_bytes, when, backup_count)
+    request_file.setFormatter(JsonLineFormatter())
+    request_file.addFilter(is_request)
+
+    pipeline = LogPipeline([text_file, console, request_file], queue_size)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers = [pipeline.queue_handler]
+    request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
+    request_logger.handlers = [pipeline.queue_handler]
+
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    os.register_at_fork(after_in_child=pipeline.restart_after_fork)
+    return pipeline
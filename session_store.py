@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from langchain_core.documents import Document
+
+from lexical_index import tokenize
+
+# Kapsama hesabında kısa kelimeler ("is", "la", "ne") sayılmaz.
+MIN_COVERAGE_TOKEN_CHARS = 4
+# Sunucunun ürettiği kimlik biçimi (uuid4 hex); istemciden gelen başka değerler yok sayılır.
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+# Önceki tura gönderme yapan zamirler ve işaret sözcükleri ("how long is *its* recovery?"). Kısa bir sorgu
+# ancak bunlardan birini içeriyorsa devam sorusu sayılır; kelime sayısı tek başına yeterli değildir. Aksanlar
+# kaldırılarak karşılaştırıldığından başka kelimelerle karışanlar ("esta"/"está", "şu"/"su") listede yoktur.
+_ANAPHORA_WORDS = {
+    "en": "it its this that these those they them their",
+    "es": "eso esto este ese esa estos estas esos esas ello",
+    "fr": "cela ça ceci celui celle ceux celles il elle ils elles cette ces",
+    "tr": "bu bunun buna bunu bundan bunlar bunların şunun şunu onun ona onu ondan onlar onların",
+    "sr": "to taj ta tog toga ovo ovaj ova ovog ono on ona oni njega nje njih njemu",
+}
+ANAPHORA_TERMS = {lang: frozenset(tokenize(words)) for lang, words in _ANAPHORA_WORDS.items()}
+
+
+def is_valid_session_id(session_id) -> bool:
+    """İstemciden gelen değer sunucunun ürettiği biçimde bir kimlik mi (JSON'da sayı/liste de gelebilir)."""
+    return isinstance(session_id, str) and _SESSION_ID_RE.match(session_id) is not None
+
+
+def is_followup(query: str, lang_code: str, session: "Session | None", max_words: int) -> bool:
+    """
+    Sorgu oturumun önceki turunun devamı mı: aynı dilde önceki bir tur olmalı, sorgu en fazla `max_words`
+    kelime olmalı ve önceki tura gönderme yapan bir zamir/işaret sözcüğü içermelidir.
+    """
+    if session is None or session.lang != lang_code or session.last_question is None:
+        return False
+    tokens = tokenize(query)
+    return len(query.split()) <= max_words and not ANAPHORA_TERMS.get(lang_code, frozenset()).isdisjoint(tokens)
+
+
+class Session:
+    """
+    Tek bir konuşmanın sunucu tarafı durumu: dil, son erişilen parçalar (metin, kaynak) ve
+    son birkaç soru/yanıt çiftinin kısaltılmış hali. Yalnızca düz str/tuple tutulur.
+    """
+    __slots__ = ("lang", "docs", "turns", "updated_at", "size")
+
+    def __init__(self):
+        self.lang = None
+        self.docs: tuple[tuple[str, str | None], ...] = ()
+        self.turns: list[tuple[str, str]] = []
+        self.updated_at = time.monotonic()
+        self.size = 0
+
+    @property
+    def last_question(self) -> str | None:
+        return self.turns[-1][0] if self.turns else None
+
+    def documents(self) -> list[Document]:
+        return [Document(page_content=text, metadata={"source": source, "lang": self.lang})
+                for text, source in self.docs]
+
+    def history(self) -> str:
+        """İstem için kısa konuşma özeti (eski → yeni)."""
+        return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in self.turns)
+
+    def to_json(self) -> str:
+        return json.dumps({"lang": self.lang, "docs": self.docs, "turns": self.turns}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: str, size: int) -> "Session":
+        payload = json.loads(data)
+        session = cls()
+        session.lang = payload["lang"]
+        session.docs = tuple((text, source) for text, source in payload["docs"])
+        session.turns = [(question, answer) for question, answer in payload["turns"]]
+        session.size = size
+        return session
+
+    def covers(self, query: str) -> float:
+        """Sorgunun anlamlı kelimelerinin (zamirler hariç) önceki parçalarda geçme oranı (0-1)."""
+        terms = {token for token in tokenize(query) if len(token) >= MIN_COVERAGE_TOKEN_CHARS}
+        terms -= ANAPHORA_TERMS.get(self.lang, frozenset())
+        if not terms or not self.docs:
+            return 0.0
+        vocabulary = set(tokenize(" ".join(text for text, _ in self.docs)))
+        return len(terms & vocabulary) / len(terms)
+
+
+def _measure(session: Session) -> int:
+    """Oturumun yaklaşık bellek kullanımı (bayt): nesne başlıkları ve tüm metinler."""
+    size = sys.getsizeof(session) + sys.getsizeof(session.docs) + sys.getsizeof(session.turns)
+    for text, source in session.docs:
+        size += sys.getsizeof(text) + (sys.getsizeof(source) if source else 0)
+    for question, answer in session.turns:
+        size += sys.getsizeof(question) + sys.getsizeof(answer)
+    return size
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = cut.rfind(". ")
+    return cut[:boundary + 1] if boundary >= max_chars // 2 else cut.rsplit(" ", 1)[0] + " …"
+
+
+class SessionStore:
+    """
+    Oturum kimliği -> Session; sayı sınırlı LRU ve TTL ile tutulur. Her oturum en fazla `max_turns` soru/yanıt
+    (yanıtlar `answer_chars` karaktere kısaltılır), `max_docs` parça ve `max_bytes` bellek kullanır; sınır
+    aşılırsa önce en eski tur, ardından en az alakalı parçalar atılır.
+    Oturumlar süreç belleğindedir: birden fazla işçi süreci varsa SharedSessionStore kullanılmalıdır.
+    """
+
+    def __init__(self, max_sessions: int = 2000, ttl_seconds: float = 1800.0, max_turns: int = 3,
+                 answer_chars: int = 300, max_docs: int = 6, max_bytes: int = 16384):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.answer_chars = answer_chars
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._counters = {"created": 0, "resumed": 0, "expirations": 0, "evictions": 0, "trims": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0
+
+    def _is_expired(self, session: Session, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - session.updated_at > self.ttl_seconds
+
+    def _drop(self, session_id: str):
+        """Kilit altında çağrılır."""
+        self._total_bytes -= self._sessions.pop(session_id).size
+
+    def _apply_turn(self, session: Session, lang_code: str, question: str, answer: str,
+                    docs: list[Document] | None) -> int:
+        """
+        Turu oturuma uygular ve bellek sınırına göre kırpar; oturumun yeni boyutunu döndürür. docs verilirse
+        önceki parçaların yerini alır; dil değiştiyse önceki parçalar atılır. Kilit altında çağrılır.
+        """
+        if docs is not None:
+            session.docs = tuple((doc.page_content, doc.metadata.get("source")) for doc in docs[:self.max_docs])
+        elif session.lang != lang_code:
+            session.docs = ()
+        session.lang = lang_code
+        session.turns = (session.turns + [(_shorten(question, self.answer_chars),
+                                           _shorten(answer, self.answer_chars))])[-self.max_turns:]
+
+        size = _measure(session)
+        while size > self.max_bytes and (len(session.turns) > 1 or session.docs):
+            if len(session.turns) > 1:
+                session.turns = session.turns[1:]
+            else:
+                session.docs = session.docs[:-1]
+            self._counters["trims"] += 1
+            size = _measure(session)
+        return size
+
+    def get(self, session_id) -> Session | None:
+        """Geçerli (süresi dolmamış) oturumu döndürür; yoksa None."""
+        if not self.enabled or not is_valid_session_id(session_id):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._is_expired(session, now):
+                self._drop(session_id)
+                self._counters["expirations"] += 1
+                return None
+            self._counters["resumed"] += 1
+            return session
+
+    def record_turn(self, session_id, lang_code: str, question: str, answer: str,
+                    docs: list[Document] | None = None) -> str | None:
+        """
+        Turu oturuma ekler (oturum yoksa oluşturur) ve oturum kimliğini döndürür. docs verilirse önceki
+        parçaların yerini alır; dil değiştiyse önceki parçalar atılır.
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id) if is_valid_session_id(session_id) else None
+            if session is not None and self._is_expired(session, now):
+                self._drop(session_id)
+                self._counters["expirations"] += 1
+                session = None
+            if session is None:
+                session_id = uuid.uuid4().hex
+                session = self._sessions[session_id] = Session()
+                self._counters["created"] += 1
+            size = self._apply_turn(session, lang_code, question, answer, docs)
+            session.updated_at = now
+            self._total_bytes += size - session.size
+            session.size = size
+            self._sessions.move_to_end(session_id)
+
+            # Sıra son güncellemeye göredir: baştaki süresi dolmuş oturumlar ve kapasite fazlası atılır.
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if self._is_expired(oldest, now):
+                    self._counters["expirations"] += 1
+                elif len(self._sessions) > self.max_sessions:
+                    self._counters["evictions"] += 1
+                else:
+                    break
+                self._drop(oldest_id)
+        return session_id
+
+    def _totals(self) -> tuple[int, int, int]:
+        """(oturum sayısı, toplam bayt, en büyük oturum baytı); kilit altında çağrılır."""
+        largest = max((session.size for session in self._sessions.values()), default=0)
+        return len(self._sessions), self._total_bytes, largest
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_bytes, largest = self._totals()
+            return {
+                **self._counters,
+                "sessions": count,
+                "max_sessions": self.max_sessions,
+                "total_bytes": total_bytes,
+                "avg_bytes": round(total_bytes / count) if count else 0,
+                "largest_bytes": largest,
+                "max_bytes_per_session": self.max_bytes,
+            }
+
+
+class SharedSessionStore(SessionStore):
+    """
+    SessionStore ile aynı kurallar, ancak oturumlar aynı makinedeki tüm işçi süreçlerinin paylaştığı bir SQLite
+    dosyasında tutulur: gunicorn isteği hangi işçiye verirse versin oturum bulunur. Tur ekleme, süreçler arası
+    yazma kilidiyle (BEGIN IMMEDIATE) tek işlemde yapılır. Birden fazla makinede çalışılıyorsa yük dengeleyici
+    aynı istemciyi aynı makineye yönlendirmelidir. Sayaçlar (created, resumed, ...) işçi süreci başınadır.
+    """
+
+    def __init__(self, db_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self._db = None
+        self._db_pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Süreç başına tek bağlantı (kilit altında çağrılır); fork sonrası çocuk süreç yenisini açar."""
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                       "size INTEGER NOT NULL, updated_at REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _is_expired_at(self, updated_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - updated_at > self.ttl_seconds
+
+    def get(self, session_id) -> Session | None:
+        if not self.enabled or not is_valid_session_id(session_id):
+            return None
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._connection()
+                row = db.execute("SELECT data, size, updated_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                if row is None:
+                    return None
+                if self._is_expired_at(row[2], now):
+                    db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                    self._counters["expirations"] += 1
+                    return None
+            except sqlite3.Error as e:
+                logging.warning(f"Oturum okunamadı: {e}")
+                return None
+            self._counters["resumed"] += 1
+        return Session.from_json(row[0], row[1])
+
+    def record_turn(self, session_id, lang_code: str, question: str, answer: str,
+                    docs: list[Document] | None = None) -> str | None:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._connection()
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    session = None
+                    row = None
+                    if is_valid_session_id(session_id):
+                        row = db.execute("SELECT data, size, updated_at FROM sessions WHERE id = ?",
+                                         (session_id,)).fetchone()
+                    if row is not None and not self._is_expired_at(row[2], now):
+                        session = Session.from_json(row[0], row[1])
+                    if session is None:
+                        if row is not None:
+                            self._counters["expirations"] += 1
+                        session_id = uuid.uuid4().hex
+                        session = Session()
+                        self._counters["created"] += 1
+                    size = self._apply_turn(session, lang_code, question, answer, docs)
+                    db.execute("INSERT OR REPLACE INTO sessions (id, data, size, updated_at) VALUES (?, ?, ?, ?)",
+                               (session_id, session.to_json(), size, now))
+
+                    if self.ttl_seconds > 0:
+                        expired = db.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+                        self._counters["expirations"] += expired.rowcount
+                    evicted = db.execute("DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY "
+                                         "updated_at DESC LIMIT -1 OFFSET ?)", (self.max_sessions,))
+                    self._counters["evictions"] += evicted.rowcount
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                # Oturum yazılamasa da yanıt döner; istemci bir sonraki soruda yeni oturumla devam eder.
+                logging.warning(f"Oturum kaydedilemedi: {e}")
+                return None
+        return session_id
+
+    def _totals(self) -> tuple[int, int, int]:
+        try:
+            count, total_bytes, largest = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(MAX(size), 0) FROM sessions").fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Oturum istatistikleri okunamadı: {e}")
+            return 0, 0, 0
+        return count, total_bytes, largest
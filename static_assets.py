@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli kurulu değilse yalnızca gzip varyantı üretilir
+    brotli = None
+
+# Bu boyutun altındaki dosyalar sıkıştırılmaz (başlık maliyeti kazancı aşar).
+MIN_COMPRESS_BYTES = 1024
+
+
+class StaticAsset:
+    """
+    Diskteki tek bir statik dosyayı süreç başlarken belleğe alır; gzip/brotli varyantlarını bir kez üretir.
+    Her varyantın kendi güçlü ETag'i vardır; istemcinin ETag'i eşleşirse gövdesiz 304 döndürülür.
+    """
+
+    def __init__(self, path: str, max_age: int = 0):
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/"):
+            self.content_type += "; charset=utf-8"
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+
+        with open(path, "rb") as f:
+            body = f.read()
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        # kodlama -> (gövde, ETag); tercih sırası: br, gzip, identity
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+            self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        self.variants["identity"] = (body, f'"{digest}"')
+        self._etags = {etag for _, etag in self.variants.values()}
+
+        sizes = ", ".join(f"{encoding}={len(data)}" for encoding, (data, _) in self.variants.items())
+        logging.info(f"Statik dosya yüklendi: {path} ({sizes} bayt)")
+
+    def select(self, accept_encodings) -> str:
+        """İstemcinin Accept-Encoding tercihlerine (werkzeug MIMEAccept) göre varyantı seçer."""
+        for encoding in self.variants:
+            if encoding == "identity" or accept_encodings[encoding] > 0:
+                return encoding
+        return "identity"
+
+    def is_not_modified(self, if_none_match) -> bool:
+        """If-None-Match (werkzeug ETags) varyantlardan birinin ETag'ini içeriyorsa True."""
+        return if_none_match.star_tag or any(etag.strip('"') in if_none_match for etag in self._etags)
+
+    def response(self, request):
+        """Flask isteği için (gövde, durum, başlıklar) üçlüsünü döndürür."""
+        encoding = self.select(request.accept_encodings)
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if self.is_not_modified(request.if_none_match):
+            # Varyant önemsizdir: içerik aynıysa istemcinin elindeki kopya geçerlidir.
+            return b"", 304, headers
+        headers["Content-Type"] = self.content_type
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return body, 200, headers
+
+
+def load_static_asset(path: str, max_age: int = 0) -> StaticAsset | None:
+    """Dosya yoksa veya okunamıyorsa hatayı loglar ve None döndürür."""
+    try:
+        return StaticAsset(path, max_age)
+    except OSError as e:
+        logging.error(f"Statik dosya yüklenemedi ({os.path.abspath(path)}): {e}")
+        return None
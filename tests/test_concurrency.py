@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from concurrency import (ConcurrencyLimiter, DeadlineExceededError, OverloadedError, call_with_deadline,
+                         iterate_with_deadline)
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def test_call_with_deadline_returns_result(executor):
+    limiter = ConcurrencyLimiter(2, 0, 0.1)
+    assert call_with_deadline(executor, limiter, lambda: 42, 1.0) == 42
+    assert limiter.stats()["active"] == 0
+
+
+def test_hung_call_times_out_and_keeps_slot_until_it_finishes(executor):
+    limiter = ConcurrencyLimiter(1, 0, 0.1)
+    release = threading.Event()
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        call_with_deadline(executor, limiter, release.wait, 0.05)
+    assert time.monotonic() - start < 1.0
+
+    # Askıdaki çağrı hâlâ yer tutuyor: yeni çağrı kuyruk olmadığı için hemen reddedilir.
+    assert limiter.stats()["active"] == 1
+    with pytest.raises(OverloadedError):
+        call_with_deadline(executor, limiter, lambda: None, 1.0)
+
+    release.set()
+    deadline = time.monotonic() + 1.0
+    while limiter.stats()["active"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert limiter.stats()["active"] == 0
+
+
+def test_call_errors_propagate(executor):
+    limiter = ConcurrencyLimiter(1, 0, 0.1)
+    with pytest.raises(ValueError):
+        call_with_deadline(executor, limiter, lambda: int("x"), 1.0)
+    assert limiter.stats()["active"] == 0
+
+
+def test_iterate_with_deadline_yields_all_items(executor):
+    limiter = ConcurrencyLimiter(1, 0, 0.1)
+    assert list(iterate_with_deadline(executor, limiter, lambda: iter("abc"), 1.0)) == ["a", "b", "c"]
+
+
+def test_stalled_stream_times_out(executor):
+    limiter = ConcurrencyLimiter(1, 0, 0.1)
+    release = threading.Event()
+
+    def tokens():
+        yield "first"
+        release.wait()
+        yield "late"
+
+    received = []
+    with pytest.raises(DeadlineExceededError):
+        for token in iterate_with_deadline(executor, limiter, tokens, 0.1):
+            received.append(token)
+    assert received == ["first"]
+    release.set()
+
+
+def test_closed_stream_stops_producer(executor):
+    limiter = ConcurrencyLimiter(1, 0, 0.1)
+    produced = []
+
+    def tokens():
+        for i in range(1000):
+            produced.append(i)
+            time.sleep(0.001)
+            yield i
+
+    stream = iterate_with_deadline(executor, limiter, tokens, 5.0)
+    assert next(stream) == 0
+    stream.close()
+    time.sleep(0.05)
+    assert len(produced) < 1000
+    assert limiter.stats()["active"] == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from faq_store import FaqAnswer, FaqStore, save_faq_store
+
+
+def _unit(*values) -> np.ndarray:
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def faq_path(tmp_path):
+    path = str(tmp_path / "faq_answers.json")
+    save_faq_store(path, [
+        FaqAnswer("en", "gastric sleeve recovery time", "Sleeve answer", [], 5, _unit(1.0, 0.0, 0.0)),
+        FaqAnswer("en", "gastric bypass cost", "Bypass answer", [], 4, _unit(0.0, 1.0, 0.0)),
+    ], "v1")
+    return path
+
+
+def _store(path: str, threshold: float) -> FaqStore:
+    return FaqStore(path_fn=lambda: path, version_fn=lambda: "v1", similarity_threshold=threshold, check_interval=0)
+
+
+def test_similarity_tier_is_disabled_at_zero(faq_path):
+    store = _store(faq_path, 0.0)
+    assert store.get("en", "Gastric sleeve recovery time?").response == "Sleeve answer"
+    assert not store.similarity_enabled
+    assert store.get_similar("en", "gastric sleeve recovery period", _unit(1.0, 0.0, 0.0)) is None
+
+
+def test_similar_match_requires_matching_key_terms(faq_path):
+    store = _store(faq_path, 0.9)
+    store.has_language("en")
+    # Yakın yazılış: aynı anahtar kelimeler, farklı dolgu kelimeleri
+    assert store.get_similar("en", "recovery time for gastric sleeve", _unit(1.0, 0.05, 0.0)).response == "Sleeve answer"
+    # Gömmesi eşiği geçse de başka bir tedavi (bypass) için hazır yanıt sunulmaz.
+    assert store.get_similar("en", "gastric bypass recovery time", _unit(1.0, 0.05, 0.0)) is None
+    # Eşleşen sorunun anahtar kelimesi ("sleeve") sorguda yoksa sunulmaz.
+    assert store.get_similar("en", "gastric recovery time", _unit(1.0, 0.0, 0.0)) is None
+    stats = store.stats()
+    assert stats["similar_hits"] == 1
+    assert stats["similar_rejected"] == 2
+
+
+def test_similarity_below_threshold(faq_path):
+    store = _store(faq_path, 0.9)
+    store.has_language("en")
+    assert store.get_similar("en", "gastric sleeve recovery time", _unit(1.0, 1.0, 0.0)) is None
+
+
+def test_stale_store_is_not_served(faq_path):
+    store = FaqStore(path_fn=lambda: faq_path, version_fn=lambda: "v2", check_interval=0)
+    assert store.get("en", "gastric sleeve recovery time") is None
+    assert store.stats()["stale"]
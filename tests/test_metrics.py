@@ -0,0 +1,60 @@
+import threading
+
+from metrics import Histogram, bind_request_timings, reset_request_timings, timed
+
+
+def test_timed_writes_only_into_bound_request():
+    histogram = Histogram("test_seconds", "test", ("stage",))
+    first = {}
+    token = bind_request_timings(first)
+    with timed(histogram, "embed"):
+        pass
+    reset_request_timings(token)
+
+    # Aynı iş parçacığında istek dışı (veya bağlanmadan önce) ölçülen süre önceki isteğe yazılmaz.
+    with timed(histogram, "lang_detect"):
+        pass
+    second = {}
+    token = bind_request_timings(second)
+    with timed(histogram, "llm"):
+        pass
+    reset_request_timings(token)
+
+    assert set(first) == {"embed"}
+    assert set(second) == {"llm"}
+    assert any("lang_detect" in line for line in histogram.render())
+
+
+def test_nested_binding_restores_outer_request():
+    histogram = Histogram("test_seconds", "test", ("stage",))
+    outer, inner = {}, {}
+    outer_token = bind_request_timings(outer)
+    inner_token = bind_request_timings(inner)
+    with timed(histogram, "search"):
+        pass
+    reset_request_timings(inner_token)
+    with timed(histogram, "context"):
+        pass
+    reset_request_timings(outer_token)
+    assert set(inner) == {"search"}
+    assert set(outer) == {"context"}
+
+
+def test_threads_see_their_own_timings():
+    histogram = Histogram("test_seconds", "test", ("stage",))
+    results = {}
+
+    def handle(name):
+        timings = {}
+        token = bind_request_timings(timings)
+        with timed(histogram, name):
+            pass
+        reset_request_timings(token)
+        results[name] = timings
+
+    threads = [threading.Thread(target=handle, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {name: set(timings) for name, timings in results.items()} == {"a": {"a"}, "b": {"b"}}
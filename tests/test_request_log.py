@@ -0,0 +1,55 @@
+import logging
+import logging.handlers
+import os
+
+import pytest
+
+from request_log import SizeAndTimeRotatingFileHandler, log_file_handler
+
+
+def _write(handler: logging.Handler, message: str):
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.handle(logging.LogRecord("test", logging.INFO, __file__, 0, message, None, None))
+    handler.flush()
+
+
+def _read(path) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_external_rotation_reopens_moved_file(tmp_path):
+    path = tmp_path / "request_logs.jsonl"
+    # İki işçi aynı dosyaya yazar; logrotate dosyayı taşır.
+    workers = [log_file_handler(str(path), "external", max_bytes=10) for _ in range(2)]
+    assert all(isinstance(handler, logging.handlers.WatchedFileHandler) for handler in workers)
+    _write(workers[0], "a")
+    _write(workers[1], "b")
+    rotated = tmp_path / "request_logs.jsonl.2026-01-01_00-00-00"
+    os.rename(path, rotated)
+
+    _write(workers[0], "c")
+    _write(workers[1], "d")
+    for handler in workers:
+        handler.close()
+
+    # Taşınan dosyaya yeni kayıt yazılmaz, süreç kendisi döndürmez (max_bytes yok sayılır).
+    assert _read(rotated) == ["a", "b"]
+    assert _read(path) == ["c", "d"]
+    assert sorted(os.listdir(tmp_path)) == [path.name, rotated.name]
+
+
+def test_internal_rotation_rotates_by_size(tmp_path):
+    path = tmp_path / "chat_logs.txt"
+    handler = log_file_handler(str(path), "internal", max_bytes=8, backup_count=5)
+    assert isinstance(handler, SizeAndTimeRotatingFileHandler)
+    for message in ("first", "second", "third"):
+        _write(handler, message)
+    handler.close()
+    assert _read(path) == ["third"]
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_unknown_rotation_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        log_file_handler(str(tmp_path / "x.log"), "daily", max_bytes=0)
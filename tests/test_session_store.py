@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from session_store import SessionStore, SharedSessionStore, is_followup, is_valid_session_id
+
+SLEEVE_DOCS = [Document(page_content="Gastric sleeve recovery usually takes two to three weeks.",
+                        metadata={"source": "https://savaclinic.com/gastric-sleeve/"})]
+
+
+@pytest.fixture(params=["memory", "shared"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return SessionStore(max_sessions=10)
+    return SharedSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=10)
+
+
+@pytest.mark.parametrize("session_id", [123, ["a"], {"id": "x"}, "", "not-a-session", None])
+def test_invalid_session_ids_are_ignored(store, session_id):
+    assert not is_valid_session_id(session_id)
+    assert store.get(session_id) is None
+    new_id = store.record_turn(session_id, "en", "What is a gastric sleeve?", "An operation.", SLEEVE_DOCS)
+    assert is_valid_session_id(new_id)
+    assert store.get(new_id).last_question == "What is a gastric sleeve?"
+
+
+def test_turns_are_kept_and_trimmed(store):
+    session_id = None
+    for i in range(5):
+        session_id = store.record_turn(session_id, "en", f"question {i}", f"answer {i}", SLEEVE_DOCS)
+    session = store.get(session_id)
+    assert [question for question, _ in session.turns] == ["question 2", "question 3", "question 4"]
+    assert session.documents()[0].metadata["source"] == "https://savaclinic.com/gastric-sleeve/"
+    assert store.stats()["sessions"] == 1
+
+
+def test_language_change_drops_previous_documents(store):
+    session_id = store.record_turn(None, "en", "What is a gastric sleeve?", "An operation.", SLEEVE_DOCS)
+    store.record_turn(session_id, "tr", "Tüp mide nedir?", "Bir ameliyat.")
+    assert store.get(session_id).docs == ()
+
+
+def test_expired_sessions_are_not_resumed(tmp_path):
+    for store in (SessionStore(ttl_seconds=0.01), SharedSessionStore(str(tmp_path / "s.sqlite3"), ttl_seconds=0.01)):
+        session_id = store.record_turn(None, "en", "q", "a")
+        time.sleep(0.05)
+        assert store.get(session_id) is None
+        assert store.record_turn(session_id, "en", "q2", "a2") != session_id
+
+
+def test_oldest_sessions_are_evicted(store):
+    ids = [store.record_turn(None, "en", f"q{i}", "a") for i in range(12)]
+    assert store.stats()["sessions"] == 10
+    assert store.get(ids[0]) is None
+    assert store.get(ids[-1]) is not None
+
+
+def test_shared_store_is_visible_to_other_workers(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    # Her gunicorn işçisi kendi SharedSessionStore nesnesini oluşturur.
+    worker_a, worker_b = SharedSessionStore(path), SharedSessionStore(path)
+    session_id = worker_a.record_turn(None, "en", "What is a gastric sleeve?", "An operation.", SLEEVE_DOCS)
+    assert worker_b.get(session_id).last_question == "What is a gastric sleeve?"
+    assert worker_b.record_turn(session_id, "en", "How long is its recovery?", "Two weeks.") == session_id
+    assert len(worker_a.get(session_id).turns) == 2
+
+
+def _session_with_previous_turn(store):
+    session_id = store.record_turn(None, "en", "What is a gastric sleeve?", "An operation.", SLEEVE_DOCS)
+    return store.get(session_id)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How long is its recovery?", True),
+    ("Does it hurt?", True),
+    # Kısa ama bağımsız sorular: önbellek/FAQ yolundan geçmeli
+    ("Rhinoplasty recovery time?", False),
+    ("How much is a hair transplant?", False),
+    # Zamir var ama sorgu uzun
+    ("Could you explain in detail how this procedure is performed step by step?", False),
+])
+def test_followup_requires_an_anaphora(store, query, expected):
+    session = _session_with_previous_turn(store)
+    assert is_followup(query, "en", session, max_words=8) is expected
+
+
+def test_followup_requires_same_language_and_previous_turn(store):
+    session = _session_with_previous_turn(store)
+    assert not is_followup("¿Cuánto cuesta eso?", "es", session, max_words=8)
+    assert is_followup("¿Cuánto cuesta eso?", "en", None, max_words=8) is False
+
+
+def test_coverage_rejects_new_topic(store):
+    session = _session_with_previous_turn(store)
+    # Tüm anahtar kelimeler (zamirler hariç) önceki parçalarda: yeniden kullanılabilir
+    assert session.covers("its recovery weeks") == 1.0
+    # "long" parçalarda geçmiyor: önceki parçalar tek başına yeterli sayılmaz
+    assert session.covers("How long is its recovery?") == 0.5
+    # Yeni konu: kapsama tam değil, yeni erişim yapılmalı
+    assert session.covers("rhinoplasty recovery time") < 1.0
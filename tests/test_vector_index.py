@@ -0,0 +1,85 @@
+import logging
+
+import numpy as np
+import pytest
+
+from vector_index import CompactVectorIndex, VectorIndex
+
+
+class _FakeCollection:
+    """Chroma koleksiyonunun VectorIndex.from_collection'ın kullandığı kısmı (get + metadata)."""
+
+    metadata = {"hnsw:space": "l2"}
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get(self, where=None, include=None):
+        rows = [row for row in self.rows
+                if not where or all(row[3].get(key) == value for key, value in where.items())]
+        return {
+            "ids": [row[0] for row in rows],
+            "embeddings": [row[1] for row in rows],
+            "documents": [row[2] for row in rows],
+            "metadatas": [row[3] for row in rows],
+        }
+
+
+@pytest.fixture
+def collection():
+    return _FakeCollection([
+        ("en-1", [1.0, 0.0, 0.0], "Gastric sleeve recovery", {"lang": "en", "source": "a"}),
+        ("en-2", [0.0, 1.0, 0.0], "Gastric bypass cost", {"lang": "en", "source": "b"}),
+        ("en-3", [0.7, 0.7, 0.0], "Sleeve or bypass", {"lang": "en", "source": "c"}),
+        ("tr-1", [0.0, 0.0, 1.0], "Tüp mide iyileşme", {"lang": "tr", "source": "d"}),
+    ])
+
+
+def test_from_collection_groups_by_language(collection, caplog):
+    with caplog.at_level(logging.INFO):
+        index = VectorIndex.from_collection(collection)
+    assert index.size == 4
+    assert sorted(index.shards) == ["en", "tr"]
+    assert "4 parça, 2 dil" in caplog.text
+
+
+def test_from_collection_applies_where_filter(collection):
+    index = VectorIndex.from_collection(collection, where={"lang": "tr"})
+    assert list(index.shards) == ["tr"]
+    assert index.search([0.0, 0.0, 1.0], "en") == []
+
+
+def test_search_returns_best_matches_in_language(collection):
+    index = VectorIndex.from_collection(collection)
+    results = index.search([1.0, 0.1, 0.0], "en", k=2)
+    assert [doc.id for doc, _ in results] == ["en-1", "en-3"]
+    assert results[0][1] >= results[1][1]
+    assert results[0][0].metadata["source"] == "a"
+
+
+def test_compact_load_matches_in_memory_index(collection, tmp_path, caplog):
+    index = VectorIndex.from_collection(collection)
+    index.save_compact(str(tmp_path))
+    with caplog.at_level(logging.INFO):
+        compact = CompactVectorIndex.load(str(tmp_path), "int8", 50)
+    assert compact is not None
+    assert compact.size == 4
+    assert "4 parça, 2 dil" in caplog.text
+
+    query = [1.0, 0.1, 0.0]
+    expected = index.search(query, "en", k=2)
+    actual = compact.search(query, "en", k=2)
+    assert [doc.id for doc, _ in actual] == [doc.id for doc, _ in expected]
+    np.testing.assert_allclose([score for _, score in actual], [score for _, score in expected], rtol=1e-5)
+
+
+def test_compact_load_limited_to_langs(collection, tmp_path):
+    VectorIndex.from_collection(collection).save_compact(str(tmp_path))
+    compact = CompactVectorIndex.load(str(tmp_path), "float16", 50, langs=["tr"])
+    assert list(compact.shards) == ["tr"]
+    assert compact.size == 1
+    assert compact.search([1.0, 0.0, 0.0], "en") == []
+
+
+def test_compact_load_without_files_returns_none(tmp_path):
+    assert CompactVectorIndex.load(str(tmp_path)) is None
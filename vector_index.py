@@ -0,0 +1,292 @@
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# CHROMA_DB_DIR içinde, dil başına bellek eşlemeli vektör dosyalarının dizini (load_data.py yazar)
+COMPACT_VECTORS_DIR = "compact_vectors"
+COMPACT_META_FILE = "meta.json"
+QUANTIZATIONS = ("float16", "int8")
+# Yaklaşık taramada bir seferde float32'ye çevrilen satır sayısı (geçici bellek bu kadar satırla sınırlı kalır)
+_SCAN_BLOCK_ROWS = 8192
+
+
+def compact_vectors_path(db_dir: str) -> str:
+    return os.path.join(db_dir, COMPACT_VECTORS_DIR)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Satır başına simetrik ölçekli int8 niceleme: satır ≈ kodlar * ölçek."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _top_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """En yüksek k skorun satırları, skora göre azalan sırada."""
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+def _thresholded(documents: list[Document], rows, scores, score_threshold: float | None) -> list[tuple[Document, float]]:
+    results = []
+    for row, score in zip(rows, scores):
+        score = float(score)
+        if score_threshold is not None and score < score_threshold:
+            break
+        results.append((documents[row], score))
+    return results
+
+
+class _LanguageShard:
+    """Tek bir dile ait, satırları birim uzunluğa normalleştirilmiş bitişik float32 matris ve dokümanlar."""
+
+    def __init__(self, vectors: np.ndarray, documents: list[Document]):
+        self.matrix = normalize_rows(vectors)
+        self.documents = documents
+
+
+class VectorIndex:
+    """
+    Kalıcı Chroma koleksiyonundaki tüm gömmeleri belleğe alan, dil bazlı vektörize kosinüs arama motoru.
+    Skorlar Chroma'nın "relevance score" dönüşümüyle aynı ölçektedir; böylece score_threshold/k
+    değerleri mevcut Chroma yolu ile aynı anlamı taşır.
+    """
+
+    def __init__(self, shards: dict[str, _LanguageShard], space: str = "l2"):
+        self.shards = shards
+        self.space = space
+
+    @classmethod
+    def from_collection(cls, collection, where: dict | None = None) -> "VectorIndex":
+        """Chroma koleksiyonundaki gömmeleri, dokümanları ve metadata'ları dil bazında yükler (where: Chroma filtresi)."""
+        start = time.perf_counter()
+        data = collection.get(where=where, include=["embeddings", "documents", "metadatas"])
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+
+        grouped: dict[str, tuple[list, list]] = {}
+        for cid, vector, text, metadata in zip(data["ids"], data["embeddings"], data["documents"], data["metadatas"]):
+            metadata = metadata or {}
+            vectors, documents = grouped.setdefault(metadata.get("lang"), ([], []))
+            vectors.append(vector)
+            documents.append(Document(page_content=text, metadata=metadata, id=cid))
+
+        index = cls.from_vectors(grouped, space)
+        logging.info(
+            f"NumPy vektör indeksi yüklendi: {index.size} parça, {len(index.shards)} dil, "
+            f"{index.nbytes / 1024 / 1024:.1f} MB, {time.perf_counter() - start:.2f}s"
+        )
+        return index
+
+    @classmethod
+    def from_vectors(cls, grouped: dict[str, tuple], space: str = "l2") -> "VectorIndex":
+        """Dil -> (vektörler, dokümanlar) eşlemesinden indeksi kurar."""
+        shards = {
+            lang: _LanguageShard(np.asarray(vectors, dtype=np.float32), documents)
+            for lang, (vectors, documents) in grouped.items()
+        }
+        return cls(shards, space)
+
+    @property
+    def size(self) -> int:
+        return sum(len(shard.documents) for shard in self.shards.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Süreç belleğinde (işçi başına) tutulan vektör baytları."""
+        return sum(shard.matrix.nbytes for shard in self.shards.values())
+
+    @property
+    def mapped_bytes(self) -> int:
+        """Diskten bellek eşlemeli okunan, işçiler arasında sayfa önbelleğinde paylaşılan vektör baytları."""
+        return 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": "numpy",
+            "chunks": self.size,
+            "langs": sorted(self.shards),
+            "resident_mb": round(self.nbytes / 1024 / 1024, 2),
+            "mapped_mb": round(self.mapped_bytes / 1024 / 1024, 2),
+        }
+
+    def save_compact(self, db_dir: str):
+        """
+        Dil başına birim uzunluklu float32 vektörleri, float16 ve int8 (satır ölçekli) kopyalarını ve dokümanları
+        CHROMA_DB_DIR/compact_vectors/<dil>/ altına .npy olarak yazar; CompactVectorIndex bunları bellek eşlemeli açar.
+        Dizin bütün halinde değiştirilir; eski dosyaları eşlemiş işçiler yeniden yüklenene kadar onları okumaya devam eder.
+        """
+        path = compact_vectors_path(db_dir)
+        tmp_path, old_path = f"{path}.tmp", f"{path}.old"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        langs = {}
+        for lang, shard in self.shards.items():
+            if lang is None:
+                # Dil etiketi olmayan parçalar hiçbir aramada dönmez.
+                continue
+            lang_dir = os.path.join(tmp_path, lang)
+            os.makedirs(lang_dir)
+            codes, scales = quantize_int8(shard.matrix)
+            np.save(os.path.join(lang_dir, "float32.npy"), shard.matrix)
+            np.save(os.path.join(lang_dir, "float16.npy"), shard.matrix.astype(np.float16))
+            np.save(os.path.join(lang_dir, "int8.npy"), codes)
+            np.save(os.path.join(lang_dir, "int8_scale.npy"), scales)
+            with open(os.path.join(lang_dir, "documents.json"), "w", encoding="utf-8") as f:
+                json.dump([{"id": doc.id, "text": doc.page_content, "metadata": doc.metadata}
+                           for doc in shard.documents], f, ensure_ascii=False)
+            langs[lang] = len(shard.documents)
+        with open(os.path.join(tmp_path, COMPACT_META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"built_at": datetime.now().isoformat(), "space": self.space, "langs": langs}, f)
+
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def _relevance(self, cosine: np.ndarray) -> np.ndarray:
+        """Kosinüs benzerliğini Chroma/LangChain'in kullandığı alaka skoruna çevirir."""
+        if self.space == "l2":
+            # Birim vektörlerde Chroma'nın kare L2 uzaklığı 2 - 2cos'tur; LangChain: 1 - d / sqrt(2)
+            return 1.0 - (2.0 - 2.0 * cosine) / math.sqrt(2)
+        # "cosine" ve "ip" uzaylarında uzaklık 1 - cos, alaka skoru ise 1 - uzaklıktır.
+        return cosine
+
+    def search(self, query_vector, lang_code: str, k: int = 3,
+               score_threshold: float | None = None) -> list[tuple[Document, float]]:
+        """Verilen dilde en alakalı k parçayı (doküman, skor) olarak, skora göre azalan sırada döndürür."""
+        shard = self.shards.get(lang_code)
+        if shard is None or k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = self._relevance(shard.matrix @ query)
+        top = _top_rows(scores, k)
+        return _thresholded(shard.documents, top, scores[top], score_threshold)
+
+
+class _CompactShard:
+    """
+    Tek bir dilin bellek eşlemeli vektörleri: taranan nicelenmiş matris (float16 veya int8 + satır ölçekleri)
+    ve yalnızca aday satırları okunan float32 matris.
+    """
+
+    def __init__(self, directory: str, quantization: str):
+        self.exact = np.load(os.path.join(directory, "float32.npy"), mmap_mode="r")
+        self.matrix = np.load(os.path.join(directory, f"{quantization}.npy"), mmap_mode="r")
+        # Ölçekler küçüktür (satır başına 4 bayt); taramada her seferinde diskten okunmasın diye bellekte tutulur.
+        self.scales = np.load(os.path.join(directory, "int8_scale.npy")) if quantization == "int8" else None
+        with open(os.path.join(directory, "documents.json"), encoding="utf-8") as f:
+            self.documents = [Document(page_content=item["text"], metadata=item["metadata"], id=item["id"])
+                              for item in json.load(f)]
+
+    def approximate_cosine(self, query: np.ndarray) -> np.ndarray:
+        cosine = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), _SCAN_BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:start + _SCAN_BLOCK_ROWS], dtype=np.float32)
+            cosine[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            cosine *= self.scales
+        return cosine
+
+
+class CompactVectorIndex(VectorIndex):
+    """
+    save_compact ile yazılmış dosyalar üzerinde iki aşamalı arama: nicelenmiş matriste yaklaşık kosinüs ile
+    rerank_candidates aday seçilir, adaylar float32 vektörlerle tam skorlanıp sıralanır. Eşik ve k tam skorlara
+    uygulandığından score_threshold/k anlamı VectorIndex ile aynıdır; fark yalnızca adaylar arasına girmeyen
+    parçalardan doğabilir. Vektörler işçi belleğine kopyalanmaz, işletim sisteminin sayfa önbelleğinde paylaşılır.
+    """
+
+    def __init__(self, shards: dict[str, _CompactShard], space: str = "l2", quantization: str = "int8",
+                 rerank_candidates: int = 50):
+        super().__init__(shards, space)
+        self.quantization = quantization
+        self.rerank_candidates = rerank_candidates
+
+    @classmethod
+    def load(cls, db_dir: str, quantization: str = "int8", rerank_candidates: int = 50,
+             langs=None) -> "CompactVectorIndex | None":
+        """Dosyaları (langs verilirse yalnızca bu dillerinkini) bellek eşlemeli açar; yoksa None döndürür."""
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Bilinmeyen niceleme: {quantization} (seçenekler: {', '.join(QUANTIZATIONS)})")
+        path = compact_vectors_path(db_dir)
+        meta_path = os.path.join(path, COMPACT_META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        start = time.perf_counter()
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        shards = {lang: _CompactShard(os.path.join(path, lang), quantization)
+                  for lang in meta["langs"] if langs is None or lang in langs}
+        index = cls(shards, meta["space"], quantization, rerank_candidates)
+        logging.info(
+            f"Sıkıştırılmış ({quantization}) vektör indeksi yüklendi: {index.size} parça, {len(index.shards)} dil, "
+            f"eşlemeli {index.mapped_bytes / 1024 / 1024:.1f} MB, {time.perf_counter() - start:.2f}s"
+        )
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        return sum(shard.scales.nbytes for shard in self.shards.values() if shard.scales is not None)
+
+    @property
+    def mapped_bytes(self) -> int:
+        return sum(shard.matrix.nbytes for shard in self.shards.values())
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "compact", "quantization": self.quantization,
+                "rerank_candidates": self.rerank_candidates}
+
+    def search(self, query_vector, lang_code: str, k: int = 3,
+               score_threshold: float | None = None) -> list[tuple[Document, float]]:
+        shard = self.shards.get(lang_code)
+        if shard is None or k <= 0 or not len(shard.documents):
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        # Adaylar artan satır sırasıyla okunur (float32 dosyasında sıralı erişim).
+        candidates = np.sort(_top_rows(shard.approximate_cosine(query), max(k, self.rerank_candidates)))
+        scores = self._relevance(np.asarray(shard.exact[candidates]) @ query)
+        top = _top_rows(scores, k)
+        return _thresholded(shard.documents, candidates[top], scores[top], score_threshold)
+
+
+class NumpyRetriever(BaseRetriever):
+    """VectorIndex'i LangChain retriever arayüzüyle sunar; vs.as_retriever(...) yerine doğrudan kullanılabilir."""
+
+    index: Any
+    embeddings: Any
+    lang_code: str
+    k: int = 3
+    score_threshold: float | None = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        query_vector = self.embeddings.embed_query(query)
+        return [doc for doc, _ in self.index.search(query_vector, self.lang_code, self.k, self.score_threshold)]